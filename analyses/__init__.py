@@ -1,37 +1,159 @@
 import importlib
+import json
+import logging
+import os
 import pkgutil
-from typing import Dict
+from typing import Dict, List, Set
+
+import config
+from util import profiler
+from util.builders import ArgInfo, ArgInfoBuilder
 
 from .base_analysis import BaseAnalysis
 
+logger = logging.getLogger(__name__)
+
+# Cached metadata of the features, so that listing them and parsing their
+# arguments does not need to import the feature modules. It is kept with
+# the other caches (see DataLoader.cache_dir), not in the source tree.
+MANIFEST_PATH = config.get_parameter(
+    'ENPM611_PROJECT_FEATURES_MANIFEST',
+    os.path.join(config.get_cache_dir(), 'features_manifest.json')
+)
+MANIFEST_VERSION = 1
+
+
+class LazyFeature:
+    """
+    Stands in for a registered feature. The id, name, description and
+    arguments come from the feature manifest; the feature's module (and the
+    heavy libraries it imports) is only imported when anything else is used,
+    e.g. when the feature runs.
+    """
+
+    def __init__(self, info: dict, feature: BaseAnalysis = None):
+        self._info = info
+        self._feature = feature
+
+    @property
+    def feature_id(self) -> int:
+        return self._info['feature_id']
+
+    def name(self) -> str:
+        return self._info['name']
+
+    def description(self) -> str:
+        return self._info['description']
+
+    def get_arguments_info(self) -> List[ArgInfo]:
+        return [
+            ArgInfoBuilder().set_flags(arg['flags']).set_help(arg['help']).build()
+            for arg in self._info['arguments']
+        ]
+
+    def load(self) -> BaseAnalysis:
+        """
+        Imports the feature's module and returns the feature instance.
+        """
+        if self._feature is None:
+            with profiler.stage('analyses.import'):
+                module = importlib.import_module(self._info['module'])
+            self._feature = getattr(module, self._info['class'])()
+        return self._feature
+
+    def __getattr__(self, name):
+        return getattr(self.load(), name)
+
+
 FEATURES: Dict[int, BaseAnalysis] = {}
 
 def discover_features():
     """
-    Dynamically discovers and registers all feature classes in the analyses package.
+    Registers all feature classes in the analyses package. The features are
+    read from the manifest while it matches the package's modules; otherwise
+    every module is imported to find the classes inheriting from
+    BaseAnalysis, and the manifest is rewritten.
     """
-    package = importlib.import_module(__name__)
-    package_path = package.__path__
+    package_path = os.path.dirname(os.path.abspath(__file__))
+    modules = {}
+    for _, module_name, _ in pkgutil.iter_modules([package_path]):
+        stat = os.stat(os.path.join(package_path, f'{module_name}.py'))
+        modules[module_name] = [stat.st_mtime_ns, stat.st_size]
+
+    manifest = __read_manifest()
+    if manifest is not None and manifest.get('modules') == modules:
+        for info in manifest['features']:
+            FEATURES[info['feature_id']] = LazyFeature(info)
+        return
 
-    for _, module_name, _ in pkgutil.iter_modules(package_path):
-        # Skip the base_feature module
-        if module_name == 'base_feature':
+    features = []
+    for module_name in modules:
+        # Skip the base_analysis module
+        if module_name == 'base_analysis':
             continue
-        
+
         module = importlib.import_module(f"{__name__}.{module_name}")
-        
+
         # Iterate through attributes to find classes inheriting from BaseAnalysis
         for attribute_name in dir(module):
             attribute = getattr(module, attribute_name)
             if (
-                isinstance(attribute, type) 
-                and issubclass(attribute, BaseAnalysis) 
+                isinstance(attribute, type)
+                and issubclass(attribute, BaseAnalysis)
                 and attribute is not BaseAnalysis
+                and attribute.__module__ == module.__name__
             ):
                 feature_instance = attribute()
                 if feature_instance.feature_id in FEATURES:
                     raise ValueError(f"Duplicate feature_id {feature_instance.feature_id} in feature '{feature_instance.name()}'.")
-                FEATURES[feature_instance.feature_id] = feature_instance
+                info = {
+                    'feature_id': feature_instance.feature_id,
+                    'name': feature_instance.name(),
+                    'description': feature_instance.description(),
+                    'arguments': [{'flags': a.flags, 'help': a.help} for a in feature_instance.get_arguments_info()],
+                    'module': module.__name__,
+                    'class': attribute_name,
+                }
+                FEATURES[feature_instance.feature_id] = LazyFeature(info, feature_instance)
+                features.append(info)
+
+    __write_manifest({'version': MANIFEST_VERSION, 'modules': modules, 'features': features})
+
+
+def required_fields(features: List[BaseAnalysis]) -> Set[str]:
+    """
+    The fields that the given features need together, or None if one of
+    them needs every field.
+    """
+    fields = set()
+    for feature in features:
+        required = feature.required_fields()
+        if required is None:
+            return None
+        fields.update(required)
+    return fields
+
+
+def __read_manifest() -> dict:
+    try:
+        with open(MANIFEST_PATH, 'r') as fin:
+            manifest = json.load(fin)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get('version') == MANIFEST_VERSION else None
+
+
+def __write_manifest(manifest: dict):
+    # The manifest is only an optimization, so failing to write it is fine
+    try:
+        os.makedirs(os.path.dirname(MANIFEST_PATH), exist_ok=True)
+        tmp_path = f'{MANIFEST_PATH}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as fout:
+            json.dump(manifest, fout, indent=2)
+        os.replace(tmp_path, MANIFEST_PATH)
+    except OSError as e:
+        logger.info(f'Could not write feature manifest {MANIFEST_PATH}: {e}')
 
 # Discover features upon import
-discover_features()
+with profiler.stage('analyses.discover'):
+    discover_features()
@@ -1,12 +1,13 @@
 import argparse
-from typing import List
+from typing import Any, Dict, List, Set
 
-import matplotlib.pyplot as plt
 import pandas as pd
 
-from analyses.base_analysis import BaseAnalysis
+from analyses.base_analysis import BaseAnalysis, counts_per_dataset
 from data_loader import DataLoader
-from models.Issue import Issue
+from models.IssueFilter import IssueFilter
+from models.IssueFrames import IssueFrames
+from util import figures, profiler
 from util.builders import ArgInfo, ArgInfoBuilder
 
 
@@ -54,37 +55,78 @@ class ActiveLabelsAnalysis(BaseAnalysis):
     def get_arguments_info(self) -> List[ArgInfo]:
         return [self.active_labels_arg, self.label_arg]
 
-    def run(self, args):
-        issues: List[Issue] = DataLoader().get_issues()
-        label_filter = args.label
-
-        if label_filter:
-            self.__print_occurrences(issues, label_filter)
+    def required_fields(self) -> Set[str]:
+        return {'labels', 'events.event_type'}
 
-        df = self.__create_dataframe(issues, label_filter)
-        aggregated = self.__aggregate(df)
-        self.__visualize_results(aggregated, args.active_labels, label_filter)
+    def drawing_arguments(self) -> Set[str]:
+        # The results hold the counts of every label
+        return {'active_labels'}
 
-    def __print_occurrences(self, issues, label):
-        total = sum(issue.labels.count(label) for issue in issues if issue.labels)
-        output = f"The label '{label}' occurred {total} times across {len(issues)} issues."
+    def run(self, args) -> Dict[str, Any]:
+        result = self.cached_result(args, lambda: self.__compute(args))
+        label_activity = pd.Series(result['num_comments'], dtype='int64').head(args.active_labels)
+        if args.label:
+            self.__print_occurrences(args.label, result['occurrences'], result['issues'])
+        else:
+            print(f'Number of comments on the {len(label_activity)} most active labels:')
+            print(label_activity.rename_axis('label').to_string())
+        if figures.enabled():
+            with profiler.stage('visualize'):
+                self.__visualize_results(label_activity, args.active_labels, args.label)
+        return result
+
+    def compare(self, results: Dict[str, Dict[str, Any]], args) -> Dict[str, Any]:
+        # Labels that a dataset does not have are missing from its results,
+        # rather than counted as 0
+        label_activity = counts_per_dataset(results, 'num_comments', args.active_labels)
+        print('Comments on the most active labels per dataset:')
+        print(label_activity)
+        if figures.enabled():
+            with profiler.stage('visualize'):
+                self.__visualize_comparison(label_activity)
+        return {'num_comments': {
+            name: {label: int(n) for label, n in counts.dropna().items()}
+            for name, counts in label_activity.items()
+        }}
+
+    def __compute(self, args) -> Dict[str, Any]:
+        label_filter = args.label
+        where = IssueFilter(label=label_filter)
+        frames: IssueFrames = DataLoader().get_frames(self.required_fields(), where)
+
+        with profiler.stage('create_dataframe'):
+            df = self.__create_dataframe(frames, label_filter)
+        with profiler.stage('aggregate'):
+            aggregated = self.__aggregate(df)
+        result = {'num_comments': {str(label): int(n) for label, n in aggregated.items()}}
+        if label_filter:
+            # The loader already skipped issues without the label, so the
+            # number of issues it looked at is the total to report
+            scanned = where.scanned if where.scanned is not None else len(frames.issues)
+            result.update(label=label_filter, occurrences=len(df), issues=scanned)
+        return result
+
+    def __print_occurrences(self, label, total, num_issues):
+        output = f"The label '{label}' occurred {total} times across {num_issues} issues."
         print(f'\n\n{output}\n')
 
-    def __create_dataframe(self, issues, label_filter) -> pd.DataFrame:
-        data = []
-        for issue in issues:
-            num_comments = sum(1 for event in issue.events if event and event.event_type == 'commented')
-            for label in issue.labels:
-                if label_filter and label != label_filter:
-                    continue
-                data.append({'label': label, 'num_comments': num_comments})
-        df = pd.DataFrame(data)
+    def __create_dataframe(self, frames: IssueFrames, label_filter) -> pd.DataFrame:
+        # One row per label occurrence, with the comment count of its issue
+        issue_labels = frames.issue_labels
+        num_comments = frames.event_counts('commented')
+        df = pd.DataFrame({
+            'label': issue_labels['label'],
+            'num_comments': num_comments[issue_labels['issue'].to_numpy()],
+        })
+        if label_filter:
+            df = df[df['label'] == label_filter]
         return df
 
     def __aggregate(self, df):
-        return df.groupby('label')['num_comments'].sum().sort_values(ascending=False)
+        return df.groupby('label', observed=True)['num_comments'].sum().sort_values(ascending=False)
 
     def __visualize_results(self, label_activity, top_n, label_filter):
+        plt = figures.pyplot()
         label_activity.head(top_n).plot(kind='bar')
         plt.xlabel('Label')
         plt.ylabel('Number of Comments')
@@ -93,4 +135,14 @@ class ActiveLabelsAnalysis(BaseAnalysis):
         else:
             plt.title(f'Top {top_n} Most Active Labels')
         plt.tight_layout()
-        plt.show()
\ No newline at end of file
+        figures.show(self.name())
+
+    def __visualize_comparison(self, label_activity: pd.DataFrame):
+        plt = figures.pyplot()
+        label_activity.astype('float64').plot(kind='bar', figsize=(12, 6))
+        plt.xlabel('Label')
+        plt.ylabel('Number of Comments')
+        plt.title(f'Top {len(label_activity)} Most Active Labels per Dataset')
+        plt.legend(title='Dataset')
+        plt.tight_layout()
+        figures.show(f'{self.name()}Comparison')
@@ -1,8 +1,56 @@
 import abc
 import argparse
-from typing import List
+import json
+import os
+from typing import Any, Callable, Dict, List, Set
 
+import config
 from util.builders import ArgInfo
+from util.result_cache import DEFAULT_MAX_BYTES, ResultCache
+
+
+def positive_int(value: str) -> int:
+    """
+    Argument type for counts that must be at least 1.
+    """
+    number = _int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer: '{value}'")
+    return number
+
+
+def non_negative_int(value: str) -> int:
+    """
+    Argument type for limits where 0 means no limit.
+    """
+    number = _int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"must not be negative: '{value}'")
+    return number
+
+
+def _int(value: str) -> int:
+    try:
+        return int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: '{value}'")
+
+
+def counts_per_dataset(results: Dict[str, Dict[str, Any]], key: str, top_n: int, fill_value: int = None):
+    """
+    Puts the counts per label of several datasets, result[key] of every
+    result by dataset name, side by side: one column per dataset and one
+    row per label, ordered by the total over the datasets and cut to the
+    top_n labels. Labels missing from a dataset's counts get fill_value,
+    or no value (<NA>) without one.
+    """
+    # Imported here so that listing the features does not load pandas
+    import pandas as pd
+    df = pd.DataFrame({name: pd.Series(result[key], dtype='int64') for name, result in results.items()})
+    if fill_value is not None:
+        df = df.fillna(fill_value)
+    order = df.sum(axis=1).sort_values(ascending=False, kind='stable').index
+    return df.loc[order].head(top_n).astype('Int64')
 
 
 class BaseAnalysis(abc.ABC):
@@ -47,9 +95,103 @@ class BaseAnalysis(abc.ABC):
         """
         pass
 
+    def required_fields(self) -> Set[str]:
+        """
+        Returns the Issue fields the feature reads, with Event fields written
+        as 'events.<field>'. The loader only decodes these fields.
+        None (the default) means that every field is needed.
+        """
+        return None
+
+    def drawing_arguments(self) -> Set[str]:
+        """
+        Returns the destinations of the arguments that only change how the
+        results are printed or drawn, e.g. {'max_nodes'}. They are not part
+        of the result cache key, so that showing them again reuses the
+        results.
+        """
+        return set()
+
+    def invalidate_drawings(self) -> int:
+        """
+        Removes what the feature caches to draw its results faster, e.g.
+        graph layouts, for --invalidate-results. Returns the number of
+        removed entries.
+        """
+        return 0
+
     @abc.abstractmethod
-    def run(self, args):
+    def run(self, args) -> Dict[str, Any]:
         """
         Executes the feature using the parsed arguments.
+        Returns the results as a JSON serializable dict, e.g. for the
+        analysis server.
         """
         pass
+
+    def compare(self, results: Dict[str, Dict[str, Any]], args) -> Dict[str, Any]:
+        """
+        Compares the results of run() on several datasets, given by dataset
+        name, e.g. in a table and a figure with the datasets side by side.
+        Returns the comparison as a JSON serializable dict.
+        The default prints the results of every dataset.
+        """
+        for name, result in results.items():
+            print(f'{name}: {json.dumps(result, sort_keys=True)}')
+        return results
+
+    def cached_result(self, args, compute: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Returns the results of compute() from the result cache, where they
+        are keyed by the feature id, the values of the feature's arguments
+        (except the drawing arguments) and the fingerprint of the dataset. On a miss they are computed and
+        cached. --no-cache bypasses the cache and --rebuild-cache recomputes
+        the results.
+        The fingerprint is that of the loaded dataset, which compute()
+        analyzes, not that of the data files, which may have changed since.
+        """
+        # Imported here so that listing the features does not load numpy
+        import data_loader
+        if config.get_parameter('no_cache'):
+            return compute()
+        dataset = data_loader.loaded_fingerprint()
+        if dataset is None:
+            try:
+                dataset = data_loader.DataLoader().fingerprint()
+            except FileNotFoundError:
+                return compute()
+
+        arguments = {}
+        drawing = self.drawing_arguments()
+        for arg in self.get_arguments_info():
+            dest = arg.flags.lstrip('-').replace('-', '_')
+            if dest not in drawing:
+                arguments[dest] = getattr(args, dest, None)
+        cache = self.result_cache()
+        key = ResultCache.key(self.feature_id, arguments, dataset)
+        if not config.get_parameter('rebuild_cache'):
+            result = cache.get(self.feature_id, key)
+            if result is not None:
+                return result
+
+        result = compute()
+        if data_loader.loaded_fingerprint() not in (None, dataset):
+            # compute() (re)loaded the dataset, and it is not the one of the key
+            return result
+        try:
+            cache.put(self.feature_id, key, result)
+        except OSError as e:
+            print(f'Could not write result cache to {cache.cache_dir}: {e}')
+        return result
+
+    @staticmethod
+    def result_cache() -> ResultCache:
+        """
+        The cache of analysis results, in the results directory of the
+        dataset cache. Its size is limited to
+        ENPM611_PROJECT_RESULT_CACHE_MB megabytes (default: 64).
+        """
+        from data_loader import DataLoader
+        max_megabytes = config.get_parameter('ENPM611_PROJECT_RESULT_CACHE_MB')
+        max_bytes = int(max_megabytes * (1 << 20)) if max_megabytes is not None else DEFAULT_MAX_BYTES
+        return ResultCache(os.path.join(DataLoader().cache_dir, 'results'), max_bytes)
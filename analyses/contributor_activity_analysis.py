@@ -1,12 +1,16 @@
 import argparse
-from typing import List, Dict
+import os
+from typing import Any, Dict, List, Set
 
-import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
 
-from analyses.base_analysis import BaseAnalysis
+from analyses.base_analysis import BaseAnalysis, positive_int
 from data_loader import DataLoader
-from models.Issue import Issue
+from models.ActivityCounts import ActivityCounts
+from models.IssueFilter import IssueFilter
+from models.IssueStore import IssueStore
+from util import figures, memory_budget, profiler
 from util.builders import ArgInfoBuilder
 
 
@@ -20,6 +24,21 @@ class ContributorActivityAnalysis(BaseAnalysis):
             .set_help('(Optional) focus analysis on a specific user')
             .build()
         )
+        self.granularity_arg = (ArgInfoBuilder()
+            .set_flags('--granularity')
+            .set_help('(Optional) time bucket to count events in: day, week, month or quarter (default: month)')
+            .build()
+        )
+        self.top_authors_arg = (ArgInfoBuilder()
+            .set_flags('--top-authors')
+            .set_help('(Optional) the number of most active contributors to show (default: 5)')
+            .build()
+        )
+        self.window_arg = (ArgInfoBuilder()
+            .set_flags('--window')
+            .set_help('(Optional) the number of time buckets to smooth over (default: 3)')
+            .build()
+        )
 
     @property
     def feature_id(self) -> int:
@@ -38,40 +57,147 @@ class ContributorActivityAnalysis(BaseAnalysis):
             required=False,
             help=self.user_arg.help
         )
+        parser.add_argument(
+            self.granularity_arg.flags,
+            choices=ActivityCounts.GRANULARITIES,
+            default='month',
+            required=False,
+            help=self.granularity_arg.help
+        )
+        parser.add_argument(
+            self.top_authors_arg.flags,
+            type=positive_int,
+            default=5,
+            required=False,
+            help=self.top_authors_arg.help
+        )
+        parser.add_argument(
+            self.window_arg.flags,
+            type=positive_int,
+            default=3,
+            required=False,
+            help=self.window_arg.help
+        )
 
     def get_arguments_info(self) -> List[Dict[str, str]]:
-        return [self.user_arg]
-
-    def run(self, args):
-        issues: List[Issue] = DataLoader().get_issues()
-        df = self.__create_dataframe(issues, args.user)
-        aggregated = self.__aggregate(df)
-        self.__visualize_results(df, aggregated)
-
-    def __create_dataframe(self, issues, user_filter) -> pd.DataFrame:
-        data = []
-        for issue in issues:
-            for event in issue.events:
-                data.append({'author': event.author, 'event_date': event.event_date})
-        df = pd.DataFrame(data)
-        df['event_date'] = pd.to_datetime(df['event_date'])
+        return [self.user_arg, self.granularity_arg, self.top_authors_arg, self.window_arg]
+
+    def required_fields(self) -> Set[str]:
+        return {'events.author', 'events.event_date'}
+
+    def drawing_arguments(self) -> Set[str]:
+        return {'window'}
+
+    def run(self, args) -> Dict[str, Any]:
+        result = self.cached_result(args, lambda: self.__compute(args))
+        activity = self.__from_result(result)
+        self.__print_activity(activity)
+        if figures.enabled():
+            with profiler.stage('visualize'):
+                self.__visualize_results(activity, range(len(activity.authors)), args.window)
+        return result
+
+    def compare(self, results: Dict[str, Dict[str, Any]], args) -> Dict[str, Any]:
+        # The events of each dataset's most active contributors together,
+        # smoothed like their separate lines
+        activity = {}
+        for name, result in results.items():
+            counts = self.__from_result(result)
+            events = counts.counts.sum(axis=0) if len(counts.authors) else np.zeros(len(counts.starts), dtype=np.int64)
+            activity[name] = pd.Series(events, index=pd.DatetimeIndex(counts.starts))
+
+        print(f'Events of the top {args.top_authors} contributors per dataset:')
+        for name, events in activity.items():
+            busiest = events.idxmax().date() if len(events) else None
+            print(f'{name}: {int(events.sum())} events, busiest {args.granularity} starting {busiest}')
+
+        if figures.enabled():
+            with profiler.stage('visualize'):
+                self.__visualize_comparison(activity, args.window)
+
+        return {
+            name: {'buckets': [str(start.date()) for start in events.index], 'events': events.tolist()}
+            for name, events in activity.items()
+        }
+
+    def __compute(self, args) -> Dict[str, Any]:
+        store: IssueStore = DataLoader().load_store(
+            self.required_fields(),
+            IssueFilter(participant=args.user)
+        )
+        with profiler.stage('count_activity'):
+            activity = self.__count_activity(store, args.user, args.granularity)
+        with profiler.stage('aggregate'):
+            top_authors = self.__aggregate(activity, args.top_authors)
+        return {
+            'granularity': args.granularity,
+            'buckets': [str(start) for start in activity.starts],
+            'authors': {
+                activity.authors[row]: {
+                    'total': int(activity.totals()[row]),
+                    'events': activity.counts[row].tolist(),
+                }
+                for row in top_authors
+            },
+        }
+
+    def __from_result(self, result: Dict[str, Any]) -> ActivityCounts:
+        """
+        The counts of the most active authors, most active first, back from
+        the results.
+        """
+        authors = list(result['authors'])
+        counts = np.array(
+            [result['authors'][author]['events'] for author in authors], dtype=np.int64
+        ).reshape(len(authors), len(result['buckets']))
+        starts = np.array(result['buckets'], dtype='datetime64[D]')
+        return ActivityCounts(counts, authors, starts, result['granularity'])
+
+    def __print_activity(self, activity: ActivityCounts):
+        print(f'Most active contributors (events per {activity.granularity}):')
+        totals = activity.totals()
+        for row, author in enumerate(activity.authors):
+            busiest = activity.starts[np.argmax(activity.counts[row])] if len(activity.starts) else None
+            print(f'{author}: {int(totals[row])} events, busiest {activity.granularity} starting {busiest}')
+
+    def __count_activity(self, store: IssueStore, user_filter, granularity) -> ActivityCounts:
+        # Over the memory budget, the counts are spilled to the cache directory
+        budget = memory_budget.get_budget()
+        max_bytes, spill_dir = None, None
+        if budget is not None:
+            max_bytes = max(budget - store.nbytes(), 0)
+            spill_dir = DataLoader().cache_dir
+            os.makedirs(spill_dir, exist_ok=True)
+        activity = ActivityCounts.from_store(store, granularity, max_bytes, spill_dir)
         if user_filter:
-            df = df[df['author'] == user_filter]
-        return df
-
-    def __aggregate(self, df):
-        df.set_index('event_date', inplace=True)
-        return df.groupby(['author', pd.Grouper(freq='M')]).size().reset_index(name='event_count')
-
-    def __visualize_results(self, df, aggregated):
-        top_authors = df['author'].value_counts().head(5).index
-        for author in top_authors:
-            author_data = aggregated[aggregated['author'] == author].sort_values('event_date')
-            # Apply smoothing using a rolling average with a window of 3 months
-            author_data['smoothed_event_count'] = author_data['event_count'].rolling(window=3, min_periods=1).mean()
-            plt.plot(author_data['event_date'], author_data['smoothed_event_count'], label=author)
+            activity = activity.select([user_filter])
+        return activity
+
+    def __aggregate(self, activity: ActivityCounts, top_n):
+        """
+        Rows of the most active authors, most active first.
+        """
+        return activity.top_authors(top_n)
+
+    def __visualize_results(self, activity: ActivityCounts, top_authors, window):
+        plt = figures.pyplot()
+        # Smoothing with a rolling average over the last window buckets
+        smoothed = activity.smoothed(window)
+        for row in top_authors:
+            plt.plot(activity.starts, smoothed[row], label=activity.authors[row])
         plt.xlabel('Date')
         plt.ylabel('Number of Events (Smoothed)')
         plt.title('Contributor Activity Over Time (Smoothed)')
         plt.legend()
-        plt.show()
\ No newline at end of file
+        figures.show(self.name())
+
+    def __visualize_comparison(self, activity: Dict[str, pd.Series], window):
+        plt = figures.pyplot()
+        for name, events in activity.items():
+            smoothed = events.rolling(window=window, min_periods=1).mean()
+            plt.plot(smoothed.index, smoothed.values, label=name)
+        plt.xlabel('Date')
+        plt.ylabel('Number of Events (Smoothed)')
+        plt.title('Activity of the Top Contributors per Dataset (Smoothed)')
+        plt.legend(title='Dataset')
+        figures.show(f'{self.name()}Comparison')
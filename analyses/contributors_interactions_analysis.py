@@ -1,14 +1,19 @@
 import argparse
+import os
 import sys
-from typing import List, Dict
+from typing import Any, Dict, List, Set
 
-import matplotlib.pyplot as plt
 import networkx as nx
 
-from analyses.base_analysis import BaseAnalysis
+import config
+from analyses.base_analysis import BaseAnalysis, non_negative_int, positive_int
 from data_loader import DataLoader
-from models.Issue import Issue
+from models.InteractionGraph import InteractionGraph
+from models.IssueFilter import IssueFilter
+from models.IssueStore import IssueStore
+from util import figures, memory_budget, profiler
 from util.builders import ArgInfoBuilder
+from util.layout_cache import LayoutCache
 
 
 class ContributorsInteractionsAnalysis(BaseAnalysis):
@@ -16,6 +21,13 @@ class ContributorsInteractionsAnalysis(BaseAnalysis):
     1. Analyzes and visualizes the interaction network between contributors based on issue comments and events.
     2. Identifies key contributors, collaboration patterns, and community structure within the project.
     """
+
+    # Centrality metrics that contributors can be ranked by, with their titles
+    CENTRALITIES = {
+        'degree': 'Degree Centrality',
+        'betweenness': 'Betweenness Centrality',
+        'pagerank': 'PageRank',
+    }
     
     def __init__(self):
         self.label_arg = (ArgInfoBuilder()
@@ -28,6 +40,31 @@ class ContributorsInteractionsAnalysis(BaseAnalysis):
             .set_help('(Optional) focus analysis on a specific user')
             .build()
         )
+        self.max_nodes_arg = (ArgInfoBuilder()
+            .set_flags('--max-nodes')
+            .set_help('(Optional) draw only the contributors with the most interactions, 0 draws all (default: 500)')
+            .build()
+        )
+        self.min_weight_arg = (ArgInfoBuilder()
+            .set_flags('--min-weight')
+            .set_help('(Optional) draw only interactions of at least this weight, 0 draws all')
+            .build()
+        )
+        self.centrality_arg = (ArgInfoBuilder()
+            .set_flags('--centrality')
+            .set_help('(Optional) metric to rank contributors by: degree, betweenness or pagerank (default: degree)')
+            .build()
+        )
+        self.pivots_arg = (ArgInfoBuilder()
+            .set_flags('--pivots')
+            .set_help('(Optional) approximate betweenness from this many sampled contributors')
+            .build()
+        )
+        self.communities_arg = (ArgInfoBuilder()
+            .set_flags('--communities')
+            .set_help('(Optional) detect communities of contributors and color them')
+            .build()
+        )
 
     @property
     def feature_id(self) -> int:
@@ -54,77 +91,241 @@ class ContributorsInteractionsAnalysis(BaseAnalysis):
             required=False,
             help=self.user_arg.help
         )
+        parser.add_argument(
+            self.max_nodes_arg.flags,
+            type=non_negative_int,
+            default=500,
+            required=False,
+            help=self.max_nodes_arg.help
+        )
+        parser.add_argument(
+            self.min_weight_arg.flags,
+            type=non_negative_int,
+            required=False,
+            help=self.min_weight_arg.help
+        )
+        parser.add_argument(
+            self.centrality_arg.flags,
+            choices=list(self.CENTRALITIES),
+            default='degree',
+            required=False,
+            help=self.centrality_arg.help
+        )
+        parser.add_argument(
+            self.pivots_arg.flags,
+            type=positive_int,
+            required=False,
+            help=self.pivots_arg.help
+        )
+        parser.add_argument(
+            self.communities_arg.flags,
+            action='store_true',
+            help=self.communities_arg.help
+        )
 
     def get_arguments_info(self) -> List[Dict[str, str]]:
-        return [self.label_arg, self.user_arg]
+        return [
+            self.label_arg, self.user_arg, self.max_nodes_arg, self.min_weight_arg,
+            self.centrality_arg, self.pivots_arg, self.communities_arg
+        ]
+
+    def required_fields(self) -> Set[str]:
+        return {'labels', 'creator', 'events.author'}
+
+    def drawing_arguments(self) -> Set[str]:
+        return {'max_nodes', 'min_weight'}
+
+    def invalidate_drawings(self) -> int:
+        return self.__layout_cache().invalidate()
+
+    def run(self, args) -> Dict[str, Any]:
+        # The network built by __compute(), none if the results were cached
+        built = []
+        result = self.cached_result(args, lambda: self.__compute(args, built))
+        top_contributors = [tuple(entry) for entry in result['top_contributors']]
+        self.__print_top_contributors(top_contributors, args.centrality, args.pivots, result['contributors'])
+        communities = result.get('communities')
+        if communities is not None:
+            self.__print_communities(communities)
+        if figures.enabled():
+            with profiler.stage('visualize'):
+                # Drawing needs the network itself, which is cheap to rebuild
+                # compared to the metrics
+                graph = built[0] if built else self.__create_graph(self.__load_store(args))
+                drawn = self.__reduce_graph(graph, args.max_nodes, args.min_weight)
+                self.__visualize_results(drawn, result['scores'], top_contributors, args.centrality, communities)
+        return result
+
+    def compare(self, results: Dict[str, Dict[str, Any]], args) -> Dict[str, Any]:
+        comparison = {}
+        for name, result in results.items():
+            top = result['top_contributors']
+            comparison[name] = {
+                'contributors': result['contributors'],
+                'interactions': result['interactions'],
+                'top_contributor': top[0][0] if top else None,
+            }
+            if result.get('communities') is not None:
+                comparison[name]['communities'] = len(result['communities'])
 
-    def run(self, args):
-        issues: List[Issue] = DataLoader().get_issues()
-        graph = self.__create_graph(issues, args.label, args.user)
-        degree_centrality, top_contributors = self.__analyze_network(graph)
-        self.__visualize_results(graph, degree_centrality, top_contributors)
+        print('Contributor networks per dataset:')
+        for name, network in comparison.items():
+            line = (f"{name}: {network['contributors']} contributors, {network['interactions']} interactions, "
+                    f"top contributor by {self.CENTRALITIES[args.centrality]}: {network['top_contributor']}")
+            if 'communities' in network:
+                line += f", {network['communities']} communities"
+            print(line)
 
-    def __analyze_network(self, graph):
-        degree_centrality = nx.degree_centrality(graph)
-        top_contributors = sorted(degree_centrality.items(), key=lambda x: x[1], reverse=True)[:30]
+        if figures.enabled():
+            with profiler.stage('visualize'):
+                self.__visualize_comparison(comparison)
+        return comparison
 
-        print("Top Contributors by Degree Centrality:")
+    def __compute(self, args, built: List[InteractionGraph]) -> Dict[str, Any]:
+        """
+        Computes the results and appends the network to built, so that
+        drawing does not have to load and build it again.
+        """
+        store = self.__load_store(args)
+        if memory_budget.get_budget() is not None:
+            memory_budget.check(
+                'Building the interaction network', InteractionGraph.estimate_nbytes(store),
+                'Narrow it down with --label or --user, or use a larger budget.'
+            )
+        with profiler.stage('create_graph'):
+            graph = self.__create_graph(store)
+        built.append(graph)
+        with profiler.stage('analyze_network'):
+            scores, top_contributors = self.__analyze_network(graph, args.centrality, args.pivots)
+        result = {
+            'contributors': graph.number_of_nodes(),
+            'interactions': graph.number_of_edges(),
+            'centrality': args.centrality,
+            'scores': scores,
+            'top_contributors': [[contributor, score] for contributor, score in top_contributors],
+        }
+        if args.communities:
+            with profiler.stage('detect_communities'):
+                result['communities'] = graph.communities()
+        return result
+
+    def __load_store(self, args) -> IssueStore:
+        return DataLoader().load_store(
+            self.required_fields(),
+            IssueFilter(label=args.label, participant=args.user)
+        )
+
+    def __analyze_network(self, graph: InteractionGraph, centrality='degree', pivots=None):
+        if centrality == 'betweenness':
+            workers = config.get_parameter('workers', os.cpu_count() or 1)
+            scores = graph.betweenness_centrality(pivots=pivots, workers=workers)
+        elif centrality == 'pagerank':
+            scores = graph.pagerank()
+        else:
+            scores = graph.degree_centrality()
+        top_contributors = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:30]
+        return scores, top_contributors
+
+    def __print_top_contributors(self, top_contributors, centrality, pivots, num_contributors):
+        title = self.CENTRALITIES[centrality]
+        if centrality == 'betweenness' and pivots:
+            title += f' (approximated from {min(pivots, num_contributors)} pivots)'
+        print(f"Top Contributors by {title}:")
         for contributor, centrality_score in top_contributors:
             print(f"{contributor}: {centrality_score:.4f}")
 
-        return degree_centrality, top_contributors
-
-    def __create_graph(self, issues, label_filter, user_filter):
-        interactions = []
-        for issue in issues:
-            if label_filter and label_filter not in issue.labels:
-                continue
-
-            participants = self.__get_participants(issue)
-            if user_filter:
-                if user_filter not in participants:
-                    continue
-
-            # Create pairs of participants
-            for p1 in participants:
-                for p2 in participants:
-                    if p1 != p2:
-                        interactions.append((p1, p2))
-
-        graph = nx.Graph()
-        for c1, c2 in interactions:
-            if graph.has_edge(c1, c2):
-                graph[c1][c2]['weight'] += 1
-            else:
-                graph.add_edge(c1, c2, weight=1)
+    def __print_communities(self, communities: List[List[str]]):
+        print(f"Found {len(communities)} communities of contributors.")
+        for i, community in enumerate(communities[:10], start=1):
+            print(f"Community {i} ({len(community)} contributors): {', '.join(community[:10])}"
+                  + (', ...' if len(community) > 10 else ''))
+
+    def __create_graph(self, store: IssueStore) -> InteractionGraph:
+        # The loader already dropped the issues that do not match the label
+        # and user filters
+        graph = InteractionGraph.from_store(store)
         if graph.number_of_nodes() == 0:
             print("No interactions found for the specified filters.")
             sys.exit(1)
         return graph
 
-    def __get_participants(self, issue):
-        participants = set()
-        if issue.creator:
-            participants.add(issue.creator)
-        for event in issue.events:
-            if event.author:
-                participants.add(event.author)
-        return participants
+    def __reduce_graph(self, graph: InteractionGraph, max_nodes, min_weight) -> InteractionGraph:
+        """
+        Large networks take minutes to lay out and are unreadable when drawn
+        in full, so only the backbone of heavy interactions and/or the most
+        connected contributors are drawn.
+        """
+        drawn = graph
+        if min_weight:
+            drawn = drawn.backbone(min_weight)
+        if max_nodes:
+            drawn = drawn.top_nodes(max_nodes)
+        if drawn is not graph:
+            print(f"Drawing {drawn.number_of_nodes()} of {graph.number_of_nodes()} contributors "
+                  f"and {drawn.number_of_edges()} of {graph.number_of_edges()} interactions.")
+        return drawn
 
-    def __visualize_results(self, graph, degree_centrality, top_contributors):
+    def __layout(self, graph: InteractionGraph, nx_graph):
+        """
+        Spring layout of the graph. Positions are cached by the fingerprint
+        of the graph, so drawing the same network again skips the layout.
+        """
+        k, iterations = 0.15, 20
+        cache = None
+        if not config.get_parameter('no_cache'):
+            cache = self.__layout_cache()
+            key = f'{graph.fingerprint()}.{k}.{iterations}'
+            pos = cache.load(key)
+            if pos is not None:
+                return pos
+        pos = nx.spring_layout(nx_graph, k=k, iterations=iterations)
+        if cache is not None:
+            try:
+                cache.save(key, pos)
+            except OSError as e:
+                print(f'Could not write layout cache to {cache.cache_dir}: {e}')
+        return pos
+
+    def __layout_cache(self) -> LayoutCache:
+        return LayoutCache(os.path.join(DataLoader().cache_dir, 'layouts'))
+
+    def __visualize_results(self, graph: InteractionGraph, scores, top_contributors, centrality='degree', communities=None):
+        plt = figures.pyplot()
+        nx_graph = graph.to_networkx()
         plt.figure(figsize=(12, 12))
-        pos = nx.spring_layout(graph, k=0.15, iterations=20)
+        pos = self.__layout(graph, nx_graph)
 
-        node_sizes = [5000 * degree_centrality[node] for node in graph.nodes()]
-        nx.draw_networkx_nodes(graph, pos, node_size=node_sizes, node_color='skyblue', alpha=0.7)
+        # Degree centrality is at most 1, the other metrics are scaled to their maximum
+        scale = 1 if centrality == 'degree' else (max(scores.values()) or 1)
+        node_sizes = [5000 * scores[node] / scale for node in nx_graph.nodes()]
+        colors = {'node_color': 'skyblue'}
+        if communities:
+            community_of = {node: i for i, community in enumerate(communities) for node in community}
+            colors = {
+                'node_color': [community_of[node] % 20 for node in nx_graph.nodes()],
+                'cmap': plt.cm.tab20, 'vmin': 0, 'vmax': 19,
+            }
+        nx.draw_networkx_nodes(nx_graph, pos, node_size=node_sizes, alpha=0.7, **colors)
 
-        edge_widths = [graph[u][v]['weight'] * 0.1 for u, v in graph.edges()]
-        nx.draw_networkx_edges(graph, pos, width=edge_widths, alpha=0.5)
+        edge_widths = [nx_graph[u][v]['weight'] * 0.1 for u, v in nx_graph.edges()]
+        nx.draw_networkx_edges(nx_graph, pos, width=edge_widths, alpha=0.5)
 
-        labels = {node: node for node, _ in top_contributors}
-        nx.draw_networkx_labels(graph, pos, labels, font_size=12)
+        labels = {node: node for node, _ in top_contributors if node in pos}
+        nx.draw_networkx_labels(nx_graph, pos, labels, font_size=12)
 
         plt.title("Contributor Interaction Network")
         plt.axis('off')
         plt.tight_layout()
-        plt.show()
\ No newline at end of file
+        figures.show(self.name())
+
+    def __visualize_comparison(self, comparison):
+        plt = figures.pyplot()
+        names = list(comparison)
+        _, axes = plt.subplots(1, 2, figsize=(12, 6))
+        for ax, key in zip(axes, ['contributors', 'interactions']):
+            ax.bar(names, [comparison[name][key] for name in names])
+            ax.set_xlabel('Dataset')
+            ax.set_ylabel(f'Number of {key.capitalize()}')
+        plt.suptitle('Contributor Interaction Networks per Dataset')
+        plt.tight_layout()
+        figures.show(f'{self.name()}Comparison')
@@ -1,13 +1,13 @@
 import argparse
 import sys
-from typing import List, Dict
+from typing import Any, Dict, List, Set
 
-import matplotlib.pyplot as plt
 import pandas as pd
 
-from analyses.base_analysis import BaseAnalysis
+from analyses.base_analysis import BaseAnalysis, counts_per_dataset
 from data_loader import DataLoader
-from models.Issue import Issue
+from models.IssueFrames import IssueFrames
+from util import figures, profiler
 from util.builders import ArgInfoBuilder
 
 
@@ -45,39 +45,74 @@ class ReopenedIssueAnalysis(BaseAnalysis):
     def get_arguments_info(self) -> List[Dict[str, str]]:
         return [self.labels_arg]
 
-    def run(self, args):
-        issues: List[Issue] = DataLoader().get_issues()
-        df = self.__create_dataframe(issues)
-        aggregated = self.__aggregate(df, args.labels)
+    def required_fields(self) -> Set[str]:
+        return {'labels', 'events.event_type'}
 
-        print('Labels associated with the most reopened issues:')
-        print(aggregated)
-
-        self.__visualize_results(aggregated)
+    def drawing_arguments(self) -> Set[str]:
+        # The results hold the counts of every reopened label
+        return {'labels'}
 
-    def __create_dataframe(self, issues) -> pd.DataFrame:
-        data = []
+    def run(self, args) -> Dict[str, Any]:
+        result = self.cached_result(args, lambda: self.__compute(args))
+        reopen_count = result['reopen_count']
+        aggregated = pd.DataFrame({'labels': list(reopen_count), 'reopen_count': list(reopen_count.values())})
+        aggregated = aggregated.head(args.labels)
 
-        for issue in issues:
-            reopen_count = sum(1 for event in issue.events if event and event.event_type == 'reopened')
-            if reopen_count > 0:
-                data.append({
-                    'labels': issue.labels,
-                    'reopen_count': reopen_count
-                })
+        print('Labels associated with the most reopened issues:')
+        print(aggregated)
 
-        df = pd.DataFrame(data)
-        if df.empty:
+        if figures.enabled():
+            with profiler.stage('visualize'):
+                self.__visualize_results(aggregated)
+
+        return result
+
+    def compare(self, results: Dict[str, Dict[str, Any]], args) -> Dict[str, Any]:
+        # One column per dataset, labels ordered by their total reopens.
+        # The results only hold labels of reopened issues, so a missing
+        # label was not reopened in that dataset
+        reopen_counts = counts_per_dataset(results, 'reopen_count', args.labels, fill_value=0)
+
+        print('Labels associated with the most reopened issues per dataset:')
+        print(reopen_counts)
+
+        if figures.enabled():
+            with profiler.stage('visualize'):
+                self.__visualize_comparison(reopen_counts)
+
+        return {'reopen_count': {
+            name: {label: int(n) for label, n in counts.dropna().items()}
+            for name, counts in reopen_counts.items()
+        }}
+
+    def __compute(self, args) -> Dict[str, Any]:
+        frames: IssueFrames = DataLoader().get_frames(self.required_fields())
+        with profiler.stage('create_dataframe'):
+            df = self.__create_dataframe(frames)
+        with profiler.stage('aggregate'):
+            aggregated = self.__aggregate(df)
+        return {'reopen_count': {str(label): int(n) for label, n in zip(aggregated['labels'], aggregated['reopen_count'])}}
+
+    def __create_dataframe(self, frames: IssueFrames) -> pd.DataFrame:
+        reopen_count = frames.event_counts('reopened')
+        if not reopen_count.any():
             print('No reopened issues found for the specified label.')
             sys.exit(1)
 
-        return df.explode('labels')
+        # One row per label of a reopened issue
+        issue_labels = frames.issue_labels
+        df = pd.DataFrame({
+            'labels': issue_labels['label'],
+            'reopen_count': reopen_count[issue_labels['issue'].to_numpy()],
+        })
+        return df[df['reopen_count'] > 0]
 
-    def __aggregate(self, df, number_of_labels: int):
-        aggregated = df.groupby('labels')['reopen_count'].sum().reset_index()
-        return aggregated.sort_values(by='reopen_count', ascending=False).head(number_of_labels)
+    def __aggregate(self, df):
+        aggregated = df.groupby('labels', observed=True)['reopen_count'].sum().reset_index()
+        return aggregated.sort_values(by='reopen_count', ascending=False, kind='stable')
 
     def __visualize_results(self, aggregated):
+        plt = figures.pyplot()
         plt.figure(figsize=(12, 6))
         plt.bar(aggregated['labels'], aggregated['reopen_count'])
         plt.xlabel('Label')
@@ -85,4 +120,15 @@ class ReopenedIssueAnalysis(BaseAnalysis):
         plt.title('Issue Labels vs. Reopen Counts')
         plt.xticks(rotation=45)
         plt.tight_layout()
-        plt.show()
\ No newline at end of file
+        figures.show(self.name())
+
+    def __visualize_comparison(self, reopen_counts: pd.DataFrame):
+        plt = figures.pyplot()
+        reopen_counts.astype('float64').plot(kind='bar', figsize=(12, 6))
+        plt.xlabel('Label')
+        plt.ylabel('Number of Reopens')
+        plt.title('Issue Labels vs. Reopen Counts per Dataset')
+        plt.xticks(rotation=45)
+        plt.legend(title='Dataset')
+        plt.tight_layout()
+        figures.show(f'{self.name()}Comparison')
@@ -0,0 +1,241 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+import analyses
+import config
+import data_loader
+from benchmarks.generate import SIZES, parse_size, write_dataset
+from data_loader import DataLoader
+
+'''
+Benchmarks loading and the analyses on generated datasets (see
+benchmarks/generate.py) and compares them against stored baselines.
+
+Every stage is timed (best of --repeat runs) and, in a separate run,
+memory-profiled with tracemalloc, which reports the peak of the memory
+allocated by the stage (numpy and pandas buffers included):
+    load.parse        parsing the data file, bypassing the dataset cache
+    load.cache        loading the dataset from the dataset cache
+    feature<N>        computing the results of feature N (no figure)
+    feature<N>.render printing and drawing the cached results of feature N
+                      to a PNG file
+
+    python -m benchmarks.bench --sizes 1k,10k
+    python -m benchmarks.bench --sizes 1k,10k --update-baselines
+
+The exit status is 1 if a stage regressed beyond the thresholds.
+'''
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+BASELINES_VERSION = 1
+
+# Timing differences below this are noise, whatever the ratio
+_MIN_SECONDS = 0.05
+_MIN_MB = 1.0
+
+
+def measure(stage: Callable[[], Any], setup: Callable[[], Any] = None, repeat: int = 3) -> Dict[str, float]:
+    """
+    Runs setup() and then stage() repeat times and once more under
+    tracemalloc. Returns the best time in seconds, as 'seconds', and the
+    peak memory allocated by the stage in megabytes, as 'peak_mb'.
+    Only stage() is measured.
+    """
+    best = None
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        stage()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    try:
+        stage()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'seconds': round(best, 4), 'peak_mb': round(peak / (1 << 20), 2)}
+
+
+def run_benchmarks(data_path: str, feature_ids: List[int], repeat: int = 3) -> Dict[str, Dict[str, float]]:
+    """
+    Measures every stage on the given data file. Caches are written to a
+    temporary directory, so earlier runs do not affect the measurements.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp, config.override_parameters({
+        'ENPM611_PROJECT_DATA_PATH': data_path,
+        'ENPM611_PROJECT_CACHE_DIR': os.path.join(tmp, 'cache'),
+    }):
+        with config.override_parameters({'no_cache': True}):
+            results['load.parse'] = measure(_load, data_loader.unload, repeat)
+        # Populate the dataset cache
+        data_loader.unload()
+        _load()
+        results['load.cache'] = measure(_load, data_loader.unload, repeat)
+
+        for feature_id in feature_ids:
+            feature = analyses.FEATURES[feature_id].load()
+            args = _default_arguments(feature)
+
+            def setup(drop_results: bool):
+                data_loader.unload()
+                _load()
+                if drop_results:
+                    feature.result_cache().invalidate([feature_id])
+
+            with config.override_parameters({'no_plot': True}):
+                results[f'feature{feature_id}'] = measure(
+                    lambda: _quiet(feature.run, args), lambda: setup(True), repeat
+                )
+            # The results are cached now, so only printing and drawing remain
+            with config.override_parameters({'output': os.path.join(tmp, 'figures')}):
+                results[f'feature{feature_id}.render'] = measure(
+                    lambda: _quiet(feature.run, args), lambda: setup(False), repeat
+                )
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            time_threshold: float, memory_threshold: float) -> List[str]:
+    """
+    Returns a description of every stage that is slower, or needs more
+    memory, than its baseline by more than the threshold ratio.
+    """
+    regressions = []
+    for stage, measured in results.items():
+        expected = baseline.get(stage)
+        if expected is None:
+            continue
+        seconds, base_seconds = measured['seconds'], expected['seconds']
+        if seconds > base_seconds * time_threshold and seconds - base_seconds > _MIN_SECONDS:
+            regressions.append(f'{stage}: {seconds:.3f}s vs. {base_seconds:.3f}s baseline')
+        peak, base_peak = measured['peak_mb'], expected['peak_mb']
+        if peak > base_peak * memory_threshold and peak - base_peak > _MIN_MB:
+            regressions.append(f'{stage}: {peak:.1f} MB vs. {base_peak:.1f} MB baseline')
+    return regressions
+
+
+def read_baselines(path: str) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """
+    The stored baselines by size name and stage, empty if there are none.
+    """
+    try:
+        with open(path, 'r') as fin:
+            baselines = json.load(fin)
+    except FileNotFoundError:
+        return {}
+    if baselines.get('version') != BASELINES_VERSION:
+        raise ValueError(f"Unsupported baselines version {baselines.get('version')} in {path}")
+    return baselines['sizes']
+
+
+def write_baselines(path: str, sizes: Dict[str, Dict[str, Dict[str, float]]]):
+    with open(path, 'w') as fout:
+        json.dump({'version': BASELINES_VERSION, 'sizes': sizes}, fout, indent=2, sort_keys=True)
+        fout.write('\n')
+
+
+def _load():
+    _quiet(DataLoader().get_store)
+
+
+def _default_arguments(feature) -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    feature.add_arguments(parser)
+    return parser.parse_args([])
+
+
+def _quiet(function, *args):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return function(*args)
+
+
+def _size_name(num_issues: int) -> str:
+    names = {n: name for name, n in SIZES.items()}
+    return names.get(num_issues, str(num_issues))
+
+
+def _print_results(size: str, results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]]):
+    print(f'\n{size} issues')
+    print(f"{'stage':<20} {'seconds':>9} {'baseline':>9} {'peak MB':>9} {'baseline':>9}")
+    for stage, measured in results.items():
+        expected = baseline.get(stage, {})
+        print(f"{stage:<20} {measured['seconds']:>9.3f} {expected.get('seconds', float('nan')):>9.3f} "
+              f"{measured['peak_mb']:>9.1f} {expected.get('peak_mb', float('nan')):>9.1f}")
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark loading and the analyses on generated datasets.')
+    parser.add_argument('--sizes', default='1k,10k',
+                        help=f"Comma separated dataset sizes: {', '.join(SIZES)} or numbers of issues (default: 1k,10k)")
+    parser.add_argument('--features', default='all',
+                        help="Comma separated feature IDs, or 'all' (default: all)")
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per stage, the best counts (default: 3)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the generated datasets (default: 0)')
+    parser.add_argument('--data-dir',
+                        help='Keep the generated datasets in this directory and reuse them (default: a temporary directory)')
+    parser.add_argument('--baselines', default=BASELINES_PATH, help='Baselines file (default: benchmarks/baselines.json)')
+    parser.add_argument('--update-baselines', action='store_true',
+                        help='Store the measurements as the new baselines instead of comparing')
+    parser.add_argument('--time-threshold', type=float, default=1.5,
+                        help='Slowdown ratio that counts as a regression (default: 1.5)')
+    parser.add_argument('--memory-threshold', type=float, default=1.25,
+                        help='Memory growth ratio that counts as a regression (default: 1.25)')
+    parser.add_argument('--json', help='Also write the measurements to this file')
+    args = parser.parse_args(argv)
+
+    sizes = [parse_size(size) for size in args.sizes.split(',')]
+    if args.features == 'all':
+        feature_ids = sorted(analyses.FEATURES)
+    else:
+        feature_ids = [int(fid) for fid in args.features.split(',')]
+    baselines = read_baselines(args.baselines)
+
+    measurements, regressions = {}, []
+    with contextlib.ExitStack() as stack:
+        data_dir = args.data_dir or stack.enter_context(tempfile.TemporaryDirectory())
+        os.makedirs(data_dir, exist_ok=True)
+        for num_issues in sizes:
+            size = _size_name(num_issues)
+            data_path = os.path.join(data_dir, f'issues-{size}-{args.seed}.json')
+            if not os.path.exists(data_path):
+                print(f'Generating {num_issues} issues in {data_path}...')
+                write_dataset(data_path, num_issues, args.seed)
+            results = run_benchmarks(data_path, feature_ids, args.repeat)
+            measurements[size] = results
+            _print_results(size, results, baselines.get(size, {}))
+            regressions += [f'{size}: {r}' for r in compare(
+                results, baselines.get(size, {}), args.time_threshold, args.memory_threshold
+            )]
+
+    if args.json:
+        with open(args.json, 'w') as fout:
+            json.dump(measurements, fout, indent=2)
+    if args.update_baselines:
+        write_baselines(args.baselines, dict(baselines, **measurements))
+        print(f'\nUpdated the baselines in {args.baselines}.')
+        return 0
+    if regressions:
+        print('\nRegressions:')
+        for regression in regressions:
+            print(f'  {regression}')
+        return 1
+    print('\nNo regressions.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
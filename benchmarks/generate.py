@@ -0,0 +1,171 @@
+import argparse
+import json
+from datetime import datetime, timezone
+from typing import Iterator, List
+
+import numpy as np
+
+'''
+Generates synthetic issue data shaped like poetry_issues.json, for
+benchmarking at sizes the real export does not reach. Authors, labels and
+the number of events per issue follow Zipf distributions, like in real
+projects where a few maintainers and labels account for most of the
+activity and most issues only get a handful of events.
+'''
+
+# Benchmark sizes by name
+SIZES = {'1k': 1_000, '10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+
+LABELS = [
+    'kind/bug', 'status/triage', 'kind/feature', 'status/duplicate', 'area/installer',
+    'area/solver', 'area/docs', 'kind/question', 'area/cli', 'status/confirmed',
+    'area/build-system', 'area/venv', 'status/waiting-on-response', 'area/config',
+    'area/publishing', 'area/windows', 'kind/enhancement', 'area/plugin-api',
+    'status/wontfix', 'area/lock', 'area/error-handling', 'area/sources',
+    'good first issue', 'area/ux', 'area/show', 'area/deps', 'kind/regression',
+    'area/python-version', 'status/needs-reproduction', 'area/testing',
+]
+
+# Event types with their share of all events
+EVENT_TYPES = {
+    'commented': 0.55, 'labeled': 0.12, 'mentioned': 0.07, 'subscribed': 0.06,
+    'closed': 0.07, 'assigned': 0.04, 'unlabeled': 0.03, 'referenced': 0.03,
+    'reopened': 0.02, 'renamed': 0.01,
+}
+
+_WORDS = (
+    'poetry install lock dependency resolver version package python environment '
+    'error update build wheel source index cache virtualenv plugin config path '
+    'when after with fails works expected actual please see also the a it this'
+).split()
+
+# Exponents of the Zipf distributions
+_AUTHOR_EXPONENT = 1.1
+_LABEL_EXPONENT = 1.0
+_EVENTS_EXPONENT = 1.6
+_MAX_EVENTS = 300
+
+_START = int(datetime(2018, 1, 1, tzinfo=timezone.utc).timestamp())
+_END = int(datetime(2024, 12, 31, tzinfo=timezone.utc).timestamp())
+_CHUNK_SIZE = 10_000
+
+
+def parse_size(value: str) -> int:
+    """
+    Number of issues of a benchmark size: a name from SIZES or a number.
+    """
+    if value.lower() in SIZES:
+        return SIZES[value.lower()]
+    try:
+        return int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size: '{value}'")
+
+
+def zipf_weights(n: int, exponent: float) -> np.ndarray:
+    """
+    Probabilities of the ranks 1..n under a Zipf distribution.
+    """
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    return weights / weights.sum()
+
+
+def generate_issues(num_issues: int, seed: int = 0) -> Iterator[dict]:
+    """
+    Yields num_issues issue records. The same seed yields the same records.
+    """
+    rng = np.random.default_rng(seed)
+    # Larger projects have more contributors
+    users = [f'user{i}' for i in range(max(50, num_issues // 4))]
+    author_weights = zipf_weights(len(users), _AUTHOR_EXPONENT)
+    label_weights = zipf_weights(len(LABELS), _LABEL_EXPONENT)
+    event_types = list(EVENT_TYPES)
+    event_weights = np.array(list(EVENT_TYPES.values()))
+    event_weights /= event_weights.sum()
+
+    for first in range(0, num_issues, _CHUNK_SIZE):
+        size = min(_CHUNK_SIZE, num_issues - first)
+        creators = rng.choice(len(users), size, p=author_weights)
+        created = np.sort(rng.integers(_START, _END, size))
+        num_labels = np.minimum(rng.poisson(1.2, size), 5)
+        num_events = np.minimum(rng.zipf(_EVENTS_EXPONENT, size) - 1, _MAX_EVENTS)
+        total_events = int(num_events.sum())
+        authors = rng.choice(len(users), total_events, p=author_weights)
+        types = rng.choice(len(event_types), total_events, p=event_weights)
+        # Events follow each other after exponentially distributed gaps
+        gaps = rng.exponential(3 * 86_400, total_events).astype(np.int64)
+        event_labels = rng.choice(len(LABELS), total_events, p=label_weights)
+
+        offset = 0
+        for i in range(size):
+            number = first + i + 1
+            labels = _unique(rng.choice(len(LABELS), num_labels[i], p=label_weights))
+            events, state, date = [], 'open', int(created[i])
+            for j in range(offset, offset + num_events[i]):
+                date += int(gaps[j])
+                event_type = event_types[types[j]]
+                event = {
+                    'event_type': event_type,
+                    'author': users[authors[j]],
+                    'event_date': _format_date(date),
+                }
+                if event_type in ('labeled', 'unlabeled'):
+                    event['label'] = LABELS[event_labels[j]]
+                elif event_type == 'commented':
+                    event['comment'] = _sentence(rng, 20)
+                elif event_type in ('closed', 'reopened'):
+                    state = 'closed' if event_type == 'closed' else 'open'
+                events.append(event)
+            offset += num_events[i]
+
+            yield {
+                'url': f'https://github.com/python-poetry/poetry/issues/{number}',
+                'creator': users[creators[i]],
+                'labels': [LABELS[label] for label in labels],
+                'state': state,
+                'assignees': [users[a] for a in _unique(rng.choice(len(users), rng.integers(0, 2, endpoint=True), p=author_weights))],
+                'title': _sentence(rng, 8),
+                'text': _sentence(rng, 60),
+                'number': number,
+                'created_date': _format_date(int(created[i])),
+                'updated_date': _format_date(date),
+                'timeline_url': f'https://api.github.com/repos/python-poetry/poetry/issues/{number}/timeline',
+                'events': events,
+            }
+
+
+def write_dataset(path: str, num_issues: int, seed: int = 0):
+    """
+    Writes num_issues generated issues to path as a JSON array, one issue
+    at a time.
+    """
+    with open(path, 'w') as fout:
+        fout.write('[')
+        for i, issue in enumerate(generate_issues(num_issues, seed)):
+            fout.write(',\n' if i else '\n')
+            json.dump(issue, fout)
+        fout.write('\n]\n')
+
+
+def _unique(values: np.ndarray) -> List[int]:
+    # Keeps the first occurrence, in order
+    return list(dict.fromkeys(values.tolist()))
+
+
+def _sentence(rng: np.random.Generator, num_words: int) -> str:
+    return ' '.join(_WORDS[w] for w in rng.integers(0, len(_WORDS), num_words))
+
+
+def _format_date(timestamp: int) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate synthetic issue data shaped like poetry_issues.json.')
+    parser.add_argument('--issues', '-n', type=parse_size, default='10k',
+                        help=f"Number of issues, or one of {', '.join(SIZES)} (default: 10k)")
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    parser.add_argument('--output', '-o', required=True, help='Path of the JSON file to write')
+    args = parser.parse_args()
+    write_dataset(args.output, args.issues, args.seed)
+    print(f'Wrote {args.issues} issues to {args.output}.')
@@ -0,0 +1,134 @@
+import argparse
+import contextlib
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+import analyses
+import config
+import data_loader
+from data_loader import DataLoader
+from util import figures, memory_budget, profiler
+
+'''
+Runs features on several datasets, e.g. the issues of several repositories,
+and compares their results (run.py --dataset NAME=PATH ...). Every dataset
+is loaded and analyzed in its own worker process, so the datasets are
+processed concurrently. The output of each dataset is printed as one block,
+followed by one comparison per feature that puts the results of the
+datasets side by side in a single table and figure.
+
+With --output, the figures of each dataset are written to
+<output>/<dataset name>, next to the comparison figures. Otherwise only the
+comparison figures are drawn, since the workers cannot show windows.
+'''
+
+
+def parse_dataset(value: str) -> Tuple[str, str]:
+    """
+    Parses NAME=PATH into (name, path). Without a name, the file name of
+    the path without its extension is the name.
+
+    Raises:
+        ValueError: If the path is empty.
+    """
+    name, separator, path = value.partition('=')
+    if not separator:
+        name, path = '', value
+    if not path:
+        raise ValueError(f"invalid dataset: '{value}'")
+    if not name:
+        name = os.path.splitext(os.path.basename(os.path.normpath(path)))[0]
+    return name, path
+
+
+def run(datasets: List[Tuple[str, str]], feature_ids: List[int], args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Runs the features on every (name, path) dataset and compares their
+    results. Returns the results of every dataset by name and feature id,
+    as 'datasets', and the comparisons by feature id, as 'comparison'.
+    The names must be distinct, which run.py checks when parsing --dataset.
+    """
+    names = [name for name, _ in datasets]
+
+    # When profiling, the datasets are analyzed one after the other in this
+    # process so that their stages are measured
+    workers = 1
+    if len(datasets) > 1 and not profiler.enabled():
+        workers = min(len(datasets), config.get_parameter('workers') or os.cpu_count() or 1)
+    # Concurrent workers share the memory budget
+    budget = memory_budget.get_budget()
+    if budget is not None:
+        budget //= workers
+
+    if workers <= 1:
+        outcomes = [_analyze_dataset(name, path, feature_ids, args, budget) for name, path in datasets]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(_analyze_dataset, name, path, feature_ids, args, budget)
+                for name, path in datasets
+            ]
+            outcomes = [future.result() for future in futures]
+
+    results = {}
+    for name, outcome in zip(names, outcomes):
+        print(f'=== {name} ===')
+        print(outcome['output'], end='')
+        results[name] = outcome['results']
+
+    comparison = {}
+    for feature_id in feature_ids:
+        feature = analyses.FEATURES[feature_id]
+        compared = {name: results[name][feature_id] for name in names if results[name][feature_id] is not None}
+        print(f'\n=== {feature.name()}: comparison ===')
+        if len(compared) < 2:
+            print('Not enough results to compare.')
+            continue
+        with profiler.stage(f'{feature.name()}.compare'):
+            comparison[feature_id] = feature.compare(compared, args)
+    return {'datasets': results, 'comparison': comparison}
+
+
+def _analyze_dataset(name: str, path: str, feature_ids: List[int], args: argparse.Namespace,
+                     budget: int = None) -> Dict[str, Any]:
+    """
+    Runs the features on one dataset and returns what they printed, as
+    'output', and their results by feature id, as 'results'. The result
+    of a feature that stopped with an error is None, as are the results
+    of every feature when the dataset cannot be read.
+    """
+    parameters = {'ENPM611_PROJECT_DATA_PATH': path}
+    if figures.output_dir():
+        parameters['output'] = os.path.join(figures.output_dir(), name)
+    else:
+        parameters['no_plot'] = True
+    if budget is not None:
+        parameters['max_memory'] = budget
+
+    results = {}
+    output = io.StringIO()
+    with config.override_parameters(parameters), contextlib.redirect_stdout(output), profiler.stage(name):
+        # A dataset loaded before belongs to another path
+        data_loader.unload()
+        try:
+            features = [analyses.FEATURES[feature_id] for feature_id in feature_ids]
+            if len(features) > 1 and not config.get_parameter('stream'):
+                # Load once with every field the features need
+                DataLoader().get_store(analyses.required_fields(features))
+            for feature in features:
+                try:
+                    with profiler.stage(feature.name()):
+                        results[feature.feature_id] = feature.run(args)
+                except SystemExit:
+                    # The feature printed why it stopped
+                    results[feature.feature_id] = None
+        except OSError as e:
+            # E.g. the data path does not exist. The other datasets are
+            # still analyzed and compared.
+            print(f'Error: {e}')
+            results = {feature_id: None for feature_id in feature_ids}
+        finally:
+            data_loader.unload()
+    return {'output': output.getvalue(), 'results': results}
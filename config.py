@@ -1,9 +1,12 @@
 import logging
 logger = logging.getLogger(__name__)
 
+import contextlib
 import json
 import os
 
+from util import profiler
+
 '''
 Handles the loading of the config file as well as the access of specific
 config parameters.
@@ -17,14 +20,15 @@ def _init_config(path=None):
     if _config is not None:
         return
 
-    filepath = _get_default_path()
-    if filepath is None:
-        logger.info('Initializing empty config')
-        _config = {}
+    with profiler.stage('config.init'):
+        filepath = _get_default_path()
+        if filepath is None:
+            logger.info('Initializing empty config')
+            _config = {}
 
-    else:
-        with open(filepath, 'r') as fin:
-            _config = json.loads(fin.read())
+        else:
+            with open(filepath, 'r') as fin:
+                _config = json.loads(fin.read())
 
 
 def _get_default_path():
@@ -102,6 +106,18 @@ def set_parameter(name, value):
         os.environ[name] = "json:{0}".format(json.dumps(value))
 
 
+def get_cache_dir():
+    """
+    Directory of the on-disk caches: ENPM611_PROJECT_CACHE_DIR, or
+    .enpm611_cache next to the data path.
+    """
+    data_path = get_parameter('ENPM611_PROJECT_DATA_PATH')
+    return get_parameter(
+        'ENPM611_PROJECT_CACHE_DIR',
+        os.path.join(os.path.dirname(os.path.abspath(data_path or '.')), '.enpm611_cache')
+    )
+
+
 def overwrite_from_args(args):
     """
     Writes command line paramters into the config so any parameter
@@ -121,3 +137,26 @@ def overwrite_from_args(args):
                 set_parameter(name, value)
     except:
         pass
+
+
+@contextlib.contextmanager
+def override_parameters(parameters):
+    """
+    Sets parameters for the duration of a with block and restores their
+    previous values afterwards. A value of None unsets the parameter.
+    """
+    _init_config()
+    previous = {name: os.environ.get(name) for name in parameters}
+    for name, value in parameters.items():
+        if value is None:
+            os.environ.pop(name, None)
+        else:
+            set_parameter(name, value)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
@@ -1,43 +1,428 @@
 
+import argparse
+import glob
+import hashlib
 import json
-from typing import List
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import FrozenSet, Iterable, Iterator, List
 
 import config
-from models.Issue import Issue
+from models.Issue import Issue, covers, project_fields
+from models.IssueFilter import IssueFilter
+from models.IssueIndex import IssueIndex
+from models.IssueStore import IssueStore, MergeStats
+from util import dates, memory_budget, profiler
+from util.dataset_cache import DatasetCache, fingerprint
+from util.json_stream import iter_json_array
+from util.snapshot import MANIFEST, is_snapshot, open_snapshot, write_snapshot
 
 # Store issues as singleton to avoid reloads
 _ISSUES:List[Issue] = None
+# Columnar form of the same data, which the issues are materialized from
+_STORE:IssueStore = None
+# Field projection the singletons were loaded with, None for all fields
+_FIELDS:FrozenSet[str] = None
+# Fingerprint of the data files the singletons were loaded from
+_FINGERPRINT:str = None
+# How often the memory needed by the matching issues is checked while parsing
+_BUDGET_CHECK_RECORDS = 1000
+
+def unload():
+    """
+    Drops the loaded dataset, e.g. before loading another data path.
+    """
+    global _ISSUES, _STORE, _FIELDS, _FINGERPRINT
+    _ISSUES, _STORE, _FIELDS, _FINGERPRINT = None, None, None, None
+
+def loaded_fingerprint() -> str:
+    """
+    Returns the fingerprint (see DataLoader.fingerprint()) of the data the
+    loaded dataset was read from, or None if no dataset is loaded. It
+    differs from the current fingerprint once the data files change.
+    """
+    return _FINGERPRINT if _STORE is not None else None
 
 class DataLoader:
     """
     Loads the issue data into a runtime object.
     """
-    
+
     def __init__(self):
         """
         Constructor
         """
         self.data_path:str = config.get_parameter('ENPM611_PROJECT_DATA_PATH')
-        
-    def get_issues(self):
+        self.cache_dir:str = config.get_cache_dir()
+
+    def get_issues(self, fields:Iterable[str]=None, where:IssueFilter=None):
         """
         This should be invoked by other parts of the application to get access
         to the issues in the data file.
+        If fields is given (see models.Issue.project_fields), only those fields
+        are guaranteed to be populated, which makes loading cheaper.
+        If a filter is given, only the matching issues are returned, see
+        get_store().
         """
         global _ISSUES # to access it within the function
+        if where is not None and not where.is_empty():
+            return list(self.get_store(fields, where))
+        store = self.get_store(fields)
         if _ISSUES is None:
-            _ISSUES = self.__load()
-            print(f'Loaded {len(_ISSUES)} issues from {self.data_path}.')
+            _ISSUES = list(store)
         return _ISSUES
-    
-    def __load(self):
+
+    def get_store(self, fields:Iterable[str]=None, where:IssueFilter=None) -> IssueStore:
+        """
+        Returns the issues in columnar form. Analyses that aggregate over
+        all issues should prefer this over get_issues().
+        The loaded data is reused as long as it covers the requested fields.
+        If a filter is given, only the matching issues are returned. The
+        first filtered load parses the whole dataset once to fill the dataset
+        cache, so that later filtered queries are served from the cache
+        instead of re-parsing the data file. With --no-cache, or when the
+        dataset does not fit into the --max-memory budget, the filter is
+        checked on the raw records instead, so that other issues are never
+        decoded; that is cheaper once, but every such query re-parses.
+        """
+        global _STORE, _ISSUES, _FIELDS, _FINGERPRINT
+        if where is not None and not where.is_empty():
+            return self.__get_filtered_store(fields, where)
+        fields = project_fields(fields)
+        if _STORE is None or not covers(_FIELDS, fields):
+            fields = self.__fit_budget(fields)
+        if _STORE is None or not covers(_FIELDS, fields):
+            with profiler.stage('DataLoader.load'):
+                # Taken before reading, so that a concurrent change marks the data stale
+                dataset = self.fingerprint()
+                _STORE = self.__load_cached(fields)
+            _ISSUES = None
+            _FIELDS = fields
+            _FINGERPRINT = dataset
+        return _STORE
+
+    def get_frames(self, fields:Iterable[str]=None, where:IssueFilter=None):
+        """
+        Returns the issue, event and issue-label DataFrames of the (optionally
+        filtered) dataset, see models.IssueFrames. They are cached with the
+        loaded dataset, so analyses run in the same process share them.
+        When streaming is enabled (--stream) the issues are streamed into
+        columnar form instead of loading the dataset, and nothing is kept.
+        """
+        return self.load_store(fields, where).frames
+
+    def get_index(self, fields:Iterable[str]=None) -> IssueIndex:
+        """
+        Returns the inverted indexes (label -> issues, author -> events,
+        event type -> events) of the loaded dataset. They are built once and
+        persisted with the dataset cache and snapshots.
+        """
+        return self.get_store(fields).index
+
+    def load_store(self, fields:Iterable[str]=None, where:IssueFilter=None) -> IssueStore:
         """
-        Loads the issues into memory.
+        Returns the issues to analyze in columnar form. When streaming is
+        enabled (--stream) the raw records are streamed into a store of only
+        the requested fields and matching issues, which is neither kept nor
+        cached, otherwise this is get_store().
+        """
+        if config.get_parameter('stream'):
+            with profiler.stage('DataLoader.stream'):
+                return self.__stream_store(fields, where)
+        return self.get_store(fields, where)
+
+    def data_files(self) -> List[str]:
+        """
+        Resolves the data path to the data files, in a deterministic order.
+        The path may be a single file, a directory of *.json shards or a glob
+        pattern matching shards.
+
+        Raises:
+            FileNotFoundError: If no data file matches.
+        """
+        if os.path.isdir(self.data_path):
+            files = sorted(glob.glob(os.path.join(self.data_path, '*.json')))
+        elif glob.has_magic(self.data_path):
+            files = sorted(f for f in glob.glob(self.data_path) if os.path.isfile(f))
+        else:
+            files = [self.data_path]
+        if not files:
+            raise FileNotFoundError(f'No data files found for {self.data_path}')
+        return files
+
+    def fingerprint(self) -> str:
+        """
+        Identifies the current contents of the data path by the size and
+        modification time of its data files, or of the manifest of a
+        snapshot. Used to key results computed from the dataset.
+
+        Raises:
+            FileNotFoundError: If no data file matches.
+        """
+        if is_snapshot(self.data_path):
+            files = [os.path.join(self.data_path, MANIFEST)]
+        else:
+            files = self.data_files()
+        parts = [[os.path.abspath(path), fingerprint(path, with_hash=False)] for path in files]
+        return hashlib.sha1(json.dumps(parts).encode('utf-8')).hexdigest()
+
+    def __iter_records(self) -> Iterator[dict]:
+        for path in self.data_files():
+            with open(path,'r') as fin:
+                yield from iter_json_array(fin)
+
+    def __stream_store(self, fields:Iterable[str], where:IssueFilter=None) -> IssueStore:
+        """
+        Builds a store from the records of the data file, one record at a
+        time, without creating Issue objects or keeping the parsed dataset.
+        The store is checked against the --max-memory budget like a load.
+        """
+        if where is not None and where.is_empty():
+            where = None
+        fields = project_fields(fields)
+        if (_STORE is not None and covers(_FIELDS, fields)) or is_snapshot(self.data_path):
+            # Already loaded or mapped, so there is nothing to gain from re-reading
+            return self.get_store(fields, where)
+        if where is not None:
+            return self.__parse_matching(fields, where)
+        fields = self.__fit_budget(fields)
+        return IssueStore.from_records(self.__iter_records(), fields)
+
+    def __get_filtered_store(self, fields:Iterable[str], where:IssueFilter) -> IssueStore:
+        global _STORE, _ISSUES, _FIELDS, _FINGERPRINT
+        if fields is not None:
+            fields = set(fields) | where.required_fields()
+        fields = project_fields(fields)
+        if _STORE is None or not covers(_FIELDS, fields):
+            with profiler.stage('DataLoader.load'):
+                fits = memory_budget.fits(self.__estimate(fields))
+                if config.get_parameter('no_cache') or not fits:
+                    if not fits:
+                        print(f'Loading all issues would exceed the --max-memory budget, '
+                              f'parsing only the issues matching {where}.')
+                    # Only the matching issues are parsed, and nothing is kept
+                    store = self.__parse_matching(fields, where)
+                    print(f'Loaded {len(store)} of {where.scanned} issues matching {where} from {self.data_path}.')
+                    return store
+                # Loads from the cache, or parses everything and fills it
+                dataset = self.fingerprint()
+                store = self.__load_cached(fields)
+            _STORE, _ISSUES, _FIELDS, _FINGERPRINT = store, None, fields, dataset
+        with profiler.stage('DataLoader.filter'):
+            # The label and participant lookups go through the persisted indexes
+            return where.filter_store(_STORE, self.get_index(fields))
+
+    def __parse_matching(self, fields:FrozenSet[str], where:IssueFilter) -> IssueStore:
+        """
+        Parses only the issues matching the filter. How many match is only
+        known while parsing, so the memory they will need is projected from
+        the share of matching issues so far and checked against the
+        --max-memory budget as parsing goes.
+        """
+        records = where.filter_records(self.__iter_records())
+        if memory_budget.get_budget() is not None:
+            records = self.__check_matching(records, fields, where)
+        return IssueStore.from_records(records, fields)
+
+    def __check_matching(self, records:Iterator[dict], fields:FrozenSet[str], where:IssueFilter) -> Iterator[dict]:
         """
-        with open(self.data_path,'r') as fin:
-            return [Issue(i) for i in json.load(fin)]
-    
+        Passes the matching records through.
+
+        Raises:
+            MemoryBudgetError: If the matching issues are projected not to fit.
+        """
+        needed = self.__estimate(fields)
+        kept = 0
+        for jobj in records:
+            kept += 1
+            if kept % _BUDGET_CHECK_RECORDS == 0:
+                self.__check_share(needed, kept, where)
+            yield jobj
+        self.__check_share(needed, kept, where)
+
+    def __check_share(self, needed:int, kept:int, where:IssueFilter):
+        memory_budget.check(
+            f'Loading the issues matching {where} from {self.data_path}', needed * kept // max(where.scanned, 1),
+            'Narrow the filter down, or use a larger budget.'
+        )
+
+    def __estimate(self, fields:FrozenSet[str]) -> int:
+        """
+        Estimated peak memory of loading the dataset with the given projection.
+        A snapshot is mapped, not loaded, so it needs next to nothing.
+        """
+        if is_snapshot(self.data_path):
+            return 0
+        input_bytes = sum(os.path.getsize(path) for path in self.data_files())
+        return memory_budget.estimate_parse(input_bytes, fields)
+
+    def __fit_budget(self, fields:FrozenSet[str]) -> FrozenSet[str]:
+        """
+        Returns the projection to load so that loading fits into the
+        --max-memory budget. When all fields are requested but do not fit,
+        the free-text fields (titles, texts, comments and URLs), which take
+        most of the memory, are dropped.
+
+        Raises:
+            MemoryBudgetError: If the dataset does not fit even then.
+        """
+        if memory_budget.get_budget() is None:
+            return fields
+        needed = self.__estimate(fields)
+        if not memory_budget.fits(needed) and fields is None:
+            fields = memory_budget.without_texts(fields)
+            needed = self.__estimate(fields)
+            if memory_budget.fits(needed):
+                print('Dropping the text fields of the issues to stay within the --max-memory budget.')
+        memory_budget.check(
+            f'Loading {self.data_path}', needed,
+            'Narrow it down with --label or --user, or use a larger budget.'
+        )
+        return fields
+
+    def __load_prepared(self, fields:FrozenSet[str]) -> IssueStore:
+        """
+        Returns the dataset if it can be had without parsing: from a snapshot
+        or from valid on-disk cache entries for every data file.
+        Returns None otherwise.
+        """
+        if is_snapshot(self.data_path):
+            store = open_snapshot(self.data_path)
+            print(f'Mapped {len(store)} issues from snapshot {self.data_path}.')
+            return store
+        stores = [self.__load_from_cache(path, fields) for path in self.data_files()]
+        if any(store is None for store in stores):
+            return None
+        store = IssueStore.concat(stores)
+        print(f'Loaded {len(store)} issues from cache for {self.data_path}.')
+        return store
+
+    def __load_cached(self, fields:FrozenSet[str]) -> IssueStore:
+        """
+        Returns the parsed dataset. Data files with a valid on-disk cache entry
+        are read from the cache, the others are parsed (in parallel when there
+        are several) and their cache entries refreshed.
+        --no-cache bypasses the cache and --rebuild-cache forces a re-parse.
+        If the data path is a snapshot directory it is mapped instead.
+        """
+        if is_snapshot(self.data_path):
+            return self.__load_prepared(fields)
+
+        files = self.data_files()
+        stores = [self.__load_from_cache(path, fields) for path in files]
+        missing = [path for path, store in zip(files, stores) if store is None]
+        parsed = dict(zip(missing, self.__load(missing, fields)))
+        for path in missing:
+            self.__save_to_cache(path, fields, parsed[path])
+        store = IssueStore.concat([parsed.get(path, store) for path, store in zip(files, stores)])
+
+        source = self.data_path if len(files) == 1 else f'{len(files)} files matching {self.data_path}'
+        print(f'Loaded {len(store)} issues from {source}.')
+        slow_dates = dates.get_stats()['slow_path']
+        if slow_dates:
+            print(f'{slow_dates} dates were not in ISO-8601 format and needed the slow parser.')
+        return store
+
+    def __load_from_cache(self, path:str, fields:FrozenSet[str]) -> IssueStore:
+        """
+        Returns the cached dataset of a data file, or None. A cached full
+        dataset also serves projected loads.
+        """
+        if config.get_parameter('no_cache') or config.get_parameter('rebuild_cache'):
+            return None
+        cache = DatasetCache(self.cache_dir)
+        variants = [None] if fields is None else [DatasetCache.variant(sorted(fields)), None]
+        for variant in variants:
+            store = cache.load(path, variant)
+            if store is not None:
+                return store
+        return None
+
+    def __save_to_cache(self, path:str, fields:FrozenSet[str], store:IssueStore):
+        if config.get_parameter('no_cache'):
+            return
+        variant = DatasetCache.variant(sorted(fields)) if fields is not None else None
+        # Build the indexes now so that they are persisted with the dataset
+        store.index
+        cache = DatasetCache(self.cache_dir)
+        try:
+            if config.get_parameter('rebuild_cache'):
+                # Entries of other projections were built from the same data
+                cache.invalidate(path)
+            cache.save(path, store, variant)
+        except OSError as e:
+            print(f'Could not write dataset cache to {self.cache_dir}: {e}')
+
+    def merge(self, delta_path:str) -> MergeStats:
+        """
+        Merges a fresh export into the loaded dataset without re-parsing the
+        data that is already loaded. Issues are matched by number and replaced
+        when their updated_date is newer, see IssueStore.merge().
+        Use write_snapshot() to persist the merged dataset.
+        """
+        global _STORE, _ISSUES, _FINGERPRINT
+        store = self.get_store()
+        memory_budget.check(
+            f'Merging {delta_path}', memory_budget.estimate_parse(os.path.getsize(delta_path), _FIELDS),
+            'Merge smaller exports, or use a larger budget.'
+        )
+        delta = _load_file(delta_path, _FIELDS)
+        _STORE, stats = store.merge(delta)
+        _ISSUES = None
+        # The merged dataset no longer matches the data files
+        parts = [_FINGERPRINT, os.path.abspath(delta_path), fingerprint(delta_path, with_hash=False)]
+        _FINGERPRINT = hashlib.sha1(json.dumps(parts).encode('utf-8')).hexdigest()
+        print(f'Merged {delta_path}: {stats.added} added, {stats.updated} updated, {stats.unchanged} unchanged.')
+        return stats
+
+    def write_snapshot(self, path: str):
+        """
+        Writes the loaded dataset as a memory-mapped snapshot. Pointing
+        ENPM611_PROJECT_DATA_PATH at the snapshot directory lets any number of
+        processes share it without parsing.
+        """
+        write_snapshot(self.get_store(), path)
+        print(f'Wrote snapshot of {self.data_path} to {path}.')
+
+    def __load(self, files:List[str], fields:FrozenSet[str]=None) -> List[IssueStore]:
+        """
+        Loads the issues of the given files into memory. Several files are
+        parsed in a process pool; the result is in the order of the files.
+        """
+        workers = min(len(files), config.get_parameter('workers', os.cpu_count() or 1))
+        if workers <= 1:
+            return [_load_file(path, fields) for path in files]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(_load_file, files, [fields] * len(files)))
+
+
+def _load_file(path:str, fields:FrozenSet[str]=None) -> IssueStore:
+    """
+    Parses one data file. Module level so that it can run in a worker process.
+    """
+    with open(path,'r') as fin:
+        return IssueStore.from_records(iter_json_array(fin), fields)
 
 if __name__ == '__main__':
-    # Run the loader for testing
-    DataLoader().get_issues()
\ No newline at end of file
+    # Run the loader for testing, or convert the data file to a snapshot
+    parser = argparse.ArgumentParser(description='Load the issue data.')
+    parser.add_argument(
+        '--merge',
+        metavar='FILE',
+        action='append',
+        default=[],
+        help='Merge new or changed issues from an export into the dataset (repeatable)'
+    )
+    parser.add_argument(
+        '--write-snapshot',
+        metavar='DIR',
+        help='Write a memory-mapped snapshot of the dataset to DIR'
+    )
+    args = parser.parse_args()
+    loader = DataLoader()
+    for delta_path in args.merge:
+        loader.merge(delta_path)
+    if args.write_snapshot:
+        loader.write_snapshot(args.write_snapshot)
+    else:
+        loader.get_issues()
\ No newline at end of file
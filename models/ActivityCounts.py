@@ -0,0 +1,180 @@
+import tempfile
+from typing import List
+
+import numpy as np
+
+from models.IssueStore import NAT, IssueStore
+
+_NS_PER_DAY = 86_400 * 1_000_000_000
+# Size of the chunks spilled counts are processed in
+_CHUNK_BYTES = 16 << 20
+# 1970-01-01 was a Thursday; weeks start on Monday
+_WEEK_SHIFT = 3
+
+
+def bucket_index(dates: np.ndarray, granularity: str) -> np.ndarray:
+    """
+    Number of the day, week, month or quarter since the epoch that each
+    timestamp (int64 nanoseconds, see IssueStore) falls into.
+
+    Raises:
+        ValueError: If the granularity is not one of ActivityCounts.GRANULARITIES.
+    """
+    dates = np.asarray(dates, dtype=np.int64)
+    if granularity == 'day':
+        return dates // _NS_PER_DAY
+    if granularity == 'week':
+        return (dates // _NS_PER_DAY + _WEEK_SHIFT) // 7
+    months = dates.view('datetime64[ns]').astype('datetime64[M]').astype(np.int64)
+    if granularity == 'month':
+        return months
+    if granularity == 'quarter':
+        return months // 3
+    raise ValueError(f"Unknown granularity '{granularity}'")
+
+
+def bucket_start(index: np.ndarray, granularity: str) -> np.ndarray:
+    """
+    Inverse of bucket_index(): the first day of each bucket.
+    """
+    index = np.asarray(index, dtype=np.int64)
+    if granularity == 'day':
+        return index.astype('datetime64[D]')
+    if granularity == 'week':
+        return (index * 7 - _WEEK_SHIFT).astype('datetime64[D]')
+    if granularity == 'month':
+        return index.astype('datetime64[M]').astype('datetime64[D]')
+    if granularity == 'quarter':
+        return (index * 3).astype('datetime64[M]').astype('datetime64[D]')
+    raise ValueError(f"Unknown granularity '{granularity}'")
+
+
+class ActivityCounts:
+    """
+    Number of events per author and time bucket (day, week, month or
+    quarter), as a dense authors x buckets array over the range of buckets
+    that have events. Empty buckets are zeros, so totals and rolling
+    averages are computed for all authors at once from the prefix sums
+    along the time axis.
+    """
+
+    GRANULARITIES = ['day', 'week', 'month', 'quarter']
+
+    def __init__(self, counts: np.ndarray, authors: List[str], starts: np.ndarray, granularity: str,
+                 spill_dir: str = None):
+        self.counts = counts
+        self.authors = authors
+        self.starts = starts
+        self.granularity = granularity
+        self.spill_dir = spill_dir
+        self._prefix: np.ndarray = None
+
+    @classmethod
+    def from_store(cls, store: IssueStore, granularity: str = 'month',
+                   max_bytes: int = None, spill_dir: str = None) -> 'ActivityCounts':
+        """
+        Counts the events of the store that have an author and a date.
+        If the counts and their prefix sums would take more than max_bytes,
+        they are spilled to disk: kept in memory-mapped temporary files in
+        spill_dir and counted a chunk of authors at a time.
+        """
+        authors = np.asarray(store.columns['event_author'])
+        dates = np.asarray(store.columns['event_date'])
+        valid = (authors >= 0) & (dates != NAT)
+        buckets = bucket_index(dates[valid], granularity)
+        if len(buckets) == 0:
+            return cls(np.zeros((0, 0), dtype=np.int64), [], bucket_start(buckets, granularity), granularity)
+
+        codes, rows = np.unique(authors[valid], return_inverse=True)
+        first = buckets.min()
+        num_buckets = int(buckets.max() - first) + 1
+        if max_bytes is not None and 2 * 8 * len(codes) * num_buckets > max_bytes:
+            counts = _count_spilled(rows, buckets - first, len(codes), num_buckets, max_bytes, spill_dir)
+        else:
+            counts = np.bincount(
+                rows * num_buckets + (buckets - first),
+                minlength=len(codes) * num_buckets
+            ).reshape(len(codes), num_buckets)
+        starts = bucket_start(np.arange(first, first + num_buckets), granularity)
+        return cls(counts, store.pools['users'].decode_many(codes), starts, granularity, spill_dir)
+
+    @property
+    def prefix(self) -> np.ndarray:
+        """
+        Cumulative counts with a leading zero column: the events of author a
+        in buckets [i, j) are prefix[a, j] - prefix[a, i].
+        """
+        if self._prefix is None:
+            shape = (self.counts.shape[0], self.counts.shape[1] + 1)
+            if isinstance(self.counts, np.memmap):
+                # Spilled counts get spilled prefix sums, computed in chunks
+                self._prefix = _spill(shape, self.spill_dir)
+                chunk = max(1, _CHUNK_BYTES // (8 * shape[1]))
+                for start in range(0, shape[0], chunk):
+                    np.cumsum(self.counts[start:start + chunk], axis=1, out=self._prefix[start:start + chunk, 1:])
+            else:
+                self._prefix = np.zeros(shape, dtype=np.int64)
+                np.cumsum(self.counts, axis=1, out=self._prefix[:, 1:])
+        return self._prefix
+
+    def totals(self) -> np.ndarray:
+        return self.prefix[:, -1]
+
+    def smoothed(self, window: int) -> np.ndarray:
+        """
+        Rolling average over the last window buckets for every author and
+        bucket. The first buckets average over the buckets available.
+
+        Raises:
+            ValueError: If the window is smaller than 1.
+        """
+        if window < 1:
+            raise ValueError(f'The smoothing window must be at least 1, not {window}')
+        prefix = self.prefix
+        ends = np.arange(1, prefix.shape[1])
+        starts = np.maximum(ends - window, 0)
+        return (prefix[:, ends] - prefix[:, starts]) / (ends - starts)
+
+    def top_authors(self, n: int) -> np.ndarray:
+        """
+        Rows of the n authors with the most events, most active first.
+        """
+        return np.argsort(-self.totals(), kind='stable')[:n]
+
+    def select(self, authors: List[str]) -> 'ActivityCounts':
+        """
+        The counts of only the given authors (those without events are
+        skipped).
+        """
+        rows = {author: i for i, author in enumerate(self.authors)}
+        keep = [rows[author] for author in authors if author in rows]
+        return ActivityCounts(self.counts[keep], [self.authors[i] for i in keep], self.starts, self.granularity)
+
+
+def _spill(shape, directory: str = None) -> np.ndarray:
+    """
+    A zero-filled int64 array in an anonymous temporary file, memory mapped.
+    """
+    with tempfile.TemporaryFile(dir=directory) as fout:
+        return np.memmap(fout, dtype=np.int64, mode='w+', shape=shape)
+
+
+def _count_spilled(rows: np.ndarray, buckets: np.ndarray, num_rows: int, num_buckets: int,
+                   max_bytes: int, directory: str = None) -> np.ndarray:
+    """
+    Counts events per row and bucket into a spilled array, for chunks of
+    rows that take at most a quarter of max_bytes at a time.
+    """
+    counts = _spill((num_rows, num_buckets), directory)
+    order = np.argsort(rows, kind='stable')
+    rows, buckets = rows[order], buckets[order]
+    chunk = max(1, min(max_bytes // 4, _CHUNK_BYTES) // (8 * num_buckets))
+    for start in range(0, num_rows, chunk):
+        end = min(start + chunk, num_rows)
+        lo, hi = np.searchsorted(rows, [start, end])
+        counts[start:end] = np.bincount(
+            (rows[lo:hi] - start) * num_buckets + buckets[lo:hi],
+            minlength=(end - start) * num_buckets
+        ).reshape(end - start, num_buckets)
+    counts.flush()
+    return counts
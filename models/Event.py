@@ -1,11 +1,15 @@
 from datetime import datetime
+from typing import AbstractSet
 
-from dateutil import parser
+from util.dates import parse_date
 
 
 class Event:
 
-    def __init__(self, jobj:any):
+    # Fields that can be selected in a projection, see from_json
+    FIELDS = ['event_type', 'author', 'event_date', 'label', 'comment']
+
+    def __init__(self, jobj:any, fields:AbstractSet[str]=None):
         self.event_type:str = None
         self.author:str = None
         self.event_date:datetime = None
@@ -13,14 +17,31 @@ class Event:
         self.comment:str = None
 
         if jobj is not None:
-            self.from_json(jobj)
+            self.from_json(jobj, fields)
 
-    def from_json(self, jobj:any):
+    def from_json(self, jobj:any, fields:AbstractSet[str]=None):
+        """
+        Populates the event from its JSON record. If fields is given, only
+        those fields are decoded and the others keep their defaults.
+        """
+        if fields is not None:
+            self.__from_json_projected(jobj, fields)
+            return
         self.event_type = jobj.get('event_type')
         self.author = jobj.get('author')
         try:
-            self.event_date = parser.parse(jobj.get('event_date'))
+            self.event_date = parse_date(jobj.get('event_date'))
         except: 
             pass
         self.label = jobj.get('label')
-        self.comment = jobj.get('comment')
\ No newline at end of file
+        self.comment = jobj.get('comment')
+
+    def __from_json_projected(self, jobj:any, fields:AbstractSet[str]):
+        for field in fields:
+            if field == 'event_date':
+                try:
+                    self.event_date = parse_date(jobj.get('event_date'))
+                except:
+                    pass
+            else:
+                setattr(self, field, jobj.get(field))
\ No newline at end of file
@@ -0,0 +1,211 @@
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Dict, List
+
+import networkx as nx
+import numpy as np
+import scipy.sparse as sp
+
+from models.IssueStore import IssueStore
+
+
+def incidence_matrix(store: IssueStore) -> sp.csr_matrix:
+    """
+    Binary issue x user matrix with a 1 where the user participates in the
+    issue, i.e. created it or authored one of its events. Columns are the
+    codes of the store's users pool.
+    """
+    creators = np.asarray(store.columns['creator'])
+    authors = np.asarray(store.columns['event_author'])
+    has_creator = creators >= 0
+    has_author = authors >= 0
+    rows = np.concatenate([np.flatnonzero(has_creator), store.event_issue[has_author]])
+    cols = np.concatenate([creators[has_creator], authors[has_author]]).astype(np.int64)
+    matrix = sp.csr_matrix(
+        (np.ones(len(rows), dtype=np.int64), (rows, cols)),
+        shape=(len(store), len(store.pools['users']))
+    )
+    # Duplicates (e.g. several comments by one user) were summed
+    matrix.data[:] = 1
+    return matrix
+
+
+# Below this many shortest path sources per process, a pool costs more than
+# it saves
+_MIN_SOURCES_PER_WORKER = 200
+# Bytes per entry of the co-occurrence matrix (int64 weight and int32
+# index) times the copies made while building the graph
+_BYTES_PER_PAIR = 12 * 4
+
+
+class InteractionGraph:
+    """
+    Weighted, undirected interaction graph between contributors. Two
+    contributors interact once for every issue they both participate in.
+    The graph is kept as a symmetric sparse adjacency matrix over the
+    contributors that have at least one interaction; to_networkx() converts
+    it for layout and drawing.
+    """
+
+    def __init__(self, weights: sp.csr_matrix, nodes: List[str]):
+        self.weights = weights
+        self.nodes = nodes
+
+    @classmethod
+    def from_store(cls, store: IssueStore) -> 'InteractionGraph':
+        """
+        Computes the graph as the product of the incidence matrix with
+        itself, so the cost grows with the number of co-occurring pairs
+        rather than with the squared participants of every issue.
+        """
+        incidence = incidence_matrix(store)
+        cooccurrence = (incidence.T @ incidence).tocsr()
+        cooccurrence = (cooccurrence - sp.diags(cooccurrence.diagonal(), dtype=cooccurrence.dtype)).tocsr()
+        cooccurrence.eliminate_zeros()
+        connected = np.flatnonzero(np.diff(cooccurrence.indptr) > 0)
+        # Weights count each pair in both directions, as they always have
+        weights = (cooccurrence[connected][:, connected] * 2).tocsr()
+        return cls(weights, store.pools['users'].decode_many(connected))
+
+    @staticmethod
+    def estimate_nbytes(store: IssueStore) -> int:
+        """
+        Upper bound of the memory from_store() needs: the product has at
+        most one entry per pair of participants of every issue (and per pair
+        of users), each of which is copied a few times on the way.
+        """
+        participants = np.diff(incidence_matrix(store).indptr)
+        num_users = len(store.pools['users'])
+        pairs = min(int(np.sum(participants.astype(np.int64) ** 2)), num_users * num_users)
+        return pairs * _BYTES_PER_PAIR
+
+    def number_of_nodes(self) -> int:
+        return len(self.nodes)
+
+    def number_of_edges(self) -> int:
+        return self.weights.nnz // 2
+
+    def degree_centrality(self) -> Dict[str, float]:
+        """
+        Fraction of the other contributors each contributor interacts with,
+        as in networkx.degree_centrality().
+        """
+        n = self.number_of_nodes()
+        if n <= 1:
+            return {node: 1.0 for node in self.nodes}
+        degrees = np.diff(self.weights.indptr) / (n - 1)
+        return dict(zip(self.nodes, degrees.tolist()))
+
+    def betweenness_centrality(self, pivots: int = None, workers: int = 1, seed: int = None) -> Dict[str, float]:
+        """
+        Normalized, unweighted betweenness centrality as in
+        networkx.betweenness_centrality(). If pivots is given, it is
+        approximated from the shortest paths of that many randomly sampled
+        source contributors. The sources are split across a process pool of
+        up to the given number of workers.
+        """
+        n = self.number_of_nodes()
+        sources = np.arange(n)
+        if pivots is not None and pivots < n:
+            sources = np.sort(np.random.default_rng(seed).choice(n, pivots, replace=False))
+        workers = max(1, min(workers, len(sources) // _MIN_SOURCES_PER_WORKER))
+        if workers == 1:
+            total = _betweenness_from(self.weights, sources)
+        else:
+            chunks = np.array_split(sources, workers)
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                total = sum(executor.map(_betweenness_from, repeat(self.weights), chunks))
+        # The partial sums count every path of the undirected graph once,
+        # normalization is by the (n - 1)(n - 2) / 2 pairs of other nodes
+        scale = 2 / ((n - 1) * (n - 2)) if n > 2 else 0
+        if len(sources):
+            scale *= n / len(sources)
+        return dict(zip(self.nodes, (total * scale).tolist()))
+
+    def pagerank(self, alpha: float = 0.85, max_iter: int = 100, tol: float = 1.0e-6) -> Dict[str, float]:
+        """
+        PageRank with interaction weights, as in networkx.pagerank(),
+        computed by power iteration on the sparse adjacency matrix.
+        """
+        n = self.number_of_nodes()
+        if n == 0:
+            return {}
+        weights = self.weights.astype(np.float64)
+        out_weight = np.asarray(weights.sum(axis=1)).ravel()
+        dangling = out_weight == 0
+        out_weight[dangling] = 1
+        transition = (sp.diags(1 / out_weight) @ weights).T.tocsr()
+        rank = np.full(n, 1 / n)
+        for _ in range(max_iter):
+            previous = rank
+            rank = alpha * (transition @ rank + previous[dangling].sum() / n) + (1 - alpha) / n
+            if np.abs(rank - previous).sum() < n * tol:
+                break
+        return dict(zip(self.nodes, rank.tolist()))
+
+    def communities(self, seed: int = None) -> List[List[str]]:
+        """
+        Groups of contributors that interact more among themselves than with
+        the others (Louvain method, by interaction weight), largest first.
+        """
+        if self.number_of_nodes() == 0:
+            return []
+        communities = nx.community.louvain_communities(self.to_networkx(), weight='weight', seed=seed)
+        return sorted((sorted(c) for c in communities), key=len, reverse=True)
+
+    def subgraph(self, nodes: np.ndarray) -> 'InteractionGraph':
+        """
+        The graph induced by the given node positions, in the given order.
+        """
+        nodes = np.asarray(nodes, dtype=np.int64)
+        return InteractionGraph(self.weights[nodes][:, nodes].tocsr(), [self.nodes[i] for i in nodes])
+
+    def top_nodes(self, k: int) -> 'InteractionGraph':
+        """
+        The graph induced by the k contributors with the highest degree.
+        """
+        if k >= self.number_of_nodes():
+            return self
+        degrees = np.diff(self.weights.indptr)
+        top = np.argsort(-degrees, kind='stable')[:k]
+        return self.subgraph(np.sort(top))
+
+    def backbone(self, min_weight: int) -> 'InteractionGraph':
+        """
+        The graph with only the edges of at least the given weight, and the
+        contributors that still have an edge.
+        """
+        weights = self.weights.copy()
+        weights.data[weights.data < min_weight] = 0
+        weights.eliminate_zeros()
+        connected = np.flatnonzero(np.diff(weights.indptr) > 0)
+        return InteractionGraph(weights, self.nodes).subgraph(connected)
+
+    def fingerprint(self) -> str:
+        """
+        Identifies the graph by its nodes, edges and weights.
+        """
+        digest = hashlib.sha1('\0'.join(self.nodes).encode('utf-8'))
+        weights = self.weights.sorted_indices()
+        for array in (weights.indptr, weights.indices, weights.data):
+            digest.update(np.ascontiguousarray(array, dtype=np.int64).tobytes())
+        return digest.hexdigest()
+
+    def to_networkx(self) -> nx.Graph:
+        """
+        Converts the graph to a networkx.Graph with a 'weight' attribute on
+        every edge.
+        """
+        graph = nx.from_scipy_sparse_array(self.weights)
+        return nx.relabel_nodes(graph, dict(enumerate(self.nodes)), copy=False)
+
+
+def _betweenness_from(weights: sp.csr_matrix, sources: np.ndarray) -> np.ndarray:
+    """
+    Unnormalized betweenness contributions of the shortest paths starting at
+    the given sources, per node. Sums over disjoint sources add up.
+    """
+    graph = nx.from_scipy_sparse_array(weights)
+    partial = nx.betweenness_centrality_subset(graph, sources.tolist(), list(graph), normalized=False)
+    return np.array([partial[node] for node in range(weights.shape[0])], dtype=np.float64)
@@ -1,15 +1,61 @@
 from datetime import datetime
-from typing import List
-
-from dateutil import parser
+from typing import AbstractSet, Any, Callable, FrozenSet, Iterable, List, Sequence
 
 from models.Event import Event
 from models.State import State
+from util.dates import parse_date
+
+
+def project_fields(fields:Iterable[str]) -> FrozenSet[str]:
+    """
+    Normalizes a field projection. Issue fields are named as on Issue, Event
+    fields as 'events.<field>', and 'events' selects every Event field.
+    The issue number is always included. None stands for all fields.
+
+    Raises:
+        ValueError: If a field does not exist.
+    """
+    if fields is None:
+        return None
+    result = set()
+    for field in fields:
+        if field == 'events':
+            result.update(f'events.{name}' for name in Event.FIELDS)
+        elif field in Issue.FIELDS or (field.startswith('events.') and field[7:] in Event.FIELDS):
+            result.add(field)
+        else:
+            raise ValueError(f"Unknown field '{field}'")
+    result.add('number')
+    return frozenset(result)
+
+
+def event_fields(fields:AbstractSet[str]) -> FrozenSet[str]:
+    """
+    The Event fields selected by a normalized projection, or None for all.
+    """
+    if fields is None:
+        return None
+    return frozenset(field[7:] for field in fields if field.startswith('events.'))
+
+
+def covers(loaded:AbstractSet[str], requested:AbstractSet[str]) -> bool:
+    """
+    Whether data loaded with one projection can serve another.
+    """
+    if loaded is None:
+        return True
+    return requested is not None and requested <= loaded
 
 
 class Issue:
+
+    # Fields that can be selected in a projection, see project_fields
+    FIELDS = [
+        'url', 'creator', 'labels', 'state', 'assignees', 'title', 'text',
+        'number', 'created_date', 'updated_date', 'timeline_url',
+    ]
     
-    def __init__(self, jobj:any=None):
+    def __init__(self, jobj:any=None, fields:AbstractSet[str]=None):
         self.url:str = None
         self.creator:str = None
         self.labels:List[str] = []
@@ -21,12 +67,22 @@ class Issue:
         self.created_date:datetime = None
         self.updated_date:datetime = None
         self.timeline_url:str = None
-        self.events:List[Event] = []
+        self._events:List[Event] = []
+        # Undecoded events, turned into Event objects on first access
+        self._event_records:Sequence = None
+        self._decode_event:Callable[[Any], Event] = None
         
         if jobj is not None:
-            self.from_json(jobj)
+            self.from_json(jobj, fields)
     
-    def from_json(self, jobj:any):
+    def from_json(self, jobj:any, fields:AbstractSet[str]=None):
+        """
+        Populates the issue from its JSON record. If a projection from
+        project_fields() is given, only the selected fields are decoded.
+        """
+        if fields is not None:
+            self.__from_json_projected(jobj, fields)
+            return
         self.url = jobj.get('url')
         self.creator = jobj.get('creator')
         self.labels = jobj.get('labels',[])
@@ -39,12 +95,54 @@ class Issue:
         except:
             pass
         try:
-            self.created_date = parser.parse(jobj.get('created_date'))
+            self.created_date = parse_date(jobj.get('created_date'))
         except: 
             pass
         try:
-            self.updated_date = parser.parse(jobj.get('updated_date'))
+            self.updated_date = parse_date(jobj.get('updated_date'))
         except: 
             pass
         self.timeline_url = jobj.get('timeline_url')
-        self.events = [Event(jevent) for jevent in jobj.get('events',[])]
\ No newline at end of file
+        self.defer_events(jobj.get('events',[]))
+
+    def __from_json_projected(self, jobj:any, fields:AbstractSet[str]):
+        for field in fields:
+            if field == 'state':
+                self.state = State[jobj.get('state')]
+            elif field == 'number':
+                try:
+                    self.number = int(jobj.get('number','-1'))
+                except:
+                    pass
+            elif field in ('created_date', 'updated_date'):
+                try:
+                    setattr(self, field, parse_date(jobj.get(field)))
+                except:
+                    pass
+            elif field in ('labels', 'assignees'):
+                setattr(self, field, jobj.get(field,[]))
+            elif not field.startswith('events.'):
+                setattr(self, field, jobj.get(field))
+        selected = event_fields(fields)
+        if selected:
+            self.defer_events(jobj.get('events',[]), lambda jevent: Event(jevent, selected))
+
+    @property
+    def events(self) -> List[Event]:
+        if self._event_records is not None:
+            self._events = [self._decode_event(record) for record in self._event_records]
+            self._event_records = None
+        return self._events
+
+    @events.setter
+    def events(self, events:List[Event]):
+        self._events = events
+        self._event_records = None
+
+    def defer_events(self, records:Sequence, decode:Callable[[Any], Event]=Event):
+        """
+        Sets the events of the issue without decoding them. The records are
+        only turned into Event objects, using decode, when events is accessed.
+        """
+        self._event_records = records
+        self._decode_event = decode
@@ -0,0 +1,88 @@
+from typing import Iterable, Iterator, Set
+
+import numpy as np
+
+from models.IssueIndex import IssueIndex
+from models.IssueStore import MISSING, IssueStore
+
+
+class IssueFilter:
+    """
+    Predicate on issues that the DataLoader evaluates while loading, so that
+    issues that are filtered out are never fully decoded.
+    An issue matches if it carries the label (when given) and if the
+    participant (when given) created it or authored one of its events.
+    """
+
+    def __init__(self, label: str = None, participant: str = None):
+        self.label = label
+        self.participant = participant
+        # Number of issues the filter was evaluated on by the last load,
+        # None if it has not been applied by the loader
+        self.scanned: int = None
+
+    def __repr__(self):
+        return f"IssueFilter(label={self.label!r}, participant={self.participant!r})"
+
+    def is_empty(self) -> bool:
+        return self.label is None and self.participant is None
+
+    def required_fields(self) -> Set[str]:
+        """
+        Fields the filter needs to be evaluated on loaded issues.
+        """
+        fields = set()
+        if self.label is not None:
+            fields.add('labels')
+        if self.participant is not None:
+            fields.update(['creator', 'events.author'])
+        return fields
+
+    def matches_record(self, jobj: dict) -> bool:
+        """
+        Evaluates the filter on a raw JSON record of the data file.
+        """
+        if self.label is not None and self.label not in (jobj.get('labels') or []):
+            return False
+        if self.participant is not None and jobj.get('creator') != self.participant:
+            return any(e.get('author') == self.participant for e in jobj.get('events') or [])
+        return True
+
+    def filter_records(self, records: Iterable[dict]) -> Iterator[dict]:
+        """
+        Yields the matching records and counts the scanned ones.
+        """
+        self.scanned = 0
+        for jobj in records:
+            self.scanned += 1
+            if self.matches_record(jobj):
+                yield jobj
+
+    def mask(self, store: IssueStore, index: IssueIndex = None) -> np.ndarray:
+        """
+        Boolean mask of the matching issue rows, computed with the inverted
+        indexes of the store (by default store.index), so that it costs time
+        proportional to the matching rows.
+        """
+        if index is None:
+            index = store.index
+        mask = np.ones(len(store), dtype=bool)
+        if self.label is not None:
+            has_label = np.zeros(len(store), dtype=bool)
+            has_label[index.issues_with_label(self.label)] = True
+            mask &= has_label
+        if self.participant is not None:
+            participates = np.zeros(len(store), dtype=bool)
+            code = store.code('users', self.participant)
+            if code != MISSING:
+                participates |= store.columns['creator'] == code
+            participates[store.event_issue[index.events_by_author(self.participant)]] = True
+            mask &= participates
+        return mask
+
+    def filter_store(self, store: IssueStore, index: IssueIndex = None) -> IssueStore:
+        """
+        Returns the matching issues of a loaded store, see mask().
+        """
+        self.scanned = len(store)
+        return store.take(np.flatnonzero(self.mask(store, index)))
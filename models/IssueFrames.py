@@ -0,0 +1,98 @@
+from typing import Dict, Iterable
+
+import numpy as np
+import pandas as pd
+
+from models.Issue import Issue
+from models.IssueStore import IssueStore
+
+
+class IssueFrames:
+    """
+    pandas DataFrames over an IssueStore, for analyses that aggregate with
+    pandas. The frames are built column-wise from the store arrays on first
+    access and cached, so all analyses share them:
+
+    - issues: one row per issue, indexed by issue row, with the columns
+      number, state, creator, created_date, updated_date and num_events.
+    - events: one row per event with the columns issue (row of the owning
+      issue), event_type, author, event_date and label.
+    - issue_labels: one row per label of an issue with the columns issue and
+      label.
+
+    String columns are categoricals over the store's string pools (pools are
+    shared by filtered stores, so categories may be unobserved; group with
+    observed=True), dates are datetime64[ns, UTC] with NaT for missing
+    values. Free text (titles, bodies, comments) is not included.
+    """
+
+    def __init__(self, store: IssueStore):
+        self.store = store
+        self._frames: Dict[str, pd.DataFrame] = {}
+        self._categories: Dict[str, pd.Index] = {}
+        self._event_counts: Dict[str, np.ndarray] = {}
+
+    @classmethod
+    def from_issues(cls, issues: Iterable[Issue]) -> 'IssueFrames':
+        """
+        Builds the frames from Issue objects, see IssueStore.from_issues().
+        """
+        return cls(IssueStore.from_issues(issues))
+
+    @property
+    def issues(self) -> pd.DataFrame:
+        if 'issues' not in self._frames:
+            c = self.store.columns
+            state = np.asarray(c['state'])
+            self._frames['issues'] = pd.DataFrame({
+                'number': np.asarray(c['number']),
+                'state': pd.Categorical.from_codes(state.astype(np.int32), categories=['open', 'closed']),
+                'creator': self.__categorical('creator'),
+                'created_date': self.__dates('created_date'),
+                'updated_date': self.__dates('updated_date'),
+                'num_events': np.diff(np.asarray(c['event_offsets'])),
+            })
+        return self._frames['issues']
+
+    @property
+    def events(self) -> pd.DataFrame:
+        if 'events' not in self._frames:
+            self._frames['events'] = pd.DataFrame({
+                'issue': self.store.event_issue,
+                'event_type': self.__categorical('event_type'),
+                'author': self.__categorical('event_author'),
+                'event_date': self.__dates('event_date'),
+                'label': self.__categorical('event_label'),
+            })
+        return self._frames['events']
+
+    @property
+    def issue_labels(self) -> pd.DataFrame:
+        if 'issue_labels' not in self._frames:
+            self._frames['issue_labels'] = pd.DataFrame({
+                'issue': self.store.label_issue,
+                'label': self.__categorical('label_codes'),
+            })
+        return self._frames['issue_labels']
+
+    def event_counts(self, event_type: str) -> np.ndarray:
+        """
+        Number of events of the given type for every issue row, computed
+        once per event type from the store's inverted index.
+        """
+        if event_type not in self._event_counts:
+            self._event_counts[event_type] = self.store.event_counts(event_type)
+        return self._event_counts[event_type]
+
+    def __categorical(self, column: str) -> pd.Categorical:
+        pool = IssueStore.STRING_COLUMNS[column]
+        if pool not in self._categories:
+            self._categories[pool] = pd.Index(list(self.store.pools[pool].values), dtype=object)
+        codes = np.asarray(self.store.columns[column])
+        return pd.Categorical.from_codes(codes, dtype=pd.CategoricalDtype(self._categories[pool]))
+
+    def __dates(self, column: str) -> pd.DatetimeIndex:
+        # The NAT marker of the store is numpy's NaT, so the values can be
+        # reinterpreted without a conversion
+        values = np.asarray(self.store.columns[column]).view('datetime64[ns]')
+        return pd.DatetimeIndex(values).tz_localize('UTC')
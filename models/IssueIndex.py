@@ -0,0 +1,76 @@
+from typing import Dict
+
+import numpy as np
+
+
+class InvertedIndex:
+    """
+    Maps every code of a dictionary-coded column to the rows holding it, in
+    CSR layout: the rows of code c are rows[offsets[c]:offsets[c + 1]], in
+    ascending order. Missing values are not indexed.
+    """
+
+    def __init__(self, rows: np.ndarray, offsets: np.ndarray):
+        self.rows = rows
+        self.offsets = offsets
+
+    @classmethod
+    def build(cls, codes: np.ndarray, size: int, values: np.ndarray = None) -> 'InvertedIndex':
+        """
+        Indexes a code column. If values is given, the index returns
+        values[row] instead of the row itself.
+        """
+        codes = np.asarray(codes)
+        present = np.flatnonzero(codes >= 0)
+        order = present[np.argsort(codes[present], kind='stable')]
+        offsets = np.zeros(size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(codes[present], minlength=size), out=offsets[1:])
+        rows = order if values is None else np.asarray(values)[order]
+        return cls(rows.astype(np.int64), offsets)
+
+    def lookup(self, code: int) -> np.ndarray:
+        if code < 0 or code >= len(self.offsets) - 1:
+            return self.rows[:0]
+        return self.rows[self.offsets[code]:self.offsets[code + 1]]
+
+    def counts(self) -> np.ndarray:
+        """
+        Number of rows per code.
+        """
+        return np.diff(self.offsets)
+
+
+class IssueIndex:
+    """
+    Inverted indexes over an IssueStore, built once so that filtered queries
+    cost time proportional to the matching rows:
+    label -> issue rows, author -> event rows and event type -> event rows.
+    """
+
+    NAMES = ['label_issues', 'author_events', 'event_type_events']
+
+    def __init__(self, store, indexes: Dict[str, InvertedIndex] = None):
+        self._store = store
+        if indexes is None:
+            columns = store.columns
+            indexes = {
+                'label_issues': InvertedIndex.build(
+                    columns['label_codes'], len(store.pools['labels']), store.label_issue
+                ),
+                'author_events': InvertedIndex.build(columns['event_author'], len(store.pools['users'])),
+                'event_type_events': InvertedIndex.build(columns['event_type'], len(store.pools['event_types'])),
+            }
+        self.indexes = indexes
+
+    def issues_with_label(self, label: str) -> np.ndarray:
+        """
+        Rows of the issues carrying the label (a label listed twice on an
+        issue yields its row twice).
+        """
+        return self.indexes['label_issues'].lookup(self._store.code('labels', label))
+
+    def events_by_author(self, author: str) -> np.ndarray:
+        return self.indexes['author_events'].lookup(self._store.code('users', author))
+
+    def events_of_type(self, event_type: str) -> np.ndarray:
+        return self.indexes['event_type_events'].lookup(self._store.code('event_types', event_type))
@@ -0,0 +1,569 @@
+from datetime import datetime, timedelta, timezone
+from typing import AbstractSet, Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+from models.Event import Event
+from models.Issue import Issue, event_fields
+from models.IssueIndex import IssueIndex, InvertedIndex
+from models.State import State
+from util.dates import parse_date
+
+# Marker for a missing timestamp in the int64 date columns
+NAT = np.iinfo(np.int64).min
+
+# Code used in the string columns for a missing value
+MISSING = -1
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_STATES = [State.open, State.closed]
+# Records after which the builder converts its lists to arrays
+_FLUSH_RECORDS = 10_000
+
+
+class StringPool:
+    """
+    Dictionary encoding for a string column. Every distinct value is stored
+    once and referred to by a dense integer code.
+    """
+
+    def __init__(self, values: List[str] = None):
+        self.values: List[str] = list(values or [])
+        self._codes: Dict[str, int] = {v: i for i, v in enumerate(self.values)}
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getstate__(self):
+        # The reverse mapping is rebuilt on demand, which keeps pickles small
+        return {'values': self.values}
+
+    def __setstate__(self, state):
+        self.values = state['values']
+        self._codes = None
+
+    def encode(self, value: str) -> int:
+        """
+        Returns the code of the value, adding it to the pool if necessary.
+        """
+        if value is None:
+            return MISSING
+        codes = self._index()
+        code = codes.get(value)
+        if code is None:
+            code = len(self.values)
+            codes[value] = code
+            self.values.append(value)
+        return code
+
+    def lookup(self, value: str) -> int:
+        """
+        Returns the code of the value without adding it, or MISSING.
+        """
+        return self._index().get(value, MISSING)
+
+    def decode(self, code: int) -> str:
+        return None if code < 0 else self.values[code]
+
+    def decode_many(self, codes: Iterable[int]) -> List[str]:
+        values = self.values
+        return [None if c < 0 else values[c] for c in codes]
+
+    def _index(self) -> Dict[str, int]:
+        if self._codes is None:
+            self._codes = {v: i for i, v in enumerate(self.values)}
+        return self._codes
+
+
+class IssueStore:
+    """
+    Columnar representation of the issue data. Issues and events are kept as
+    struct-of-arrays: timestamps are int64 nanoseconds since the epoch (UTC),
+    strings are integer codes into a StringPool, and the labels, assignees and
+    events of issue i are the rows offsets[i]:offsets[i + 1] of their arrays.
+    Issue and Event objects are only created on access.
+    """
+
+    # Pool that each string column is encoded with
+    STRING_COLUMNS = {
+        'creator': 'users',
+        'url': 'texts',
+        'title': 'texts',
+        'text': 'texts',
+        'timeline_url': 'texts',
+        'label_codes': 'labels',
+        'assignee_codes': 'users',
+        'event_type': 'event_types',
+        'event_author': 'users',
+        'event_label': 'labels',
+        'event_comment': 'texts',
+    }
+    DATE_COLUMNS = ['created_date', 'updated_date', 'event_date']
+    # Offsets column of each group of variable length columns
+    SEGMENTS = {
+        'label_offsets': ['label_codes'],
+        'assignee_offsets': ['assignee_codes'],
+        'event_offsets': ['event_type', 'event_author', 'event_date', 'event_label', 'event_comment'],
+    }
+    POOLS = ['users', 'labels', 'event_types', 'texts']
+
+    def __init__(self, columns: Dict[str, np.ndarray] = None, pools: Dict[str, StringPool] = None):
+        self.columns: Dict[str, np.ndarray] = columns if columns is not None else _Builder().columns()
+        self.pools: Dict[str, StringPool] = pools if pools is not None else {p: StringPool() for p in self.POOLS}
+        self._event_issue = None
+        self._label_issue = None
+        self._index: IssueIndex = None
+        self._frames = None
+
+    def __getstate__(self):
+        # Owner rows are cheap to recompute, but a built index is persisted
+        state = {'columns': self.columns, 'pools': self.pools}
+        if self._index is not None:
+            state['indexes'] = self._index.indexes
+        return state
+
+    def __setstate__(self, state):
+        self.__init__(state['columns'], state['pools'])
+        if 'indexes' in state:
+            self._index = IssueIndex(self, state['indexes'])
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict], fields: AbstractSet[str] = None) -> 'IssueStore':
+        """
+        Builds the store directly from the JSON records of the data file
+        without creating Issue or Event objects. With a projection from
+        project_fields(), fields that are not selected are stored as missing.
+        """
+        builder = _Builder(fields)
+        for i, jobj in enumerate(records, start=1):
+            builder.add_record(jobj)
+            if i % _FLUSH_RECORDS == 0:
+                builder.flush()
+        return cls(builder.columns(), builder.pools)
+
+    @classmethod
+    def from_issues(cls, issues: Iterable[Issue]) -> 'IssueStore':
+        """
+        Builds the store from Issue objects. Missing attributes are treated
+        as missing values, so partially populated issues are accepted.
+        """
+        builder = _Builder()
+        for issue in issues:
+            builder.add_issue(issue)
+        return cls(builder.columns(), builder.pools)
+
+    @classmethod
+    def concat(cls, stores: List['IssueStore']) -> 'IssueStore':
+        """
+        Appends stores in the given order. The string pools are merged and the
+        codes of every store are translated to the merged pools.
+        """
+        if len(stores) == 1:
+            return stores[0]
+        pools = {p: StringPool() for p in cls.POOLS}
+        parts = {name: [] for name in _Builder().columns()}
+        for store in stores:
+            # The extra trailing entry maps MISSING (-1) to itself
+            remap = {
+                p: np.array([pools[p].encode(v) for v in store.pools[p].values] + [MISSING], dtype=np.int32)
+                for p in cls.POOLS
+            }
+            for name, column in store.columns.items():
+                if name in cls.STRING_COLUMNS:
+                    column = remap[cls.STRING_COLUMNS[name]][column]
+                parts[name].append(np.asarray(column))
+
+        columns = {}
+        for name, chunks in parts.items():
+            if name in cls.SEGMENTS:
+                shifted, base = [], 0
+                for offsets in chunks:
+                    shifted.append(offsets[:-1] + base)
+                    base += int(offsets[-1])
+                shifted.append(np.array([base], dtype=np.int64))
+                columns[name] = np.concatenate(shifted)
+            else:
+                columns[name] = np.concatenate(chunks)
+        return cls(columns, pools)
+
+    def __len__(self):
+        return len(self.columns['number'])
+
+    def __getitem__(self, index: int) -> Issue:
+        return self.issue(index)
+
+    def __iter__(self) -> Iterator[Issue]:
+        for i in range(len(self)):
+            yield self.issue(i)
+
+    @property
+    def num_events(self) -> int:
+        return len(self.columns['event_type'])
+
+    def issue(self, index: int) -> Issue:
+        """
+        Materializes the issue at the given row.
+        """
+        c = self.columns
+        users, texts = self.pools['users'], self.pools['texts']
+        issue = Issue()
+        issue.url = texts.decode(c['url'][index])
+        issue.creator = users.decode(c['creator'][index])
+        issue.labels = self.pools['labels'].decode_many(self.__segment('label', index))
+        state = c['state'][index]
+        issue.state = None if state < 0 else _STATES[state]
+        issue.assignees = users.decode_many(self.__segment('assignee', index))
+        issue.title = texts.decode(c['title'][index])
+        issue.text = texts.decode(c['text'][index])
+        issue.number = int(c['number'][index])
+        issue.created_date = to_datetime(c['created_date'][index])
+        issue.updated_date = to_datetime(c['updated_date'][index])
+        issue.timeline_url = texts.decode(c['timeline_url'][index])
+        start, end = self.event_range(index)
+        issue.defer_events(range(start, end), self.event)
+        return issue
+
+    def event(self, index: int) -> Event:
+        """
+        Materializes the event at the given row of the event arrays.
+        """
+        c = self.columns
+        event = Event(None)
+        event.event_type = self.pools['event_types'].decode(c['event_type'][index])
+        event.author = self.pools['users'].decode(c['event_author'][index])
+        event.event_date = to_datetime(c['event_date'][index])
+        event.label = self.pools['labels'].decode(c['event_label'][index])
+        event.comment = self.pools['texts'].decode(c['event_comment'][index])
+        return event
+
+    def event_range(self, index: int):
+        """
+        Returns the (start, end) rows of the events of an issue.
+        """
+        offsets = self.columns['event_offsets']
+        return int(offsets[index]), int(offsets[index + 1])
+
+    def code(self, pool: str, value: str) -> int:
+        """
+        Returns the code of a value in one of the pools, or MISSING.
+        """
+        return self.pools[pool].lookup(value)
+
+    @property
+    def event_issue(self) -> np.ndarray:
+        """
+        Row of the owning issue for every event.
+        """
+        if self._event_issue is None:
+            self._event_issue = self.__owner_rows(self.columns['event_offsets'])
+        return self._event_issue
+
+    @property
+    def label_issue(self) -> np.ndarray:
+        """
+        Row of the owning issue for every entry of label_codes.
+        """
+        if self._label_issue is None:
+            self._label_issue = self.__owner_rows(self.columns['label_offsets'])
+        return self._label_issue
+
+    @property
+    def index(self) -> IssueIndex:
+        """
+        Inverted indexes over labels, authors and event types, built on
+        first access and persisted together with the store.
+        """
+        if self._index is None:
+            self._index = IssueIndex(self)
+        return self._index
+
+    @property
+    def frames(self):
+        """
+        pandas DataFrames over the store (see IssueFrames), built on first
+        access and kept with the store.
+        """
+        if self._frames is None:
+            # Imported here so that pandas is only loaded when frames are used
+            from models.IssueFrames import IssueFrames
+            self._frames = IssueFrames(self)
+        return self._frames
+
+    def set_index(self, indexes: Dict[str, InvertedIndex]):
+        """
+        Attaches previously built indexes, e.g. from a snapshot.
+        """
+        self._index = IssueIndex(self, indexes)
+
+    def event_counts(self, event_type: str) -> np.ndarray:
+        """
+        Number of events of the given type for every issue.
+        """
+        rows = self.index.events_of_type(event_type)
+        return np.bincount(self.event_issue[rows], minlength=len(self)).astype(np.int64)
+
+    def take(self, rows: np.ndarray) -> 'IssueStore':
+        """
+        Returns a store with only the given issue rows, in the given order,
+        together with their labels, assignees and events. Pools are shared.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        segmented = set(self.SEGMENTS).union(*self.SEGMENTS.values())
+        columns = {
+            name: np.asarray(column)[rows]
+            for name, column in self.columns.items() if name not in segmented
+        }
+        for offsets_name, names in self.SEGMENTS.items():
+            offsets = self.columns[offsets_name]
+            starts = offsets[rows]
+            lengths = offsets[rows + 1] - starts
+            new_offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+            np.cumsum(lengths, out=new_offsets[1:])
+            index = np.repeat(starts - new_offsets[:-1], lengths) + np.arange(new_offsets[-1])
+            columns[offsets_name] = new_offsets
+            for name in names:
+                columns[name] = np.asarray(self.columns[name])[index]
+        return IssueStore(columns, self.pools)
+
+    def merge(self, delta: 'IssueStore') -> Tuple['IssueStore', 'MergeStats']:
+        """
+        Merges a delta export into this store. Issues are matched by number.
+        A delta issue replaces the stored one in place if its updated_date is
+        newer, and is appended if the number is not stored yet. Issues without
+        a number are always appended. If the delta holds the same number more
+        than once, its last occurrence is used.
+        Returns the merged store and the merge statistics.
+        """
+        numbers = np.asarray(delta.columns['number'])
+        # Last occurrence of every number in the delta
+        _, last = np.unique(numbers[::-1], return_index=True)
+        delta_rows = np.sort(len(numbers) - 1 - last)
+        delta_rows = np.union1d(delta_rows, np.flatnonzero(numbers < 0))
+
+        keys = numbers[delta_rows]
+        base_numbers = np.asarray(self.columns['number'])
+        order = np.argsort(base_numbers, kind='stable')
+        found = np.zeros(len(keys), dtype=bool)
+        base_rows = np.zeros(len(keys), dtype=np.int64)
+        if len(base_numbers):
+            pos = np.minimum(np.searchsorted(base_numbers[order], keys), len(order) - 1)
+            base_rows = order[pos]
+            found = (keys >= 0) & (base_numbers[base_rows] == keys)
+
+        newer = found.copy()
+        newer[found] = (
+            np.asarray(delta.columns['updated_date'])[delta_rows[found]]
+            > np.asarray(self.columns['updated_date'])[base_rows[found]]
+        )
+
+        stats = MergeStats(
+            added=int(np.count_nonzero(~found)),
+            updated=int(np.count_nonzero(newer)),
+            unchanged=int(np.count_nonzero(found & ~newer)),
+        )
+        if stats.added == 0 and stats.updated == 0:
+            return self, stats
+
+        combined = IssueStore.concat([self, delta])
+        rows = np.arange(len(self), dtype=np.int64)
+        rows[base_rows[newer]] = len(self) + delta_rows[newer]
+        rows = np.concatenate([rows, len(self) + delta_rows[~found]])
+        return combined.take(rows), stats
+
+    def nbytes(self) -> int:
+        """
+        Memory held by the numeric columns.
+        """
+        return sum(column.nbytes for column in self.columns.values())
+
+    def __segment(self, name: str, index: int) -> np.ndarray:
+        offsets = self.columns[f'{name}_offsets']
+        return self.columns[f'{name}_codes'][offsets[index]:offsets[index + 1]]
+
+    def __owner_rows(self, offsets: np.ndarray) -> np.ndarray:
+        return np.repeat(np.arange(len(offsets) - 1, dtype=np.int64), np.diff(offsets))
+
+
+class MergeStats:
+    """
+    Outcome of IssueStore.merge().
+    """
+
+    def __init__(self, added: int = 0, updated: int = 0, unchanged: int = 0):
+        self.added = added
+        self.updated = updated
+        self.unchanged = unchanged
+
+    def __repr__(self):
+        return f'MergeStats(added={self.added}, updated={self.updated}, unchanged={self.unchanged})'
+
+    def __eq__(self, other):
+        return isinstance(other, MergeStats) and vars(self) == vars(other)
+
+
+def to_nanoseconds(value) -> int:
+    """
+    Converts a datetime (or date string) to nanoseconds since the epoch.
+    Naive datetimes are interpreted as UTC. Returns NAT for missing values.
+    """
+    if value is None:
+        return NAT
+    if isinstance(value, str):
+        try:
+            value = parse_date(value)
+        except ValueError:
+            return NAT
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    delta = value - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000_000 + delta.microseconds * 1000
+
+
+def to_datetime(value: int) -> datetime:
+    """
+    Inverse of to_nanoseconds. Returns a timezone-aware UTC datetime.
+    """
+    if value == NAT:
+        return None
+    return _EPOCH + timedelta(microseconds=int(value) // 1000)
+
+
+class _Builder:
+    """
+    Accumulates rows in Python lists and converts them to arrays whenever
+    flush() is called, so that the lists never hold more than one chunk of
+    rows. The arrays of all chunks are concatenated at the end.
+    """
+
+    def __init__(self, fields: AbstractSet[str] = None):
+        self.fields = fields
+        self.event_fields = event_fields(fields)
+        self.pools = {p: StringPool() for p in IssueStore.POOLS}
+        self.rows = {name: [] for name in [
+            'number', 'state', 'creator', 'created_date', 'updated_date',
+            'url', 'title', 'text', 'timeline_url',
+            'label_codes', 'assignee_codes',
+            'event_type', 'event_author', 'event_date', 'event_label', 'event_comment',
+        ]}
+        self.offsets = {'label_offsets': [0], 'assignee_offsets': [0], 'event_offsets': [0]}
+        # Arrays of the flushed chunks, and the number of flushed rows
+        self.chunks = {name: [] for name in list(self.rows) + list(self.offsets)}
+        self.flushed = {name: 0 for name in self.rows}
+
+    def add_record(self, jobj: dict):
+        if self.fields is not None:
+            jobj = self.__project(jobj)
+        try:
+            number = int(jobj.get('number', '-1'))
+        except (TypeError, ValueError):
+            number = -1
+        self.__add(
+            number=number,
+            state=jobj.get('state'),
+            creator=jobj.get('creator'),
+            created_date=to_nanoseconds(jobj.get('created_date')),
+            updated_date=to_nanoseconds(jobj.get('updated_date')),
+            url=jobj.get('url'),
+            title=jobj.get('title'),
+            text=jobj.get('text'),
+            timeline_url=jobj.get('timeline_url'),
+            labels=jobj.get('labels') or [],
+            assignees=jobj.get('assignees') or [],
+            events=[(
+                e.get('event_type'),
+                e.get('author'),
+                to_nanoseconds(e.get('event_date')),
+                e.get('label'),
+                e.get('comment'),
+            ) for e in jobj.get('events') or []]
+        )
+
+    def __project(self, jobj: dict) -> dict:
+        """
+        Drops the fields that are not selected, before anything is decoded.
+        """
+        projected = {name: jobj[name] for name in self.fields if name in jobj}
+        if self.event_fields:
+            projected['events'] = [
+                {name: e[name] for name in self.event_fields if name in e}
+                for e in jobj.get('events') or []
+            ]
+        return projected
+
+    def add_issue(self, issue: Issue):
+        self.__add(
+            number=getattr(issue, 'number', -1),
+            state=getattr(issue, 'state', None),
+            creator=getattr(issue, 'creator', None),
+            created_date=to_nanoseconds(getattr(issue, 'created_date', None)),
+            updated_date=to_nanoseconds(getattr(issue, 'updated_date', None)),
+            url=getattr(issue, 'url', None),
+            title=getattr(issue, 'title', None),
+            text=getattr(issue, 'text', None),
+            timeline_url=getattr(issue, 'timeline_url', None),
+            labels=getattr(issue, 'labels', None) or [],
+            assignees=getattr(issue, 'assignees', None) or [],
+            events=[(
+                getattr(e, 'event_type', None),
+                getattr(e, 'author', None),
+                to_nanoseconds(getattr(e, 'event_date', None)),
+                getattr(e, 'label', None),
+                getattr(e, 'comment', None),
+            ) for e in getattr(issue, 'events', None) or [] if e]
+        )
+
+    def __add(self, number, state, creator, created_date, updated_date,
+              url, title, text, timeline_url, labels, assignees, events):
+        rows, users, texts, labels_pool = self.rows, self.pools['users'], self.pools['texts'], self.pools['labels']
+        rows['number'].append(number)
+        rows['state'].append(_STATES.index(State(state)) if state else MISSING)
+        rows['creator'].append(users.encode(creator))
+        rows['created_date'].append(created_date)
+        rows['updated_date'].append(updated_date)
+        rows['url'].append(texts.encode(url))
+        rows['title'].append(texts.encode(title))
+        rows['text'].append(texts.encode(text))
+        rows['timeline_url'].append(texts.encode(timeline_url))
+
+        rows['label_codes'].extend(labels_pool.encode(label) for label in labels)
+        self.offsets['label_offsets'].append(self.flushed['label_codes'] + len(rows['label_codes']))
+        rows['assignee_codes'].extend(users.encode(user) for user in assignees)
+        self.offsets['assignee_offsets'].append(self.flushed['assignee_codes'] + len(rows['assignee_codes']))
+
+        event_types = self.pools['event_types']
+        for event_type, author, event_date, label, comment in events:
+            rows['event_type'].append(event_types.encode(event_type))
+            rows['event_author'].append(users.encode(author))
+            rows['event_date'].append(event_date)
+            rows['event_label'].append(labels_pool.encode(label))
+            rows['event_comment'].append(texts.encode(comment))
+        self.offsets['event_offsets'].append(self.flushed['event_type'] + len(rows['event_type']))
+
+    def flush(self):
+        """
+        Converts the accumulated rows to arrays and empties the lists.
+        """
+        for name, values in self.rows.items():
+            self.flushed[name] += len(values)
+        for name, values in list(self.rows.items()) + list(self.offsets.items()):
+            if values:
+                self.chunks[name].append(np.asarray(values, dtype=_dtype(name)))
+                values.clear()
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        self.flush()
+        columns = {}
+        for name, chunks in self.chunks.items():
+            if not chunks:
+                columns[name] = np.zeros(0, dtype=_dtype(name))
+            else:
+                columns[name] = chunks[0] if len(chunks) == 1 else np.concatenate(chunks)
+        return columns
+
+
+def _dtype(name: str):
+    if name in IssueStore.DATE_COLUMNS or name == 'number' or name.endswith('_offsets'):
+        return np.int64
+    if name == 'state':
+        return np.int8
+    return np.int32
@@ -2,10 +2,155 @@
 """Starting point of the application."""
 
 import argparse
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+from util import profiler
+
+# Flags that turn on profiling. Profiling starts before the features are
+# discovered, so that config init and feature discovery are measured too.
+PROFILE_FLAGS = ['--profile', '--profile-json', '--profile-trace']
+if any(arg.split('=')[0] in PROFILE_FLAGS for arg in sys.argv[1:]):
+    profiler.enable()
 
 import analyses
 import config
+from util import figures, memory_budget
+
+
+def __add_loader_arguments(parser: argparse.ArgumentParser):
+    """
+    Adds the arguments that control how the issue data is loaded.
+    These apply to every feature.
+    """
+    parser.add_argument(
+        '--stream',
+        action='store_true',
+        default=None,
+        help='Stream issues from the data file, keeping only the fields and issues the features need, '
+             'instead of loading the whole dataset into memory'
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        default=None,
+        help='Parse the data file without reading or writing the dataset cache'
+    )
+    parser.add_argument(
+        '--rebuild-cache',
+        action='store_true',
+        default=None,
+        help='Re-parse the data file and replace its entry in the dataset cache'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        help='Number of processes used to parse sharded data files (default: number of CPUs)'
+    )
+    parser.add_argument(
+        '--max-memory',
+        type=__memory_size,
+        metavar='SIZE',
+        help='Memory budget of the data, e.g. 512M or 2G. Loading and the analyses switch to '
+             'cheaper strategies to stay within it, or stop with an error'
+    )
+
+
+def __memory_size(value: str) -> int:
+    """
+    Argument type of --max-memory.
+    """
+    try:
+        return memory_budget.parse_size(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def __add_output_arguments(parser: argparse.ArgumentParser):
+    """
+    Adds the arguments that control how figures are produced.
+    These apply to every feature.
+    """
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument(
+        '--output', '-o',
+        type=str,
+        help='Write the figures to this directory instead of showing them'
+    )
+    group.add_argument(
+        '--no-plot',
+        action='store_true',
+        default=None,
+        help='Only print the results, without drawing any figure'
+    )
+    parser.add_argument(
+        '--format',
+        dest='figure_format',
+        choices=figures.FORMATS,
+        help='Image format of the figures written with --output (default: png)'
+    )
+
+
+def __add_profile_arguments(parser: argparse.ArgumentParser):
+    """
+    Adds the arguments that control profiling.
+    """
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Print the wall time, CPU time and peak memory of every stage after the run'
+    )
+    parser.add_argument(
+        '--profile-json',
+        metavar='FILE',
+        help='Profile the run and write the stages to FILE as JSON'
+    )
+    parser.add_argument(
+        '--profile-trace',
+        metavar='FILE',
+        help='Profile the run and write the stages to FILE in Chrome trace-event format'
+    )
+
+
+def __add_dataset_arguments(parser: argparse.ArgumentParser):
+    """
+    Adds the argument that runs the features on several datasets.
+    """
+    parser.add_argument(
+        '--dataset',
+        action='append',
+        type=__dataset,
+        metavar='NAME=PATH',
+        help='Run the features on this dataset instead of the configured data path and compare '
+             'the results of all datasets. Repeat it for every dataset, e.g. for every repository'
+    )
+
+
+def __dataset(value: str):
+    """
+    Argument type of --dataset.
+    """
+    # Imported here, like the loader, so that listing the features does not load numpy
+    import comparison
+    try:
+        return comparison.parse_dataset(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def __feature_ids(value: str) -> List[int]:
+    """
+    Argument type of --feature: a feature ID, a comma separated list of
+    IDs, or 'all' for every registered feature.
+    """
+    if value == 'all':
+        return sorted(analyses.FEATURES.keys())
+    try:
+        return [int(fid) for fid in value.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid feature list: '{value}'")
 
 
 def __parse_args():
@@ -22,14 +167,26 @@ def __parse_args():
     group = parser.add_mutually_exclusive_group(required=True)
     group.add_argument(
         '--feature', '-f',
-        type=int,
-        help='Which feature to run (integer ID)'
+        type=__feature_ids,
+        help="Which feature(s) to run: an integer ID, a comma separated list of IDs, or 'all'"
     )
     group.add_argument(
         '--list-features', '-l',
         action='store_true',
         help='List all available features with their IDs and arguments'
     )
+    group.add_argument(
+        '--invalidate-results',
+        nargs='?',
+        const='all',
+        type=__feature_ids,
+        metavar='FEATURES',
+        help="Remove the cached results of the given features (default: all) and exit"
+    )
+    __add_loader_arguments(parser)
+    __add_output_arguments(parser)
+    __add_profile_arguments(parser)
+    __add_dataset_arguments(parser)
     
     # Parse known arguments first
     args, remaining_argv = parser.parse_known_args()
@@ -44,52 +201,180 @@ def __parse_args():
                 print(f"\t{arg.flags:<25} {arg.help}")
             print()
         sys.exit(0)
+
+    if args.invalidate_results:
+        removed = analyses.BaseAnalysis.result_cache().invalidate(args.invalidate_results)
+        print(f"Removed {removed} cached results.")
+        # E.g. the layouts of feature 4's network
+        drawings = sum(
+            analyses.FEATURES[fid].invalidate_drawings()
+            for fid in args.invalidate_results if fid in analyses.FEATURES
+        )
+        if drawings:
+            print(f"Removed {drawings} cached drawings.")
+        sys.exit(0)
     
     if not args.feature:
         print("Error: --feature is required unless --list-features is specified.")
         parser.print_help()
         sys.exit(1)
     
-    feature_id = args.feature
-    feature = analyses.FEATURES.get(feature_id)
+    features = []
+    for feature_id in args.feature:
+        feature = analyses.FEATURES.get(feature_id)
+        if not feature:
+            print(f"Error: Feature with ID {feature_id} is not recognized.")
+            available_ids = ', '.join(str(fid) for fid in analyses.FEATURES.keys())
+            print(f"Available feature IDs: {available_ids}")
+            sys.exit(1)
+        features.append(feature)
     
-    if not feature:
-        print(f"Error: Feature with ID {feature_id} is not recognized.")
-        available_ids = ', '.join(str(fid) for fid in analyses.FEATURES.keys())
-        print(f"Available feature IDs: {available_ids}")
-        sys.exit(1)
-    
-    # Create a new parser for feature-specific arguments
+    # Create a new parser for feature-specific arguments. Features may share
+    # arguments such as --label, so later definitions replace earlier ones.
     feature_parser = argparse.ArgumentParser(
-        description=f"Run the '{feature.name()}' feature."
+        description=f"Run the {', '.join(repr(f.name()) for f in features)} feature(s).",
+        conflict_handler='resolve'
     )
     # Re-add the --feature argument to ensure it's recognized
     feature_parser.add_argument(
         '--feature', '-f',
-        type=int,
+        type=__feature_ids,
         required=True,
-        help='Which feature to run (integer ID)'
+        help="Which feature(s) to run: an integer ID, a comma separated list of IDs, or 'all'"
     )
-    # Let the feature add its own arguments
-    feature.add_arguments(feature_parser)
+    __add_loader_arguments(feature_parser)
+    __add_output_arguments(feature_parser)
+    __add_profile_arguments(feature_parser)
+    __add_dataset_arguments(feature_parser)
+    # Let the features add their own arguments
+    for feature in features:
+        feature.add_arguments(feature_parser)
     
     # Parse all arguments including feature-specific ones
     feature_args = feature_parser.parse_args()
+    if feature_args.dataset:
+        names = [name for name, _ in feature_args.dataset]
+        if len(set(names)) < len(names):
+            feature_parser.error('every --dataset needs a different name, give them with NAME=PATH')
     
     return feature_args
 
+
+def __prepare_shared_data(features):
+    """
+    Loads the dataset once with every field the features need. The features
+    then get it from the DataLoader instead of loading on their own, and
+    share the derived values cached with it (DataFrames, event counts per
+    type and indexes).
+    """
+    from data_loader import DataLoader
+    DataLoader().get_store(analyses.required_fields(features))
+
+
+def _run_feature(feature_id: int, args):
+    feature = analyses.FEATURES[feature_id]
+    with profiler.stage(feature.name()):
+        feature.run(args)
+
+
+def __run_features(feature_ids: List[int], args):
+    """
+    Runs the features one after the other. Features that do not show their
+    figures in a window (--output or --no-plot) are run in parallel in a
+    process pool instead; with the fork start method the workers inherit
+    the dataset loaded by __prepare_shared_data(). When profiling, features
+    always run one after the other so that their stages are measured in
+    this process and in isolation.
+    """
+    workers = 1
+    if len(feature_ids) > 1 and (not figures.enabled() or figures.output_dir()) and not profiler.enabled():
+        workers = min(len(feature_ids), config.get_parameter('workers') or os.cpu_count() or 1)
+    if workers <= 1:
+        for feature_id in feature_ids:
+            _run_feature(feature_id, args)
+        return
+
+    exit_code = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_run_feature, feature_id, args) for feature_id in feature_ids]
+        for future in futures:
+            try:
+                future.result()
+            except SystemExit as e:
+                # Let the other features finish before exiting
+                exit_code = exit_code or e.code
+    if exit_code:
+        sys.exit(exit_code)
+
+
+def __serve(argv: List[str]):
+    """
+    Runs the resident analysis server, see server.py.
+    """
+    parser = argparse.ArgumentParser(
+        prog='run.py serve',
+        description='Load the dataset once and serve analysis requests as JSON over HTTP.'
+    )
+    parser.add_argument('--host', default='127.0.0.1', help='Interface to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8611, help='Port to listen on (default: 8611)')
+    parser.add_argument('--socket', help='Listen on this Unix socket instead of a TCP port')
+    __add_loader_arguments(parser)
+    args = parser.parse_args(argv)
+    config.overwrite_from_args(args)
+
+    # Imported here since only the server needs it
+    import server
+    server.serve(args.host, args.port, args.socket)
+
+
 def main():
+    if sys.argv[1:2] == ['serve']:
+        __serve(sys.argv[2:])
+        return
+
     args = __parse_args()
     config.overwrite_from_args(args)
 
-    feature = analyses.FEATURES.get(args.feature)
-    if feature:
-        feature.run(args)
-    else:
+    features = [analyses.FEATURES.get(fid) for fid in args.feature]
+    if not all(features):
         # A redundant safety checkk. Redundant becvause we checked in __parse_args
         print(f"Error: Feature '{args.feature}' not recognized!")
         print(f"Need to pick a feature between 1 and {len(analyses.FEATURES)}")
         sys.exit(1)
 
+    profiling = args.profile or args.profile_json or args.profile_trace
+    if profiling and not profiler.enabled():
+        profiler.enable()
+    try:
+        if args.dataset:
+            import comparison
+            comparison.run(args.dataset, args.feature, args)
+            return
+        if len(features) > 1 and not config.get_parameter('stream'):
+            __prepare_shared_data(features)
+        __run_features(args.feature, args)
+    except memory_budget.MemoryBudgetError as e:
+        print(f'Error: {e}')
+        sys.exit(1)
+    except MemoryError:
+        print('Error: Ran out of memory. Set a budget with --max-memory to switch to cheaper strategies.')
+        sys.exit(1)
+    finally:
+        if profiling:
+            __write_profile(args)
+
+
+def __write_profile(args):
+    """
+    Prints and exports the stages recorded by --profile.
+    """
+    print(f'\nProfile:\n{profiler.summary()}')
+    if args.profile_json:
+        profiler.write_json(args.profile_json)
+        print(f'Wrote profile to {args.profile_json}')
+    if args.profile_trace:
+        profiler.write_chrome_trace(args.profile_trace)
+        print(f'Wrote trace to {args.profile_trace}')
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,245 @@
+import base64
+import contextlib
+import io
+import json
+import os
+import socketserver
+import tempfile
+from argparse import ArgumentError, ArgumentParser, Namespace
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Any, Dict, List
+
+import analyses
+import config
+import data_loader
+from data_loader import DataLoader
+from util import figures
+from util.memory_budget import MemoryBudgetError
+
+'''
+Resident analysis server, started with `run.py serve`. The dataset is loaded
+once and kept in memory together with its indexes and cached DataFrames, so
+every request only pays for the analysis itself. When the data files change,
+the next request loads them again.
+
+API (JSON over HTTP, on a local TCP port or a Unix socket):
+    GET  /features  lists the features and their arguments.
+    POST /run       runs a feature, e.g.
+                    {"feature": 1, "args": {"label": "Bug"}, "images": true, "format": "svg"}
+                    and replies with {"feature", "name", "result", "output"} and,
+                    if images were requested, "images": {file name: base64 data}.
+'''
+
+
+class AnalysisError(Exception):
+    """
+    A request that could not be served, with the HTTP status to reply with.
+    """
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class AnalysisService:
+    """
+    Runs features against the resident dataset.
+    """
+
+    def warm_up(self):
+        """
+        Loads the full dataset and builds its indexes, so that the first
+        request does not pay for it. The loader records the fingerprint of
+        the data files it was loaded from.
+        """
+        store = DataLoader().get_store()
+        store.index
+
+    def features(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                'feature': fid,
+                'name': feature.name(),
+                'description': feature.description(),
+                'arguments': [{'flags': a.flags, 'help': a.help} for a in feature.get_arguments_info()],
+            }
+            for fid, feature in sorted(analyses.FEATURES.items())
+        ]
+
+    def run(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Runs the feature named by the request and returns its results, the
+        text it printed and, if requested, its figures.
+
+        Raises:
+            AnalysisError: If the request is invalid or the feature fails.
+        """
+        if not isinstance(request, dict):
+            raise AnalysisError(400, 'The request must be a JSON object')
+        feature_id = request.get('feature')
+        feature = analyses.FEATURES.get(feature_id) if isinstance(feature_id, int) else None
+        if feature is None:
+            raise AnalysisError(404, f'Feature {feature_id!r} is not recognized')
+        args = self.__parse_arguments(feature, request.get('args') or {})
+        image_format = request.get('format', 'png')
+        if image_format not in figures.FORMATS:
+            raise AnalysisError(400, f'Unsupported image format {image_format!r}')
+        self.__reload_if_changed()
+
+        with tempfile.TemporaryDirectory() as output_dir:
+            images = bool(request.get('images'))
+            # Parameters of earlier requests or of the server do not apply
+            parameters = {'output': None, 'figure_format': None, 'no_plot': None}
+            if images:
+                parameters.update(output=output_dir, figure_format=image_format)
+            else:
+                parameters.update(no_plot=True)
+            output = io.StringIO()
+            with config.override_parameters(parameters), contextlib.redirect_stdout(output):
+                try:
+                    result = feature.run(args)
+                except SystemExit:
+                    raise AnalysisError(422, output.getvalue().strip() or 'The feature failed')
+                except MemoryBudgetError as e:
+                    raise AnalysisError(503, str(e))
+
+            response = {
+                'feature': feature_id,
+                'name': feature.name(),
+                'result': result,
+                'output': output.getvalue(),
+            }
+            if images:
+                response['images'] = {}
+                for name in sorted(os.listdir(output_dir)):
+                    with open(os.path.join(output_dir, name), 'rb') as fin:
+                        response['images'][name] = base64.b64encode(fin.read()).decode('ascii')
+        return response
+
+    def __reload_if_changed(self):
+        """
+        Loads the dataset again if the data files changed since it was
+        loaded, so that no request is answered from stale data.
+        """
+        try:
+            changed = data_loader.loaded_fingerprint() != DataLoader().fingerprint()
+        except FileNotFoundError:
+            # The data files are being replaced, keep serving the loaded data
+            return
+        if changed:
+            print('The data files changed, loading them again.')
+            data_loader.unload()
+            try:
+                self.warm_up()
+            except MemoryBudgetError as e:
+                raise AnalysisError(503, str(e))
+
+    def __parse_arguments(self, feature, arguments: Dict[str, Any]) -> Namespace:
+        """
+        Parses the feature arguments of a request with the feature's own
+        argument parser, so that they are validated and defaulted exactly
+        like on the command line. {"active_labels": 5} is --active-labels 5,
+        and flags are given as true.
+        """
+        if not isinstance(arguments, dict):
+            raise AnalysisError(400, 'The feature arguments must be a JSON object')
+        parser = ArgumentParser(prog=feature.name(), exit_on_error=False, conflict_handler='resolve')
+        feature.add_arguments(parser)
+        argv = []
+        for name, value in arguments.items():
+            flag = '--' + name.replace('_', '-')
+            if value is True:
+                argv.append(flag)
+            elif value is not None and value is not False:
+                argv += [flag, str(value)]
+        errors = io.StringIO()
+        try:
+            with contextlib.redirect_stderr(errors):
+                args, unknown = parser.parse_known_args(argv)
+        except (ArgumentError, SystemExit) as e:
+            raise AnalysisError(400, errors.getvalue().strip() or str(e))
+        if unknown:
+            raise AnalysisError(400, f"Unrecognized arguments: {' '.join(unknown)}")
+        return args
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path == '/features':
+            self.__send(200, self.server.service.features())
+        else:
+            self.__send(404, {'error': f'Unknown path {self.path}'})
+
+    def do_POST(self):
+        if self.path != '/run':
+            self.__send(404, {'error': f'Unknown path {self.path}'})
+            return
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            request = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError as e:
+            self.__send(400, {'error': f'Invalid JSON: {e}'})
+            return
+        try:
+            response = self.server.service.run(request)
+        except AnalysisError as e:
+            self.__send(e.status, {'error': e.message})
+            return
+        except Exception as e:
+            # A bug in a feature must not take the connection down with it
+            self.log_error('Feature failed: %r', e)
+            self.__send(500, {'error': f'{type(e).__name__}: {e}'})
+            return
+        self.__send(200, response)
+
+    def address_string(self):
+        # Clients of a Unix socket have no address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'local'
+
+    def __send(self, status: int, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _UnixHTTPServer(socketserver.UnixStreamServer):
+    pass
+
+
+def create_server(host: str = '127.0.0.1', port: int = 8611, socket_path: str = None):
+    """
+    Creates the HTTP server, listening on the Unix socket if a path is
+    given and on the local TCP port otherwise. Requests are served one at
+    a time, since the analyses share the figure state of matplotlib.
+    """
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = _UnixHTTPServer(socket_path, _Handler)
+    else:
+        server = HTTPServer((host, port), _Handler)
+    server.service = AnalysisService()
+    return server
+
+
+def serve(host: str = '127.0.0.1', port: int = 8611, socket_path: str = None):
+    """
+    Loads the dataset and serves analysis requests until interrupted.
+    """
+    server = create_server(host, port, socket_path)
+    server.service.warm_up()
+    address = socket_path or f'http://{server.server_address[0]}:{server.server_address[1]}'
+    print(f'Serving analyses on {address}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
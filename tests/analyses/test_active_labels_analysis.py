@@ -1,8 +1,10 @@
+import os
 import unittest
 from unittest.mock import MagicMock, patch
 from analyses.active_labels_analysis import ActiveLabelsAnalysis
 from models.Issue import Issue
 from models.Event import Event
+from models.IssueFrames import IssueFrames
 from data_loader import DataLoader
 import pandas as pd
 
@@ -18,6 +20,9 @@ class Issue:
         self.labels = labels
         self.events = events
 
+    def count_events(self, event_type: str) -> int:
+        return sum(1 for event in self.events if event.event_type == event_type)
+
 
 class TestActiveLabelsAnalysis(unittest.TestCase):
     def setUp(self):
@@ -45,23 +50,37 @@ class TestActiveLabelsAnalysis(unittest.TestCase):
             ),
         ]
 
+        self.frames = IssueFrames.from_issues(self.issues)
+
         # Mock DataLoader to return the mock issues
-        DataLoader.get_issues = MagicMock(return_value=self.issues)
+        patcher = patch.object(DataLoader, "get_frames", MagicMock(return_value=self.frames))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        # The loader is mocked, so results must not come from the result cache
+        env = patch.dict(os.environ, {"no_cache": "json:true"})
+        env.start()
+        self.addCleanup(env.stop)
 
         # Instance of ActiveLabelsAnalysis for testing
         self.analysis = ActiveLabelsAnalysis()
 
     def test_create_dataframe(self):
         # Test the creation of the dataframe
-        df = self.analysis._ActiveLabelsAnalysis__create_dataframe(self.issues, label_filter=None)
+        df = self.analysis._ActiveLabelsAnalysis__create_dataframe(self.frames, label_filter=None)
         self.assertIsInstance(df, pd.DataFrame)
         self.assertEqual(len(df), 5)  # Total rows = total label occurrences
         self.assertTrue("label" in df.columns)
         self.assertTrue("num_comments" in df.columns)
 
+    def test_create_dataframe_with_label_filter(self):
+        df = self.analysis._ActiveLabelsAnalysis__create_dataframe(self.frames, label_filter="feature")
+        self.assertEqual(list(df["label"]), ["feature", "feature"])
+        self.assertEqual(list(df["num_comments"]), [2, 1])
+
     def test_aggregate(self):
         # Test the aggregation of comments per label
-        df = self.analysis._ActiveLabelsAnalysis__create_dataframe(self.issues, label_filter=None)
+        df = self.analysis._ActiveLabelsAnalysis__create_dataframe(self.frames, label_filter=None)
         aggregated = self.analysis._ActiveLabelsAnalysis__aggregate(df)
         self.assertEqual(aggregated["bug"], 3)  # 'bug' has 3 comments total
         self.assertEqual(aggregated["feature"], 3)  # 'feature' has 3 comments total
@@ -70,12 +89,33 @@ class TestActiveLabelsAnalysis(unittest.TestCase):
     def test_print_occurrences(self):
         # Test the printing of label occurrences
         with patch("builtins.print") as mocked_print:
-            self.analysis._ActiveLabelsAnalysis__print_occurrences(self.issues, "bug")
+            self.analysis._ActiveLabelsAnalysis__print_occurrences("bug", 2, 3)
             mocked_print.assert_called_with("\n\nThe label 'bug' occurred 2 times across 3 issues.\n")
 
+    def test_run_prints_labels_without_plot(self):
+        with patch.dict(os.environ, {"no_plot": "json:true"}), \
+                patch("builtins.print") as mocked_print:
+            args = MagicMock()
+            args.label = None
+            args.active_labels = 2
+            self.analysis.run(args)
+        printed = "\n".join(str(call.args[0]) for call in mocked_print.call_args_list)
+        self.assertIn("Number of comments on the 2 most active labels:", printed)
+        self.assertRegex(printed, r"feature\s+3")
+        self.assertNotIn("documentation", printed)
+
+    def test_results_hold_every_label(self):
+        args = MagicMock()
+        args.label = None
+        args.active_labels = 1
+        with patch.dict(os.environ, {"no_plot": "json:true"}), patch("builtins.print"):
+            result = self.analysis.run(args)
+        # Only printing and drawing are cut to the top labels
+        self.assertEqual(result["num_comments"], {"bug": 3, "feature": 3, "documentation": 1})
+
     def test_visualize_results(self):
         # Test visualization without displaying the plot
-        df = self.analysis._ActiveLabelsAnalysis__create_dataframe(self.issues, label_filter=None)
+        df = self.analysis._ActiveLabelsAnalysis__create_dataframe(self.frames, label_filter=None)
         aggregated = self.analysis._ActiveLabelsAnalysis__aggregate(df)
 
         with patch("matplotlib.pyplot.show"):
@@ -97,6 +137,28 @@ class TestActiveLabelsAnalysis(unittest.TestCase):
             args.active_labels = 2
             self.analysis.run(args)
 
+    def test_run_counts_occurrences(self):
+        # Occurrences are counted on the label frame
+        with patch("matplotlib.pyplot.show"), \
+                patch("builtins.print") as mocked_print:
+            args = MagicMock()
+            args.label = "bug"
+            args.active_labels = 2
+            self.analysis.run(args)
+            mocked_print.assert_called_with("\n\nThe label 'bug' occurred 2 times across 3 issues.\n")
+
+    def test_compare(self):
+        # Labels missing from a dataset's results are not counted as 0
+        results = {
+            "alpha": {"num_comments": {"bug": 3, "feature": 1}},
+            "beta": {"num_comments": {"feature": 4, "docs": 2, "bug": 0}},
+        }
+        args = MagicMock()
+        args.active_labels = 2
+        with patch("matplotlib.pyplot.show") as mock_show:
+            comparison = self.analysis.compare(results, args)
+        self.assertEqual(comparison, {"num_comments": {"alpha": {"feature": 1, "bug": 3}, "beta": {"feature": 4, "bug": 0}}})
+        mock_show.assert_called_once()
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,10 +1,14 @@
+import argparse
+import io
+import os
 import unittest
 from unittest.mock import MagicMock, patch
 from analyses.contributor_activity_analysis import ContributorActivityAnalysis
 from models.Issue import Issue
 from models.Event import Event
+from models.ActivityCounts import ActivityCounts
+from models.IssueStore import IssueStore
 from data_loader import DataLoader
-import pandas as pd
 
 
 # Mock Event and Issue classes
@@ -33,59 +37,102 @@ class TestContributorActivityAnalysis(unittest.TestCase):
                 Event(author="user3", event_date="2024-01-20"),
             ]),
         ]
+        self.store = IssueStore.from_issues(self.issues)
 
         # Mock DataLoader to return the mock issues
-        DataLoader.get_issues = MagicMock(return_value=self.issues)
+        patcher = patch.object(DataLoader, "load_store", MagicMock(return_value=self.store))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        # The loader is mocked, so results must not come from the result cache
+        env = patch.dict(os.environ, {"no_cache": "json:true"})
+        env.start()
+        self.addCleanup(env.stop)
 
         # Instance of ContributorActivityAnalysis for testing
         self.analysis = ContributorActivityAnalysis()
 
-    def test_create_dataframe(self):
-        # Test the creation of the dataframe
-        df = self.analysis._ContributorActivityAnalysis__create_dataframe(self.issues, user_filter=None)
-        self.assertIsInstance(df, pd.DataFrame)
-        self.assertEqual(len(df), 5)  # Total events
-        self.assertTrue("author" in df.columns)
-        self.assertTrue("event_date" in df.columns)
+    def test_count_activity(self):
+        # Test the counting of events per author and month
+        activity = self.analysis._ContributorActivityAnalysis__count_activity(self.store, None, "month")
+        self.assertIsInstance(activity, ActivityCounts)
+        self.assertEqual(activity.totals().sum(), 5)  # Total events
+        self.assertEqual(activity.authors, ["user1", "user2", "user3"])
+        self.assertEqual(activity.counts.shape, (3, 3))  # January to March
 
-    def test_create_dataframe_with_user_filter(self):
-        # Test the creation of the dataframe with a user filter
-        df = self.analysis._ContributorActivityAnalysis__create_dataframe(self.issues, user_filter="user1")
-        self.assertEqual(len(df), 2)  # Only events by 'user1'
+    def test_count_activity_with_user_filter(self):
+        # Test the counting with a user filter
+        activity = self.analysis._ContributorActivityAnalysis__count_activity(self.store, "user1", "month")
+        self.assertEqual(activity.authors, ["user1"])
+        self.assertEqual(activity.totals()[0], 2)  # Only events by 'user1'
 
     def test_aggregate(self):
-        # Test the aggregation of events per user and month
-        df = self.analysis._ContributorActivityAnalysis__create_dataframe(self.issues, user_filter=None)
-        aggregated = self.analysis._ContributorActivityAnalysis__aggregate(df)
-        self.assertIsInstance(aggregated, pd.DataFrame)
-        self.assertTrue("author" in aggregated.columns)
-        self.assertTrue("event_date" in aggregated.columns)
-        self.assertTrue("event_count" in aggregated.columns)
-
-        # Validate specific aggregation results
-        user1_data = aggregated[(aggregated["author"] == "user1")]
-        self.assertEqual(user1_data["event_count"].sum(), 2)
+        # Test the selection of the most active authors
+        activity = self.analysis._ContributorActivityAnalysis__count_activity(self.store, None, "month")
+        top_authors = self.analysis._ContributorActivityAnalysis__aggregate(activity, 2)
+        self.assertEqual([activity.authors[row] for row in top_authors], ["user1", "user2"])
 
     @patch("matplotlib.pyplot.show")
     def test_visualize_results(self, mock_show):
         # Test visualization without displaying the plot
-        df = self.analysis._ContributorActivityAnalysis__create_dataframe(self.issues, user_filter=None)
-        aggregated = self.analysis._ContributorActivityAnalysis__aggregate(df)
-        self.analysis._ContributorActivityAnalysis__visualize_results(df, aggregated)
+        activity = self.analysis._ContributorActivityAnalysis__count_activity(self.store, None, "week")
+        top_authors = self.analysis._ContributorActivityAnalysis__aggregate(activity, 5)
+        self.analysis._ContributorActivityAnalysis__visualize_results(activity, top_authors, 3)
         mock_show.assert_called_once()
 
+    def test_run_prints_activity_without_plot(self):
+        args = MagicMock()
+        args.user = None
+        args.granularity = "month"
+        args.top_authors = 2
+        args.window = 3
+        with patch.dict(os.environ, {"no_plot": "json:true"}), \
+                patch("builtins.print") as mocked_print:
+            self.analysis.run(args)
+        mocked_print.assert_any_call("user1: 2 events, busiest month starting 2024-01-01")
+
+    def test_window_must_be_positive(self):
+        parser = argparse.ArgumentParser()
+        self.analysis.add_arguments(parser)
+        self.assertEqual(parser.parse_args(["--window", "1"]).window, 1)
+        with patch("sys.stderr", new_callable=io.StringIO), self.assertRaises(SystemExit):
+            parser.parse_args(["--window", "0"])
+
+    def test_top_authors_must_be_positive(self):
+        parser = argparse.ArgumentParser()
+        self.analysis.add_arguments(parser)
+        self.assertEqual(parser.parse_args(["--top-authors", "1"]).top_authors, 1)
+        for value in ["0", "-2"]:
+            with patch("sys.stderr", new_callable=io.StringIO), self.assertRaises(SystemExit):
+                parser.parse_args(["--top-authors", value])
+
     @patch("matplotlib.pyplot.show")
     def test_run(self, mock_show):
         # Test the run method with and without a user filter
         args = MagicMock()
         args.user = None
+        args.granularity = "month"
+        args.top_authors = 5
+        args.window = 3
         self.analysis.run(args)
 
         args.user = "user1"
         self.analysis.run(args)
         mock_show.assert_called()
 
+    @patch("matplotlib.pyplot.show")
+    def test_compare(self, mock_show):
+        args = MagicMock()
+        args.user = None
+        args.granularity = "month"
+        args.top_authors = 5
+        args.window = 3
+        result = self.analysis.run(args)
+        comparison = self.analysis.compare({"alpha": result, "beta": result}, args)
+        self.assertEqual(comparison["alpha"], comparison["beta"])
+        self.assertEqual(comparison["alpha"]["buckets"], result["buckets"])
+        self.assertEqual(sum(comparison["alpha"]["events"]), sum(a["total"] for a in result["authors"].values()))
+
 
 if __name__ == "__main__":
     unittest.main()
-
@@ -0,0 +1,128 @@
+import argparse
+import io
+import os
+import tempfile
+import unittest
+from argparse import Namespace
+from unittest.mock import patch
+
+import networkx as nx
+
+from analyses.contributors_interactions_analysis import ContributorsInteractionsAnalysis
+from data_loader import DataLoader
+from models.IssueStore import IssueStore
+
+
+RECORDS = [
+    {'number': 1, 'creator': 'alice', 'events': [{'author': 'bob'}, {'author': 'carol'}]},
+    {'number': 2, 'creator': 'bob', 'events': [{'author': 'alice'}]},
+    {'number': 3, 'creator': 'dave', 'events': [{'author': 'erin'}]},
+]
+
+
+class TestContributorsInteractionsAnalysis(unittest.TestCase):
+
+    def setUp(self):
+        self.store = IssueStore.from_records(RECORDS)
+        patcher = patch.object(DataLoader, 'load_store', return_value=self.store)
+        self.load_store = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+        env = patch.dict(os.environ, {'ENPM611_PROJECT_CACHE_DIR': self.cache_dir.name})
+        env.start()
+        self.addCleanup(env.stop)
+
+        self.analysis = ContributorsInteractionsAnalysis()
+
+    def args(self, **kwargs):
+        return Namespace(**dict({
+            'label': None, 'user': None, 'max_nodes': 500, 'min_weight': None,
+            'centrality': 'degree', 'pivots': None, 'communities': False,
+        }, **kwargs))
+
+    @patch('matplotlib.pyplot.show')
+    def test_layout_is_cached(self, mock_show):
+        with patch('networkx.spring_layout', wraps=nx.spring_layout) as layout:
+            self.analysis.run(self.args())
+            self.analysis.run(self.args())
+        layout.assert_called_once()
+        self.assertEqual(mock_show.call_count, 2)
+        # --invalidate-results removes the layout
+        self.assertEqual(self.analysis.invalidate_drawings(), 1)
+        with patch('networkx.spring_layout', wraps=nx.spring_layout) as layout:
+            self.analysis.run(self.args())
+        layout.assert_called_once()
+
+    @patch('matplotlib.pyplot.show')
+    def test_network_is_built_once(self, mock_show):
+        with patch.dict(os.environ, {'no_cache': 'json:true'}):
+            self.analysis.run(self.args())
+        # Drawing reuses the network of the computation
+        self.load_store.assert_called_once()
+        mock_show.assert_called_once()
+
+    @patch('matplotlib.pyplot.show')
+    def test_large_graph_is_reduced(self, mock_show):
+        with patch('builtins.print') as mocked_print:
+            self.analysis.run(self.args(max_nodes=2, min_weight=4))
+        mocked_print.assert_any_call('Drawing 2 of 5 contributors and 1 of 4 interactions.')
+
+    @patch('matplotlib.pyplot.show')
+    def test_centrality_metrics(self, mock_show):
+        for centrality in ['betweenness', 'pagerank']:
+            with patch('builtins.print') as mocked_print:
+                self.analysis.run(self.args(centrality=centrality, communities=True))
+            title = ContributorsInteractionsAnalysis.CENTRALITIES[centrality]
+            mocked_print.assert_any_call(f'Top Contributors by {title}:')
+            mocked_print.assert_any_call('Found 2 communities of contributors.')
+
+    @patch('matplotlib.pyplot.show')
+    def test_drawing_arguments_reuse_results(self, mock_show):
+        # The results are cached for the data file, which the mocked loader does not read
+        data_path = os.path.join(self.cache_dir.name, 'issues.json')
+        with open(data_path, 'w') as fout:
+            fout.write('[]')
+        compute = patch.object(
+            self.analysis, '_ContributorsInteractionsAnalysis__compute',
+            wraps=self.analysis._ContributorsInteractionsAnalysis__compute
+        )
+        with patch.dict(os.environ, {'ENPM611_PROJECT_DATA_PATH': data_path}), compute as mocked_compute:
+            self.analysis.run(self.args())
+            self.analysis.run(self.args(max_nodes=2, min_weight=4))
+            mocked_compute.assert_called_once()
+            self.analysis.run(self.args(centrality='pagerank'))
+            self.assertEqual(mocked_compute.call_count, 2)
+
+    def test_pivots_must_be_positive(self):
+        parser = argparse.ArgumentParser()
+        self.analysis.add_arguments(parser)
+        self.assertEqual(parser.parse_args(['--pivots', '5']).pivots, 5)
+        for value in ['0', '-1']:
+            with patch('sys.stderr', new_callable=io.StringIO) as stderr, self.assertRaises(SystemExit):
+                parser.parse_args(['--pivots', value])
+            self.assertIn('must be a positive integer', stderr.getvalue())
+
+    def test_drawing_limits_must_not_be_negative(self):
+        parser = argparse.ArgumentParser()
+        self.analysis.add_arguments(parser)
+        args = parser.parse_args(['--max-nodes', '0', '--min-weight', '0'])
+        self.assertEqual((args.max_nodes, args.min_weight), (0, 0))
+        for flag in ['--max-nodes', '--min-weight']:
+            with patch('sys.stderr', new_callable=io.StringIO) as stderr, self.assertRaises(SystemExit):
+                parser.parse_args([flag, '-1'])
+            self.assertIn('must not be negative', stderr.getvalue())
+
+    @patch('matplotlib.pyplot.show')
+    def test_compare(self, mock_show):
+        result = self.analysis.run(self.args(communities=True))
+        comparison = self.analysis.compare({'alpha': result, 'beta': result}, self.args())
+        self.assertEqual(comparison['alpha'], {
+            'contributors': 5, 'interactions': 4, 'top_contributor': 'alice', 'communities': 2,
+        })
+        self.assertEqual(mock_show.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import analyses
+from analyses.active_labels_analysis import ActiveLabelsAnalysis
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class TestFeatureRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.manifest = os.path.join(self.tmp.name, 'features_manifest.json')
+        patcher = patch.object(analyses, 'MANIFEST_PATH', self.manifest)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        features = patch.dict(analyses.FEATURES, clear=True)
+        features.start()
+        self.addCleanup(features.stop)
+
+    def test_manifest_is_written(self):
+        analyses.discover_features()
+        self.assertEqual(sorted(analyses.FEATURES), [1, 2, 3, 4])
+        with open(self.manifest) as fin:
+            manifest = json.load(fin)
+        info = next(f for f in manifest['features'] if f['feature_id'] == 1)
+        self.assertEqual(info['class'], 'ActiveLabelsAnalysis')
+        self.assertIn({'flags': '--label', 'help': '(Optional) focus analysis on a specific label'}, info['arguments'])
+
+    def test_features_are_loaded_from_manifest(self):
+        analyses.discover_features()
+        analyses.FEATURES.clear()
+        analyses.discover_features()
+        feature = analyses.FEATURES[1]
+        self.assertIsNone(feature._feature)
+        self.assertEqual(feature.name(), 'ActiveLabelsAnalysis')
+        self.assertEqual([a.flags for a in feature.get_arguments_info()], ['--active-labels', '--label'])
+        # Anything else loads the feature
+        self.assertEqual(feature.required_fields(), {'labels', 'events.event_type'})
+        self.assertIsInstance(feature._feature, ActiveLabelsAnalysis)
+
+    def test_stale_manifest_is_rebuilt(self):
+        with open(self.manifest, 'w') as fout:
+            json.dump({'version': analyses.MANIFEST_VERSION, 'modules': {}, 'features': []}, fout)
+        analyses.discover_features()
+        self.assertEqual(sorted(analyses.FEATURES), [1, 2, 3, 4])
+
+    def test_list_features_does_not_import_analysis_modules(self):
+        env = dict(os.environ, ENPM611_PROJECT_FEATURES_MANIFEST=self.manifest)
+        code = (
+            'import sys, analyses\n'
+            'print([f.name() for f in analyses.FEATURES.values()])\n'
+            'print(sorted(m for m in ["pandas", "networkx", "scipy", "matplotlib"] if m in sys.modules))\n'
+        )
+        run = lambda: subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env,
+                                     capture_output=True, text=True, check=True).stdout.splitlines()
+        first = run()
+        second = run()
+        self.assertEqual(first[0], second[0])
+        self.assertEqual(second[1], '[]')
+
+    def test_run_does_not_import_loader(self):
+        # run.py only imports the loader when a feature is run
+        env = dict(os.environ, ENPM611_PROJECT_FEATURES_MANIFEST=self.manifest)
+        code = (
+            'import sys, run\n'
+            'print(sorted(m for m in ["numpy", "data_loader", "comparison"] if m in sys.modules))\n'
+        )
+        run = lambda: subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env,
+                                     capture_output=True, text=True, check=True).stdout.splitlines()
+        # The first run writes the manifest
+        run()
+        self.assertEqual(run()[-1], '[]')
+
+
+if __name__ == '__main__':
+    unittest.main()
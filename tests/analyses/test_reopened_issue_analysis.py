@@ -1,9 +1,11 @@
+import os
 import unittest
 from unittest.mock import patch
 import pandas as pd
 from analyses.reopened_issue_analysis import ReopenedIssueAnalysis
 from argparse import Namespace
 from models.Issue import Issue
+from models.IssueFrames import IssueFrames
 # from models.Event import Event
 # import sys
 
@@ -13,9 +15,14 @@ class TestReopenedIssueAnalysis(unittest.TestCase):
         # Initialize the analysis class
         self.analysis = ReopenedIssueAnalysis()
 
-    @patch('data_loader.DataLoader.get_issues')
+        # The loader is mocked, so results must not come from the result cache
+        env = patch.dict(os.environ, {"no_cache": "json:true"})
+        env.start()
+        self.addCleanup(env.stop)
+
+    @patch('data_loader.DataLoader.get_frames')
     @patch('analyses.reopened_issue_analysis.ReopenedIssueAnalysis._ReopenedIssueAnalysis__visualize_results')
-    def test_run(self, mock_visualize_results, mock_get_issues):
+    def test_run(self, mock_visualize_results, mock_get_frames):
         # Mock data returned by DataLoader
         mock_issues = [
             Issue({
@@ -41,7 +48,7 @@ class TestReopenedIssueAnalysis(unittest.TestCase):
                 ]
             })
         ]
-        mock_get_issues.return_value = mock_issues
+        mock_get_frames.return_value = IssueFrames.from_issues(mock_issues)
 
         # Mock the arguments
         args = Namespace(labels=5)
@@ -51,8 +58,8 @@ class TestReopenedIssueAnalysis(unittest.TestCase):
 
         # Verify visualization was called
         mock_visualize_results.assert_called_once()
-    @patch('data_loader.DataLoader.get_issues')
-    def test_create_dataframe(self, mock_get_issues):
+    @patch('data_loader.DataLoader.get_frames')
+    def test_create_dataframe(self, mock_get_frames):
         mock_issues = [
             Issue({
                 "url": "https://github.com/scikit-learn/scikit-learn/issues/28994",
@@ -78,9 +85,9 @@ class TestReopenedIssueAnalysis(unittest.TestCase):
             })
             
         ]
-        mock_get_issues.return_value = mock_issues
+        mock_get_frames.return_value = IssueFrames.from_issues(mock_issues)
 
-        df = self.analysis._ReopenedIssueAnalysis__create_dataframe(mock_issues)
+        df = self.analysis._ReopenedIssueAnalysis__create_dataframe(IssueFrames.from_issues(mock_issues))
         self.assertIsInstance(df, pd.DataFrame)
         self.assertEqual(len(df), 1)
 
@@ -90,15 +97,30 @@ class TestReopenedIssueAnalysis(unittest.TestCase):
 
         # Test that SystemExit is raised when an empty dataframe is processed
         with self.assertRaises(SystemExit):
-            df = self.analysis._ReopenedIssueAnalysis__create_dataframe(mock_issues)
+            df = self.analysis._ReopenedIssueAnalysis__create_dataframe(IssueFrames.from_issues(mock_issues))
 
     def test_empty_aggregation(self):
         # Mock empty dataframe
         mock_df = pd.DataFrame(columns=['labels', 'reopen_count'])
 
         # Run the private method to test aggregation
-        aggregated = self.analysis._ReopenedIssueAnalysis__aggregate(mock_df, number_of_labels=2)
+        aggregated = self.analysis._ReopenedIssueAnalysis__aggregate(mock_df)
         self.assertTrue(aggregated.empty)
 
+    @patch('matplotlib.pyplot.show')
+    def test_compare(self, mock_show):
+        results = {
+            'alpha': {'reopen_count': {'bug': 2, 'docs': 1}},
+            'beta': {'reopen_count': {'bug': 1, 'feature': 5}},
+        }
+        comparison = self.analysis.compare(results, Namespace(labels=2))
+        # Ranked by the total over the datasets, labels missing from a
+        # dataset were not reopened there
+        self.assertEqual(comparison, {'reopen_count': {
+            'alpha': {'feature': 0, 'bug': 2},
+            'beta': {'feature': 5, 'bug': 1},
+        }})
+        mock_show.assert_called_once()
+
 if __name__ == '__main__':
     unittest.main()
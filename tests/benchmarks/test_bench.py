@@ -0,0 +1,67 @@
+import json
+import os
+import tempfile
+import unittest
+from io import StringIO
+from unittest.mock import patch
+
+import data_loader
+from benchmarks import bench
+from benchmarks.generate import write_dataset
+
+
+class TestBench(unittest.TestCase):
+
+    def test_measure(self):
+        calls = []
+        result = bench.measure(lambda: calls.append('stage') or bytearray(4 << 20), lambda: calls.append('setup'), repeat=2)
+        self.assertEqual(calls, ['setup', 'stage'] * 3)
+        self.assertGreaterEqual(result['peak_mb'], 4)
+        self.assertGreaterEqual(result['seconds'], 0)
+
+    def test_compare(self):
+        baseline = {'load.parse': {'seconds': 1.0, 'peak_mb': 100.0}, 'feature1': {'seconds': 0.01, 'peak_mb': 0.5}}
+        results = {
+            'load.parse': {'seconds': 2.0, 'peak_mb': 110.0},
+            # Small absolute differences are noise
+            'feature1': {'seconds': 0.03, 'peak_mb': 1.0},
+            'feature2': {'seconds': 5.0, 'peak_mb': 500.0},
+        }
+        self.assertEqual(bench.compare(results, baseline, 1.5, 1.25), ['load.parse: 2.000s vs. 1.000s baseline'])
+
+    def test_baselines_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'baselines.json')
+            self.assertEqual(bench.read_baselines(path), {})
+            sizes = {'1k': {'load.parse': {'seconds': 0.1, 'peak_mb': 5.0}}}
+            bench.write_baselines(path, sizes)
+            self.assertEqual(bench.read_baselines(path), sizes)
+
+    def test_main(self):
+        for name in ['_ISSUES', '_STORE', '_FIELDS', '_FINGERPRINT']:
+            singleton = patch.object(data_loader, name, None)
+            singleton.start()
+            self.addCleanup(singleton.stop)
+        with tempfile.TemporaryDirectory() as tmp:
+            write_dataset(os.path.join(tmp, 'issues-200-0.json'), 200)
+            baselines = os.path.join(tmp, 'baselines.json')
+            # Any measurement regresses against a baseline of zero
+            noise = patch.object(bench, '_MIN_SECONDS', 0)
+            noise.start()
+            self.addCleanup(noise.stop)
+            bench.write_baselines(baselines, {'200': {'load.parse': {'seconds': 0.0, 'peak_mb': 0.0}}})
+            argv = ['--sizes', '200', '--features', '3', '--repeat', '1', '--data-dir', tmp,
+                    '--baselines', baselines, '--json', os.path.join(tmp, 'results.json')]
+            with patch('sys.stdout', new_callable=StringIO) as stdout:
+                self.assertEqual(bench.main(argv), 1)
+            self.assertIn('200: load.parse: ', stdout.getvalue())
+            with open(os.path.join(tmp, 'results.json'), 'r') as fin:
+                results = json.load(fin)
+            self.assertEqual(
+                list(results['200']),
+                ['load.parse', 'load.cache', 'feature3', 'feature3.render']
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()
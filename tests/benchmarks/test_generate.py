@@ -0,0 +1,59 @@
+import json
+import os
+import tempfile
+import unittest
+from collections import Counter
+
+from benchmarks.generate import LABELS, generate_issues, parse_size, write_dataset, zipf_weights
+from models.Issue import Issue
+from util.json_stream import iter_json_array
+
+
+class TestGenerate(unittest.TestCase):
+
+    def test_parse_size(self):
+        self.assertEqual(parse_size('10k'), 10_000)
+        self.assertEqual(parse_size('1M'), 1_000_000)
+        self.assertEqual(parse_size('250'), 250)
+
+    def test_zipf_weights(self):
+        weights = zipf_weights(4, 1.0)
+        self.assertAlmostEqual(weights.sum(), 1.0)
+        self.assertAlmostEqual(weights[0] / weights[1], 2.0)
+
+    def test_issues_are_reproducible(self):
+        self.assertEqual(list(generate_issues(20, seed=1)), list(generate_issues(20, seed=1)))
+        self.assertNotEqual(list(generate_issues(20, seed=1)), list(generate_issues(20, seed=2)))
+
+    def test_issues_have_the_shape_of_the_export(self):
+        issues = list(generate_issues(500))
+        self.assertEqual([issue['number'] for issue in issues], list(range(1, 501)))
+        for record in issues:
+            issue = Issue(record)
+            self.assertIn(issue.state.value, ['open', 'closed'])
+            self.assertTrue(set(issue.labels) <= set(LABELS))
+            self.assertEqual(len(issue.labels), len(set(issue.labels)))
+            dates = [event.event_date for event in issue.events]
+            self.assertEqual(dates, sorted(dates))
+            if dates:
+                self.assertGreaterEqual(dates[0], issue.created_date)
+                self.assertEqual(issue.updated_date, dates[-1])
+
+    def test_activity_is_skewed(self):
+        authors = Counter(event['author'] for issue in generate_issues(2000) for event in issue['events'])
+        counts = sorted(authors.values(), reverse=True)
+        # The busiest 5% of the authors account for most of the events
+        self.assertGreater(sum(counts[:len(counts) // 20]), sum(counts) / 2)
+
+    def test_write_dataset(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'issues.json')
+            write_dataset(path, 25)
+            with open(path, 'r') as fin:
+                self.assertEqual(len(json.load(fin)), 25)
+            with open(path, 'r') as fin:
+                self.assertEqual(list(iter_json_array(fin)), list(generate_issues(25)))
+
+
+if __name__ == '__main__':
+    unittest.main()
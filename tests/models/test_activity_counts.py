@@ -0,0 +1,78 @@
+import unittest
+
+import numpy as np
+
+from models.ActivityCounts import ActivityCounts, bucket_index, bucket_start
+from models.IssueStore import IssueStore, to_nanoseconds
+
+
+class TestActivityCounts(unittest.TestCase):
+
+    def setUp(self):
+        self.store = IssueStore.from_records([
+            {'number': 1, 'events': [
+                {'author': 'a', 'event_date': '2024-01-03T10:00:00+00:00'},
+                {'author': 'a', 'event_date': '2024-01-31T23:00:00+00:00'},
+                {'author': 'b', 'event_date': '2024-04-01T00:00:00+00:00'},
+                {'author': 'b'},
+                {'event_date': '2024-02-01T00:00:00+00:00'},
+            ]},
+            {'number': 2, 'events': [{'author': 'b', 'event_date': '2024-02-15T00:00:00+00:00'}]},
+        ])
+
+    def test_bucket_index(self):
+        dates = np.array([to_nanoseconds('2024-01-07T23:59:59+00:00'), to_nanoseconds('2024-01-08T00:00:00+00:00')])
+        # 2024-01-08 is a Monday
+        weeks = bucket_index(dates, 'week')
+        self.assertEqual(weeks[1] - weeks[0], 1)
+        self.assertEqual(bucket_start(weeks, 'week')[1], np.datetime64('2024-01-08'))
+        self.assertEqual(bucket_start(bucket_index(dates, 'quarter'), 'quarter')[0], np.datetime64('2024-01-01'))
+        before_epoch = np.array([to_nanoseconds('1969-12-31T12:00:00+00:00')])
+        self.assertEqual(bucket_start(bucket_index(before_epoch, 'month'), 'month')[0], np.datetime64('1969-12-01'))
+        with self.assertRaises(ValueError):
+            bucket_index(dates, 'year')
+
+    def test_spilled_counts(self):
+        expected = ActivityCounts.from_store(self.store, 'week')
+        activity = ActivityCounts.from_store(self.store, 'week', max_bytes=1)
+        self.assertIsInstance(activity.counts, np.memmap)
+        np.testing.assert_array_equal(activity.counts, expected.counts)
+        self.assertIsInstance(activity.prefix, np.memmap)
+        np.testing.assert_array_equal(activity.prefix, expected.prefix)
+        np.testing.assert_array_equal(activity.smoothed(3), expected.smoothed(3))
+
+    def test_counts(self):
+        activity = ActivityCounts.from_store(self.store, 'month')
+        self.assertEqual(activity.authors, ['a', 'b'])
+        np.testing.assert_array_equal(activity.counts, [[2, 0, 0, 0], [0, 1, 0, 1]])
+        self.assertEqual(activity.starts[0], np.datetime64('2024-01-01'))
+        np.testing.assert_array_equal(activity.totals(), [2, 2])
+
+    def test_quarter_counts(self):
+        activity = ActivityCounts.from_store(self.store, 'quarter')
+        np.testing.assert_array_equal(activity.counts, [[2, 0], [1, 1]])
+
+    def test_smoothed(self):
+        activity = ActivityCounts.from_store(self.store, 'month')
+        np.testing.assert_allclose(activity.smoothed(2), [[2, 1, 0, 0], [0, 0.5, 0.5, 0.5]])
+        np.testing.assert_allclose(activity.smoothed(1), activity.counts)
+        for window in [0, -1]:
+            with self.assertRaises(ValueError):
+                activity.smoothed(window)
+
+    def test_top_authors_and_select(self):
+        activity = ActivityCounts.from_store(self.store, 'day')
+        self.assertEqual(activity.counts.shape[1], 90)
+        self.assertEqual(list(activity.top_authors(1)), [0])
+        selected = activity.select(['b', 'nobody'])
+        self.assertEqual(selected.authors, ['b'])
+        self.assertEqual(selected.totals()[0], 2)
+
+    def test_empty(self):
+        activity = ActivityCounts.from_store(IssueStore(), 'week')
+        self.assertEqual(activity.authors, [])
+        self.assertEqual(activity.smoothed(3).shape, (0, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
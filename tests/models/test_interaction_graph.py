@@ -0,0 +1,107 @@
+import unittest
+from unittest.mock import patch
+
+import networkx as nx
+import numpy as np
+
+from models.InteractionGraph import InteractionGraph, incidence_matrix
+from models.IssueStore import IssueStore
+from tests.models.test_issue_store import RECORDS
+
+
+class TestInteractionGraph(unittest.TestCase):
+
+    def setUp(self):
+        self.store = IssueStore.from_records(RECORDS + [
+            {'number': 4, 'creator': 'bob', 'events': [{'author': 'alice'}, {'author': 'dave'}]},
+        ])
+        self.graph = InteractionGraph.from_store(self.store)
+
+    def test_incidence_matrix(self):
+        incidence = incidence_matrix(self.store)
+        self.assertEqual(incidence.shape, (4, len(self.store.pools['users'])))
+        # alice created issue 1 and commented twice on it, but is counted once
+        alice = self.store.code('users', 'alice')
+        self.assertEqual(incidence[0, alice], 1)
+        np.testing.assert_array_equal(incidence.sum(axis=1).A1, [2, 1, 1, 3])
+
+    def test_nodes_only_include_interacting_users(self):
+        # carol never shares an issue with anyone
+        self.assertEqual(sorted(self.graph.nodes), ['alice', 'bob', 'dave'])
+        self.assertEqual(self.graph.number_of_edges(), 3)
+
+    def test_matches_pairwise_construction(self):
+        expected = nx.Graph()
+        for issue in self.store:
+            participants = {issue.creator} | {e.author for e in issue.events}
+            participants.discard(None)
+            for p1 in participants:
+                for p2 in participants:
+                    if p1 != p2:
+                        if expected.has_edge(p1, p2):
+                            expected[p1][p2]['weight'] += 1
+                        else:
+                            expected.add_edge(p1, p2, weight=1)
+        graph = self.graph.to_networkx()
+        self.assertEqual(nx.to_dict_of_dicts(graph), nx.to_dict_of_dicts(expected))
+        self.assertEqual(self.graph.degree_centrality(), nx.degree_centrality(expected))
+
+    def test_betweenness_centrality(self):
+        graph = self.graph.to_networkx()
+        self.assertEqual(self.graph.betweenness_centrality(), nx.betweenness_centrality(graph))
+
+    def test_parallel_betweenness_centrality(self):
+        expected = nx.betweenness_centrality(nx.karate_club_graph())
+        graph = InteractionGraph.from_store(IssueStore.from_records([
+            {'number': i, 'creator': str(u), 'events': [{'author': str(v)}]}
+            for i, (u, v) in enumerate(nx.karate_club_graph().edges())
+        ]))
+        with patch('models.InteractionGraph._MIN_SOURCES_PER_WORKER', 10):
+            result = graph.betweenness_centrality(workers=2)
+        for node, value in expected.items():
+            self.assertAlmostEqual(result[str(node)], value)
+
+    def test_approximate_betweenness_centrality(self):
+        result = self.graph.betweenness_centrality(pivots=2, seed=0)
+        self.assertEqual(sorted(result), sorted(self.graph.nodes))
+        self.assertTrue(all(value >= 0 for value in result.values()))
+
+    def test_pagerank(self):
+        expected = nx.pagerank(self.graph.to_networkx())
+        for node, value in self.graph.pagerank().items():
+            self.assertAlmostEqual(value, expected[node], places=5)
+
+    def test_communities(self):
+        store = IssueStore.from_records([
+            {'number': 1, 'creator': 'a', 'events': [{'author': 'b'}, {'author': 'c'}]},
+            {'number': 2, 'creator': 'x', 'events': [{'author': 'y'}, {'author': 'z'}]},
+        ])
+        communities = InteractionGraph.from_store(store).communities(seed=0)
+        self.assertEqual(sorted(communities), [['a', 'b', 'c'], ['x', 'y', 'z']])
+
+    def test_top_nodes(self):
+        # bob interacts with alice and dave, the others with one fewer
+        top = self.graph.top_nodes(2)
+        self.assertEqual(top.number_of_nodes(), 2)
+        self.assertIn('bob', top.nodes)
+        self.assertIs(self.graph.top_nodes(10), self.graph)
+
+    def test_backbone(self):
+        # alice and bob share two issues, every other pair one
+        backbone = self.graph.backbone(4)
+        self.assertEqual(sorted(backbone.nodes), ['alice', 'bob'])
+        self.assertEqual(backbone.number_of_edges(), 1)
+
+    def test_fingerprint(self):
+        same = InteractionGraph.from_store(self.store)
+        self.assertEqual(same.fingerprint(), self.graph.fingerprint())
+        self.assertNotEqual(self.graph.backbone(4).fingerprint(), self.graph.fingerprint())
+
+    def test_empty_store(self):
+        graph = InteractionGraph.from_store(IssueStore())
+        self.assertEqual(graph.number_of_nodes(), 0)
+        self.assertEqual(graph.degree_centrality(), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
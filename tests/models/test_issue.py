@@ -1,5 +1,7 @@
 import unittest
-from models.Issue import Issue
+from unittest.mock import patch
+from models.Event import Event
+from models.Issue import Issue, covers, project_fields
 from models.State import State
 
 class TestIssue(unittest.TestCase):
@@ -69,3 +71,57 @@ class TestIssue(unittest.TestCase):
         self.assertIsNone(issue.updated_date)
         self.assertEqual(issue.state, State.closed)
 
+    def test_events_are_decoded_lazily(self):
+        jobj = {
+            'state': 'open',
+            'events': [
+                {'event_type': 'commented', 'author': 'a', 'event_date': '2024-01-01T00:00:00Z'},
+                {'event_type': 'reopened', 'author': 'b'},
+                {'event_type': 'commented', 'author': 'c'},
+            ]
+        }
+        with patch.object(Event, 'from_json') as from_json:
+            issue = Issue(jobj)
+            from_json.assert_not_called()
+        self.assertEqual([e.author for e in issue.events], ['a', 'b', 'c'])
+        self.assertIs(issue.events, issue.events)
+
+    def test_set_events(self):
+        issue = Issue({'state': 'open', 'events': [{'event_type': 'commented'}]})
+        issue.events = []
+        self.assertEqual(issue.events, [])
+
+    def test_projection(self):
+        jobj = {
+            'state': 'open',
+            'title': 'Title',
+            'text': 'Long body',
+            'labels': ['bug'],
+            'number': '7',
+            'events': [{'event_type': 'commented', 'author': 'a', 'comment': 'Long comment'}],
+        }
+        issue = Issue(jobj, project_fields(['labels', 'events.event_type']))
+        self.assertEqual(issue.labels, ['bug'])
+        self.assertEqual(issue.number, 7)
+        self.assertIsNone(issue.title)
+        self.assertIsNone(issue.text)
+        self.assertIsNone(issue.state)
+        self.assertEqual(issue.events[0].event_type, 'commented')
+        self.assertIsNone(issue.events[0].comment)
+        self.assertIsNone(issue.events[0].author)
+
+    def test_projection_without_events(self):
+        issue = Issue({'state': 'open', 'events': [{'event_type': 'commented'}]}, project_fields(['state']))
+        self.assertEqual(issue.state, State.open)
+        self.assertEqual(issue.events, [])
+
+    def test_project_fields(self):
+        self.assertIsNone(project_fields(None))
+        self.assertIn('events.comment', project_fields(['events']))
+        self.assertIn('number', project_fields([]))
+        with self.assertRaises(ValueError):
+            project_fields(['events.unknown'])
+        self.assertTrue(covers(None, project_fields(['title'])))
+        self.assertTrue(covers(project_fields(['title', 'text']), project_fields(['title'])))
+        self.assertFalse(covers(project_fields(['title']), project_fields(['text'])))
+        self.assertFalse(covers(project_fields(['title']), None))
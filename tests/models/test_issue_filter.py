@@ -0,0 +1,50 @@
+import unittest
+
+from models.IssueFilter import IssueFilter
+from models.IssueStore import IssueStore
+from tests.models.test_issue_store import RECORDS
+
+
+class TestIssueFilter(unittest.TestCase):
+
+    def setUp(self):
+        self.store = IssueStore.from_records(RECORDS)
+
+    def check(self, where, expected_numbers):
+        records = [r for r in where.filter_records(RECORDS)]
+        self.assertEqual([int(r['number']) for r in records], expected_numbers)
+        self.assertEqual(where.scanned, 3)
+        filtered = where.filter_store(self.store)
+        self.assertEqual([i.number for i in filtered], expected_numbers)
+
+    def test_label(self):
+        self.check(IssueFilter(label='Bug'), [1, 2])
+        self.check(IssueFilter(label='Docs'), [1])
+        self.check(IssueFilter(label='Unknown'), [])
+
+    def test_participant(self):
+        # carol created issue 2 and commented on issue 3
+        self.check(IssueFilter(participant='carol'), [2, 3])
+        self.check(IssueFilter(participant='bob'), [1])
+
+    def test_label_and_participant(self):
+        self.check(IssueFilter(label='Bug', participant='carol'), [2])
+
+    def test_empty(self):
+        where = IssueFilter()
+        self.assertTrue(where.is_empty())
+        self.check(where, [1, 2, 3])
+
+    def test_filtered_store_keeps_events(self):
+        filtered = IssueFilter(participant='carol').filter_store(self.store)
+        self.assertEqual(filtered.num_events, 1)
+        self.assertEqual(filtered[1].events[0].author, 'carol')
+        self.assertEqual(list(filtered.event_counts('commented')), [0, 1])
+
+    def test_required_fields(self):
+        self.assertEqual(IssueFilter(label='Bug').required_fields(), {'labels'})
+        self.assertEqual(IssueFilter(participant='a').required_fields(), {'creator', 'events.author'})
+
+
+if __name__ == '__main__':
+    unittest.main()
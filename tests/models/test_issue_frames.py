@@ -0,0 +1,58 @@
+import unittest
+
+import pandas as pd
+
+from models.IssueFrames import IssueFrames
+from models.IssueStore import IssueStore
+from tests.models.test_issue_store import RECORDS
+
+
+class TestIssueFrames(unittest.TestCase):
+
+    def setUp(self):
+        self.store = IssueStore.from_records(RECORDS)
+        self.frames = self.store.frames
+
+    def test_issues(self):
+        issues = self.frames.issues
+        self.assertEqual(len(issues), len(RECORDS))
+        self.assertEqual(list(issues['number'])[:2], [1, 2])
+        self.assertEqual(list(issues['state'])[:2], ['open', 'closed'])
+        self.assertEqual(issues['creator'][0], 'alice')
+        self.assertEqual(str(issues['created_date'].dtype), 'datetime64[ns, UTC]')
+        self.assertEqual(issues['created_date'][0], pd.Timestamp('2024-01-01', tz='UTC'))
+        # Unparseable dates are missing
+        self.assertTrue(pd.isna(issues['created_date'][1]))
+        self.assertEqual(issues['num_events'][0], 3)
+
+    def test_events(self):
+        events = self.frames.events
+        self.assertEqual(len(events), self.store.num_events)
+        self.assertIsInstance(events['author'].dtype, pd.CategoricalDtype)
+        self.assertEqual(list(events['event_type'])[:3], ['commented', 'reopened', 'commented'])
+        self.assertEqual(list(events['issue'])[:3], [0, 0, 0])
+
+    def test_issue_labels(self):
+        issue_labels = self.frames.issue_labels
+        self.assertEqual(list(issue_labels['label'])[:3], ['Bug', 'Docs', 'Bug'])
+        self.assertEqual(list(issue_labels['issue'])[:3], [0, 0, 1])
+
+    def test_frames_are_cached(self):
+        self.assertIs(self.store.frames, self.frames)
+        self.assertIs(self.frames.events, self.frames.events)
+        self.assertIs(self.frames.event_counts('commented'), self.frames.event_counts('commented'))
+        self.assertEqual(self.frames.event_counts('commented')[0], 2)
+
+    def test_filtered_store_keeps_categories(self):
+        frames = IssueFrames(self.store.take([1]))
+        self.assertEqual(list(frames.issues['creator']), ['carol'])
+        counts = frames.issue_labels.groupby('label', observed=True).size()
+        self.assertEqual(counts.to_dict(), {'Bug': 1})
+
+    def test_from_issues(self):
+        frames = IssueFrames.from_issues(list(self.store))
+        pd.testing.assert_frame_equal(frames.issues, self.frames.issues)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import pickle
+import unittest
+
+import numpy as np
+
+from models.IssueIndex import InvertedIndex
+from models.IssueStore import IssueStore
+from tests.models.test_issue_store import RECORDS
+
+
+class TestIssueIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.store = IssueStore.from_records(RECORDS)
+
+    def test_inverted_index(self):
+        index = InvertedIndex.build(np.array([2, -1, 0, 2, 0]), 4)
+        np.testing.assert_array_equal(index.lookup(0), [2, 4])
+        np.testing.assert_array_equal(index.lookup(2), [0, 3])
+        np.testing.assert_array_equal(index.lookup(1), [])
+        np.testing.assert_array_equal(index.lookup(-1), [])
+        np.testing.assert_array_equal(index.lookup(9), [])
+        np.testing.assert_array_equal(index.counts(), [2, 0, 2, 0])
+
+    def test_issues_with_label(self):
+        np.testing.assert_array_equal(self.store.index.issues_with_label('Bug'), [0, 1])
+        np.testing.assert_array_equal(self.store.index.issues_with_label('Docs'), [0])
+        np.testing.assert_array_equal(self.store.index.issues_with_label('Unknown'), [])
+
+    def test_events_by_author(self):
+        np.testing.assert_array_equal(self.store.index.events_by_author('alice'), [1, 2])
+        np.testing.assert_array_equal(self.store.index.events_by_author('carol'), [3])
+
+    def test_events_of_type(self):
+        np.testing.assert_array_equal(self.store.index.events_of_type('commented'), [0, 2, 3])
+        np.testing.assert_array_equal(self.store.index.events_of_type('reopened'), [1])
+
+    def test_index_is_persisted(self):
+        self.store.index
+        copy = pickle.loads(pickle.dumps(self.store))
+        self.assertIsNotNone(copy._index)
+        np.testing.assert_array_equal(copy.index.events_of_type('commented'), [0, 2, 3])
+
+    def test_derived_stores_rebuild_index(self):
+        subset = self.store.take([2])
+        np.testing.assert_array_equal(subset.index.events_by_author('carol'), [0])
+
+
+if __name__ == '__main__':
+    unittest.main()
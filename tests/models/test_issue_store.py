@@ -0,0 +1,160 @@
+import unittest
+from unittest.mock import patch
+from datetime import datetime, timezone
+
+import numpy as np
+
+from models.Issue import Issue, project_fields
+import models.IssueStore
+from models.IssueStore import IssueStore, MergeStats, NAT, to_datetime, to_nanoseconds
+from models.State import State
+
+
+RECORDS = [
+    {
+        'url': 'http://example.com/issue/1',
+        'creator': 'alice',
+        'labels': ['Bug', 'Docs'],
+        'state': 'open',
+        'assignees': ['bob'],
+        'title': 'First',
+        'text': 'Body',
+        'number': '1',
+        'created_date': '2024-01-01T00:00:00+00:00',
+        'updated_date': '2024-01-02T00:00:00+00:00',
+        'timeline_url': 'http://example.com/issue/1/timeline',
+        'events': [
+            {'event_type': 'commented', 'author': 'bob', 'event_date': '2024-01-01T01:00:00+00:00', 'comment': 'Hi'},
+            {'event_type': 'reopened', 'author': 'alice', 'event_date': '2024-01-01T02:00:00+00:00'},
+            {'event_type': 'commented', 'author': 'alice', 'event_date': '2024-01-01T03:00:00+00:00'},
+        ],
+    },
+    {
+        'creator': 'carol',
+        'labels': ['Bug'],
+        'state': 'closed',
+        'number': 2,
+        'created_date': 'invalid_date',
+        'events': [],
+    },
+    {
+        'labels': [],
+        'state': 'open',
+        'number': 3,
+        'events': [{'event_type': 'commented', 'author': 'carol'}],
+    },
+]
+
+
+class TestIssueStore(unittest.TestCase):
+
+    def setUp(self):
+        self.store = IssueStore.from_records(RECORDS)
+
+    def test_shape(self):
+        self.assertEqual(len(self.store), 3)
+        self.assertEqual(self.store.num_events, 4)
+        np.testing.assert_array_equal(self.store.columns['event_offsets'], [0, 3, 3, 4])
+        np.testing.assert_array_equal(self.store.event_issue, [0, 0, 0, 2])
+
+    def test_materialize_matches_issue(self):
+        expected = Issue(RECORDS[0])
+        issue = self.store[0]
+        for field in ['url', 'creator', 'labels', 'state', 'assignees', 'title', 'text',
+                      'number', 'created_date', 'updated_date', 'timeline_url']:
+            self.assertEqual(getattr(issue, field), getattr(expected, field), field)
+        self.assertEqual(len(issue.events), 3)
+        self.assertEqual(issue.events[0].comment, 'Hi')
+        self.assertEqual(issue.events[0].event_date, expected.events[0].event_date)
+
+    def test_missing_values(self):
+        issue = self.store[1]
+        self.assertEqual(issue.state, State.closed)
+        self.assertIsNone(issue.created_date)
+        self.assertIsNone(issue.title)
+        self.assertEqual(issue.events, [])
+        self.assertIsNone(self.store[2].events[0].event_date)
+
+    def test_event_counts(self):
+        np.testing.assert_array_equal(self.store.event_counts('commented'), [2, 0, 1])
+        np.testing.assert_array_equal(self.store.event_counts('reopened'), [1, 0, 0])
+        np.testing.assert_array_equal(self.store.event_counts('unknown'), [0, 0, 0])
+
+    def test_from_issues(self):
+        store = IssueStore.from_issues(Issue(r) for r in RECORDS)
+        for name, column in self.store.columns.items():
+            np.testing.assert_array_equal(store.columns[name], column, name)
+
+    def test_from_partial_issues(self):
+        class Partial:
+            labels = ['Bug']
+            events = []
+        store = IssueStore.from_issues([Partial()])
+        self.assertEqual(store[0].labels, ['Bug'])
+        self.assertEqual(store[0].number, -1)
+
+    def test_projection(self):
+        store = IssueStore.from_records(RECORDS, project_fields(['labels', 'events.event_type']))
+        self.assertEqual(store.pools['texts'].values, [])
+        self.assertEqual(store.pools['users'].values, [])
+        self.assertEqual(store[0].labels, ['Bug', 'Docs'])
+        self.assertEqual(store[0].number, 1)
+        self.assertIsNone(store[0].title)
+        np.testing.assert_array_equal(store.event_counts('commented'), [2, 0, 1])
+
+    def test_from_records_in_chunks(self):
+        # Building in chunks of one record yields the same columns
+        with patch.object(models.IssueStore, '_FLUSH_RECORDS', 1):
+            chunked = IssueStore.from_records(RECORDS)
+        for name, column in self.store.columns.items():
+            np.testing.assert_array_equal(chunked.columns[name], column, err_msg=name)
+
+    def test_concat(self):
+        parts = [IssueStore.from_records(RECORDS[:1]), IssueStore.from_records(RECORDS[1:])]
+        merged = IssueStore.concat(parts)
+        for name, column in self.store.columns.items():
+            np.testing.assert_array_equal(merged.columns[name], column, name)
+        for name, pool in self.store.pools.items():
+            self.assertEqual(merged.pools[name].values, pool.values, name)
+
+    def test_take(self):
+        subset = self.store.take([2, 0])
+        self.assertEqual([i.number for i in subset], [3, 1])
+        self.assertEqual([len(i.events) for i in subset], [1, 3])
+        self.assertEqual(subset[1].labels, ['Bug', 'Docs'])
+
+    def test_merge(self):
+        delta = IssueStore.from_records([
+            # Newer version of issue 1
+            dict(RECORDS[0], title='Edited', updated_date='2024-02-01T00:00:00+00:00', events=[]),
+            # Same version of issue 2
+            RECORDS[1],
+            {'number': 4, 'state': 'open', 'labels': ['New'], 'events': [{'event_type': 'commented'}]},
+        ])
+        merged, stats = self.store.merge(delta)
+        self.assertEqual(stats, MergeStats(added=1, updated=1, unchanged=1))
+        self.assertEqual([i.number for i in merged], [1, 2, 3, 4])
+        self.assertEqual(merged[0].title, 'Edited')
+        self.assertEqual(merged[0].events, [])
+        self.assertEqual(merged[3].labels, ['New'])
+        np.testing.assert_array_equal(merged.event_counts('commented'), [0, 0, 1, 1])
+
+    def test_merge_unchanged(self):
+        merged, stats = self.store.merge(IssueStore.from_records(RECORDS))
+        self.assertIs(merged, self.store)
+        self.assertEqual(stats, MergeStats(added=0, updated=0, unchanged=3))
+
+    def test_merge_into_empty(self):
+        merged, stats = IssueStore().merge(self.store)
+        self.assertEqual(stats, MergeStats(added=3))
+        self.assertEqual(len(merged), 3)
+
+    def test_timestamps(self):
+        value = datetime(2024, 5, 10, 18, 38, 17, 123456, tzinfo=timezone.utc)
+        self.assertEqual(to_datetime(to_nanoseconds(value)), value)
+        self.assertEqual(to_nanoseconds(None), NAT)
+        self.assertIsNone(to_datetime(NAT))
+
+
+if __name__ == '__main__':
+    unittest.main()
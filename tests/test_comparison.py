@@ -0,0 +1,122 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import comparison
+import data_loader
+
+
+def _issue(number, labels, events):
+    return {
+        'number': number,
+        'state': 'open',
+        'creator': 'alice',
+        'labels': labels,
+        'events': [
+            {'event_type': event_type, 'author': author, 'event_date': '2024-01-0%dT00:00:00+00:00' % (i + 1)}
+            for i, (event_type, author) in enumerate(events)
+        ],
+    }
+
+
+DATASETS = {
+    'alpha': [
+        _issue(1, ['Bug'], [('commented', 'bob'), ('reopened', 'bob'), ('commented', 'carol')]),
+        _issue(2, ['Docs'], [('commented', 'alice')]),
+    ],
+    'beta': [
+        _issue(1, ['Bug', 'Feature'], [('reopened', 'dave'), ('reopened', 'dave'), ('commented', 'erin')]),
+    ],
+    # Has no reopened issues, so the reopened issue analysis stops on it
+    'gamma': [
+        _issue(1, ['Bug'], [('commented', 'frank')]),
+    ],
+}
+
+
+class TestComparison(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.paths = {}
+        for name, issues in DATASETS.items():
+            self.paths[name] = os.path.join(self.tmp.name, f'{name}.json')
+            with open(self.paths[name], 'w') as fout:
+                json.dump(issues, fout)
+        env = patch.dict(os.environ, {
+            'ENPM611_PROJECT_CACHE_DIR': os.path.join(self.tmp.name, 'cache'),
+            'no_plot': 'json:true',
+            'workers': 'json:1',
+        })
+        env.start()
+        self.addCleanup(env.stop)
+        for name in ['_ISSUES', '_STORE', '_FIELDS', '_FINGERPRINT']:
+            singleton = patch.object(data_loader, name, None)
+            singleton.start()
+            self.addCleanup(singleton.stop)
+        self.args = argparse.Namespace(active_labels=10, label=None, labels=10)
+
+    def __run(self, names, feature_ids):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            results = comparison.run([(name, self.paths[name]) for name in names], feature_ids, self.args)
+        return results, output.getvalue()
+
+    def test_parse_dataset(self):
+        self.assertEqual(comparison.parse_dataset('poetry=data/poetry_issues.json'), ('poetry', 'data/poetry_issues.json'))
+        self.assertEqual(comparison.parse_dataset('data/poetry_issues.json'), ('poetry_issues', 'data/poetry_issues.json'))
+        self.assertEqual(comparison.parse_dataset('data/shards/'), ('shards', 'data/shards/'))
+        with self.assertRaises(ValueError):
+            comparison.parse_dataset('poetry=')
+
+    def test_run(self):
+        results, output = self.__run(['alpha', 'beta'], [1, 3])
+        self.assertEqual(results['datasets']['alpha'][3], {'reopen_count': {'Bug': 1}})
+        self.assertEqual(results['datasets']['beta'][3], {'reopen_count': {'Bug': 2, 'Feature': 2}})
+        self.assertEqual(results['comparison'][3], {'reopen_count': {
+            'alpha': {'Bug': 1, 'Feature': 0},
+            'beta': {'Bug': 2, 'Feature': 2},
+        }})
+        self.assertEqual(results['comparison'][1]['num_comments']['alpha'], {'Bug': 2, 'Docs': 1})
+        # The output of every dataset is printed in one block, in order
+        self.assertLess(output.index('=== alpha ==='), output.index('=== beta ==='))
+        self.assertIn('=== ReopenedIssueAnalysis: comparison ===', output)
+
+    def test_run_in_pool(self):
+        with patch.dict(os.environ, {'workers': 'json:2'}):
+            results, _ = self.__run(['alpha', 'beta'], [3])
+        self.assertEqual(results['comparison'][3]['reopen_count']['beta'], {'Bug': 2, 'Feature': 2})
+
+    def test_feature_that_stops(self):
+        results, output = self.__run(['alpha', 'gamma'], [3])
+        self.assertIsNone(results['datasets']['gamma'][3])
+        self.assertIn('No reopened issues found', output)
+        self.assertIn('Not enough results to compare.', output)
+        self.assertEqual(results['comparison'], {})
+
+    def test_missing_dataset(self):
+        self.paths['missing'] = os.path.join(self.tmp.name, 'missing.json')
+        for feature_ids in [[3], [1, 3]]:
+            results, output = self.__run(['alpha', 'missing', 'beta'], feature_ids)
+            self.assertEqual(results['datasets']['missing'], {feature_id: None for feature_id in feature_ids})
+            self.assertIn(f"Error: [Errno 2] No such file or directory: '{self.paths['missing']}'", output)
+            # The other datasets are still compared
+            self.assertEqual(results['comparison'][3]['reopen_count']['beta'], {'Bug': 2, 'Feature': 2})
+
+    def test_figures_per_dataset(self):
+        with patch.dict(os.environ, {'output': os.path.join(self.tmp.name, 'figures'), 'no_plot': ''}):
+            self.__run(['alpha', 'beta'], [3])
+        figures = os.path.join(self.tmp.name, 'figures')
+        self.assertTrue(os.path.exists(os.path.join(figures, 'alpha', 'ReopenedIssueAnalysis.png')))
+        self.assertTrue(os.path.exists(os.path.join(figures, 'beta', 'ReopenedIssueAnalysis.png')))
+        self.assertTrue(os.path.exists(os.path.join(figures, 'ReopenedIssueAnalysisComparison.png')))
+
+
+if __name__ == '__main__':
+    unittest.main()
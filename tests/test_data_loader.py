@@ -0,0 +1,299 @@
+import argparse
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import data_loader
+from data_loader import DataLoader
+from models.IssueFilter import IssueFilter
+from models.IssueStore import IssueStore
+from util import memory_budget
+from util.dataset_cache import DatasetCache
+from util.memory_budget import MemoryBudgetError
+
+
+ISSUES = [
+    {
+        'number': 1,
+        'state': 'open',
+        'creator': 'alice',
+        'labels': ['Bug'],
+        'created_date': '2024-01-01T00:00:00+00:00',
+        'events': [{'event_type': 'commented', 'author': 'bob', 'event_date': '2024-01-02T00:00:00+00:00'}],
+    },
+    {
+        'number': 2,
+        'state': 'closed',
+        'creator': 'bob',
+        'labels': ['Feature', 'Bug'],
+        'created_date': '2024-02-01T00:00:00+00:00',
+        'events': [],
+    },
+]
+
+
+class TestDataLoader(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.NamedTemporaryFile('w', suffix='.json', delete=False)
+        json.dump(ISSUES, tmp)
+        tmp.close()
+        self.data_path = tmp.name
+        self.addCleanup(os.remove, self.data_path)
+
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+
+        env = patch.dict(os.environ, {
+            'ENPM611_PROJECT_DATA_PATH': self.data_path,
+            'ENPM611_PROJECT_CACHE_DIR': self.cache_dir.name,
+        })
+        env.start()
+        self.addCleanup(env.stop)
+
+        for name in ['_ISSUES', '_STORE', '_FIELDS', '_FINGERPRINT']:
+            singleton = patch.object(data_loader, name, None)
+            singleton.start()
+            self.addCleanup(singleton.stop)
+
+    def test_get_issues(self):
+        issues = DataLoader().get_issues()
+        self.assertEqual([i.number for i in issues], [1, 2])
+        self.assertIs(DataLoader().get_issues(), issues)
+
+    def test_store_is_cached_on_disk(self):
+        first = DataLoader().get_store()
+        data_loader._STORE = None
+        with patch.object(IssueStore, 'from_records') as from_records:
+            second = DataLoader().get_store()
+            from_records.assert_not_called()
+        self.assertEqual(len(second), len(first))
+        self.assertEqual(second[0].events[0].author, 'bob')
+
+    def test_rebuild_cache(self):
+        DataLoader().get_store()
+        data_loader._STORE = None
+        with patch.dict(os.environ, {'rebuild_cache': 'json:true'}), \
+                patch.object(IssueStore, 'from_records', wraps=IssueStore.from_records) as from_records:
+            DataLoader().get_store()
+            from_records.assert_called_once()
+
+    def test_rebuild_cache_replaces_projections(self):
+        DataLoader().get_store(['labels'])
+        data_loader._STORE = None
+        DataLoader().get_store(['creator'])
+        self.assertEqual(len(os.listdir(self.cache_dir.name)), 2)
+        data_loader._STORE = None
+        with patch.dict(os.environ, {'rebuild_cache': 'json:true'}):
+            DataLoader().get_store()
+        # Only the entry of the full dataset is left
+        entry = DatasetCache(self.cache_dir.name).entry_path(self.data_path)
+        self.assertEqual(os.listdir(self.cache_dir.name), [os.path.basename(entry)])
+
+    def test_no_cache(self):
+        with patch.dict(os.environ, {'no_cache': 'json:true'}):
+            DataLoader().get_store()
+        self.assertEqual(os.listdir(self.cache_dir.name), [])
+
+    def test_snapshot_as_data_path(self):
+        snapshot = os.path.join(self.cache_dir.name, 'snapshot')
+        DataLoader().write_snapshot(snapshot)
+        data_loader._STORE = None
+        with patch.dict(os.environ, {'ENPM611_PROJECT_DATA_PATH': snapshot}):
+            issues = DataLoader().get_store()
+        self.assertEqual([i.labels for i in issues], [['Bug'], ['Feature', 'Bug']])
+
+    def test_projection_is_reloaded_when_insufficient(self):
+        issues = DataLoader().get_issues(['labels'])
+        self.assertIsNone(issues[0].creator)
+        self.assertIs(DataLoader().get_issues(['labels']), issues)
+        issues = DataLoader().get_issues(['creator'])
+        self.assertEqual(issues[0].creator, 'alice')
+        # Full data serves any projection
+        issues = DataLoader().get_issues()
+        self.assertIs(DataLoader().get_issues(['labels']), issues)
+
+    def test_full_cache_serves_projection(self):
+        DataLoader().get_store()
+        data_loader._STORE = None
+        with patch.object(IssueStore, 'from_records') as from_records:
+            DataLoader().get_store(['labels'])
+            from_records.assert_not_called()
+
+    def test_filter_is_pushed_into_parsing(self):
+        where = IssueFilter(label='Feature')
+        with patch.dict(os.environ, {'no_cache': 'json:true'}):
+            store = DataLoader().get_store(['creator'], where)
+        self.assertEqual([i.number for i in store], [2])
+        self.assertEqual(store[0].labels, ['Feature', 'Bug'])
+        self.assertEqual(where.scanned, 2)
+        # Issue 1 was never decoded
+        self.assertEqual(store.pools['users'].values, ['bob'])
+        # A filtered load does not replace the full dataset
+        self.assertIsNone(data_loader._STORE)
+
+    def test_filtered_load_fills_cache(self):
+        DataLoader().get_store(['creator'], IssueFilter(label='Feature'))
+        data_loader._STORE = None
+        # The next filtered query is served from the dataset cache
+        with patch('data_loader._load_file') as load_file:
+            store = DataLoader().get_store(['creator'], IssueFilter(label='Bug'))
+        load_file.assert_not_called()
+        self.assertEqual([i.number for i in store], [1, 2])
+
+    def test_filter_on_loaded_store(self):
+        DataLoader().get_store()
+        where = IssueFilter(participant='bob')
+        self.assertEqual([i.number for i in DataLoader().get_issues(where=where)], [1, 2])
+        self.assertEqual(len(DataLoader().get_issues()), 2)
+
+    def test_filter_uses_index(self):
+        DataLoader().get_store()
+        with patch.object(DataLoader, 'get_index', autospec=True, side_effect=DataLoader.get_index) as get_index:
+            store = DataLoader().get_store(where=IssueFilter(label='Feature'))
+        get_index.assert_called_once()
+        self.assertEqual([i.number for i in store], [2])
+
+    def test_stream_filtered(self):
+        where = IssueFilter(label='Feature')
+        with patch.dict(os.environ, {'stream': 'json:true'}):
+            self.assertEqual([i.number for i in DataLoader().load_store(['labels'], where)], [2])
+        self.assertEqual(where.scanned, 2)
+        self.assertIsNone(data_loader._STORE)
+
+    def test_sharded_data_path(self):
+        shard_dir = os.path.join(self.cache_dir.name, 'shards')
+        os.makedirs(shard_dir)
+        for name, records in [('2024-02.json', ISSUES[1:]), ('2024-01.json', ISSUES[:1])]:
+            with open(os.path.join(shard_dir, name), 'w') as fout:
+                json.dump(records, fout)
+        for data_path in [shard_dir, os.path.join(shard_dir, '2024-*.json')]:
+            data_loader._STORE = None
+            with patch.dict(os.environ, {'ENPM611_PROJECT_DATA_PATH': data_path, 'workers': '2'}):
+                issues = DataLoader().get_store()
+                self.assertEqual([i.number for i in issues], [1, 2])
+                self.assertEqual([i.number for i in DataLoader().get_store(where=IssueFilter(label='Bug'))], [1, 2])
+                self.assertEqual(DataLoader().get_store(where=IssueFilter(participant='bob'))[0].creator, 'alice')
+
+    def test_fingerprint(self):
+        loader = DataLoader()
+        fingerprint = loader.fingerprint()
+        self.assertEqual(fingerprint, DataLoader().fingerprint())
+        with open(self.data_path, 'a') as fout:
+            fout.write(' ')
+        self.assertNotEqual(loader.fingerprint(), fingerprint)
+
+    def test_loaded_fingerprint(self):
+        self.assertIsNone(data_loader.loaded_fingerprint())
+        DataLoader().get_store()
+        fingerprint = DataLoader().fingerprint()
+        self.assertEqual(data_loader.loaded_fingerprint(), fingerprint)
+        with open(self.data_path, 'a') as fout:
+            fout.write(' ')
+        # The loaded dataset is still the one of the old file
+        self.assertEqual(data_loader.loaded_fingerprint(), fingerprint)
+        data_loader.unload()
+        self.assertIsNone(data_loader.loaded_fingerprint())
+
+    def test_results_keyed_by_loaded_dataset(self):
+        from analyses.active_labels_analysis import ActiveLabelsAnalysis
+        args = argparse.Namespace(active_labels=10, label=None)
+        analysis = ActiveLabelsAnalysis()
+        with patch.dict(os.environ, {'no_plot': 'json:true'}), patch('builtins.print'):
+            DataLoader().get_store(analysis.required_fields())
+            # The data file is replaced while its old dataset is loaded
+            stat = os.stat(self.data_path)
+            with open(self.data_path, 'w') as fout:
+                json.dump([dict(ISSUES[0], labels=['Docs'])], fout)
+            os.utime(self.data_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+            self.assertEqual(analysis.run(args)['num_comments'], {'Bug': 1, 'Feature': 0})
+            # The results of the old dataset are not served for the new file
+            data_loader.unload()
+            self.assertEqual(analysis.run(args)['num_comments'], {'Docs': 1})
+
+    def test_memory_budget(self):
+        with patch.dict(os.environ, {'max_memory': '100'}):
+            with self.assertRaises(MemoryBudgetError):
+                DataLoader().get_store()
+
+    def test_memory_budget_drops_texts(self):
+        size = os.path.getsize(self.data_path)
+        budget = memory_budget.estimate_parse(size, memory_budget.without_texts(None))
+        with patch.dict(os.environ, {'max_memory': str(budget)}):
+            store = DataLoader().get_store()
+            self.assertEqual(store[0].labels, ['Bug'])
+            self.assertEqual(len(store.pools['texts']), 0)
+            # The reduced dataset is reused
+            self.assertIs(DataLoader().get_store(), store)
+
+    def test_memory_budget_filters_while_parsing(self):
+        DataLoader().get_store()
+        data_loader._STORE = None
+        where = IssueFilter(label='Feature')
+        # Fits one of the two issues, but not both
+        budget = memory_budget.estimate_parse(os.path.getsize(self.data_path)) * 3 // 4
+        with patch.dict(os.environ, {'max_memory': str(budget)}), patch('builtins.print') as mocked_print:
+            store = DataLoader().get_store(where=where)
+        # Only the matching issues were parsed, instead of loading all from the cache
+        self.assertEqual([issue.number for issue in store], [2])
+        mocked_print.assert_any_call(f'Loaded 1 of 2 issues matching {where} from {self.data_path}.')
+        with patch.dict(os.environ, {'max_memory': '100'}), patch('builtins.print'):
+            with self.assertRaises(MemoryBudgetError):
+                DataLoader().get_store(where=where)
+
+    def test_memory_budget_when_streaming(self):
+        size = os.path.getsize(self.data_path)
+        fields = ['labels', 'title']
+        # Fits half of the issues with their titles
+        budget = memory_budget.estimate_parse(size, frozenset(fields)) * 3 // 4
+        with patch.dict(os.environ, {'stream': 'json:true', 'max_memory': str(budget)}):
+            with self.assertRaises(MemoryBudgetError):
+                DataLoader().load_store(fields)
+            store = DataLoader().load_store(['labels'])
+            self.assertEqual([issue.labels for issue in store], [['Bug'], ['Feature', 'Bug']])
+            # Only the issues that match have to fit
+            where = IssueFilter(label='Feature')
+            self.assertEqual([issue.number for issue in DataLoader().load_store(fields, where)], [2])
+        with patch.dict(os.environ, {'stream': 'json:true', 'max_memory': '100'}):
+            with self.assertRaises(MemoryBudgetError):
+                DataLoader().load_store(fields, IssueFilter(label='Feature'))
+
+    def test_missing_data_files(self):
+        with patch.dict(os.environ, {'ENPM611_PROJECT_DATA_PATH': os.path.join(self.cache_dir.name, '*.json')}):
+            with self.assertRaises(FileNotFoundError):
+                DataLoader().get_store()
+
+    def test_merge(self):
+        delta_path = os.path.join(self.cache_dir.name, 'delta.json')
+        with open(delta_path, 'w') as fout:
+            json.dump([dict(ISSUES[1], updated_date='2024-03-01T00:00:00+00:00', labels=['Feature']),
+                       dict(ISSUES[0], number=3)], fout)
+        DataLoader().get_issues()
+        stats = DataLoader().merge(delta_path)
+        self.assertEqual((stats.added, stats.updated, stats.unchanged), (1, 1, 0))
+        self.assertEqual([i.labels for i in DataLoader().get_issues()], [['Bug'], ['Feature'], ['Bug']])
+
+    def test_get_store(self):
+        store = DataLoader().get_store()
+        self.assertEqual(len(store), 2)
+        self.assertEqual(store.num_events, 1)
+        self.assertEqual(DataLoader().get_issues()[1].labels, ['Feature', 'Bug'])
+
+    def test_get_frames(self):
+        frames = DataLoader().get_frames()
+        self.assertIs(DataLoader().get_frames(['labels']), frames)
+        self.assertEqual(list(frames.issues['number']), [1, 2])
+        where = IssueFilter(label='Feature')
+        self.assertEqual(list(DataLoader().get_frames(where=where).issues['number']), [2])
+
+    def test_get_frames_streaming(self):
+        with patch.dict(os.environ, {'stream': 'json:true'}):
+            frames = DataLoader().get_frames(['events.author'])
+        self.assertEqual(list(frames.events['author']), ['bob'])
+        self.assertIsNone(data_loader._STORE)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,13 @@
+import json
 import unittest
 from unittest.mock import patch, MagicMock
+from concurrent.futures import ThreadPoolExecutor
 from io import StringIO
+import os
 import sys
+import tempfile
 import run
+from util.memory_budget import MemoryBudgetError
 
 class TestRun(unittest.TestCase):
     def setUp(self):
@@ -52,7 +57,21 @@ class TestRun(unittest.TestCase):
             with self.assertRaises(SystemExit):
                 run.main()
         output = mock_stderr.getvalue()
-        self.assertIn("error: one of the arguments --feature/-f --list-features/-l is required", output)
+        self.assertIn("error: one of the arguments --feature/-f --list-features/-l --invalidate-results is required", output)
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_invalidate_results(self, mock_stdout):
+        cache = self.mock_analyses.BaseAnalysis.result_cache.return_value
+        cache.invalidate.return_value = 2
+        self.mock_feature_1.invalidate_drawings.return_value = 3
+        with patch("sys.argv", ["run.py", "--invalidate-results", "1"]):
+            with self.assertRaises(SystemExit):
+                run.main()
+        cache.invalidate.assert_called_once_with([1])
+        self.assertIn("Removed 2 cached results.", mock_stdout.getvalue())
+        self.assertIn("Removed 3 cached drawings.", mock_stdout.getvalue())
+        self.mock_feature_2.invalidate_drawings.assert_not_called()
+        self.mock_feature_1.run.assert_not_called()
 
     @patch("sys.stderr", new_callable=StringIO)
     def test_unknown_argument(self, mock_stderr):
@@ -88,5 +107,95 @@ class TestRun(unittest.TestCase):
         self.mock_feature_2.run.assert_called_once()
         self.mock_config.overwrite_from_args.assert_called_once()
 
+    @patch("data_loader.DataLoader")
+    def test_run_several_features(self, mock_loader):
+        self.mock_config.get_parameter.return_value = None
+        with patch("sys.argv", ["run.py", "--feature", "1,2", "--arg1", "a", "--arg2", "b"]):
+            run.main()
+        self.mock_feature_1.run.assert_called_once()
+        self.mock_feature_2.run.assert_called_once()
+        # The issues are loaded once up front for both features
+        mock_loader.return_value.get_store.assert_called_once()
+
+    @patch("data_loader.DataLoader")
+    def test_run_all_features(self, mock_loader):
+        self.mock_config.get_parameter.return_value = None
+        with patch("sys.argv", ["run.py", "--feature", "all"]):
+            run.main()
+        self.mock_feature_1.run.assert_called_once()
+        self.mock_feature_2.run.assert_called_once()
+
+    @patch("data_loader.DataLoader")
+    def test_run_features_headless_in_pool(self, mock_loader):
+        self.mock_config.get_parameter.side_effect = lambda name, *args: 2 if name == "workers" else None
+        with tempfile.TemporaryDirectory() as output, \
+                patch.dict(os.environ, {"output": output}), \
+                patch("run.ProcessPoolExecutor", ThreadPoolExecutor), \
+                patch("sys.argv", ["run.py", "--feature", "all", "--output", output]):
+            run.main()
+        self.mock_feature_1.run.assert_called_once()
+        self.mock_feature_2.run.assert_called_once()
+
+    @patch("data_loader.DataLoader")
+    def test_run_features_in_pool_exit_code(self, mock_loader):
+        self.mock_config.get_parameter.side_effect = lambda name, *args: 2 if name == "workers" else None
+        self.mock_feature_1.run.side_effect = SystemExit(1)
+        with patch.dict(os.environ, {"no_plot": "json:true"}), \
+                patch("run.ProcessPoolExecutor", ThreadPoolExecutor), \
+                patch("sys.argv", ["run.py", "--feature", "1,2", "--no-plot"]):
+            with self.assertRaises(SystemExit):
+                run.main()
+        # The other feature still ran
+        self.mock_feature_2.run.assert_called_once()
+
+    @patch("data_loader.DataLoader")
+    def test_profile(self, mock_loader):
+        self.mock_config.get_parameter.side_effect = lambda name, *args: 2 if name == "workers" else None
+        self.addCleanup(run.profiler.reset)
+        self.addCleanup(run.profiler.disable)
+        with tempfile.TemporaryDirectory() as tmp, \
+                patch.dict(os.environ, {"no_plot": "json:true"}), \
+                patch("sys.stdout", new_callable=StringIO) as mock_stdout, \
+                patch("sys.argv", ["run.py", "--feature", "1,2", "--no-plot", "--profile-trace", os.path.join(tmp, "trace.json")]):
+            run.main()
+            with open(os.path.join(tmp, "trace.json"), "r") as fin:
+                events = json.load(fin)["traceEvents"]
+        # Profiled features run in this process, one after the other
+        self.assertEqual([e["name"] for e in events if e["name"].startswith("Feature")], ["Feature 1", "Feature 2"])
+        self.assertIn("Profile:", mock_stdout.getvalue())
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_memory_budget_exceeded(self, mock_stdout):
+        self.mock_feature_1.run.side_effect = MemoryBudgetError("Loading issues.json", 2 << 20, 1 << 20)
+        with patch("sys.argv", ["run.py", "--feature", "1", "--max-memory", "1M"]):
+            with self.assertRaises(SystemExit) as e:
+                run.main()
+        self.assertEqual(e.exception.code, 1)
+        self.assertIn("Error: Loading issues.json needs about 2.0 MB", mock_stdout.getvalue())
+
+    @patch("comparison.run")
+    def test_run_datasets(self, mock_compare):
+        with patch("sys.argv", ["run.py", "--feature", "1,2", "--dataset", "a=a.json", "--dataset", "b.json"]):
+            run.main()
+        datasets, feature_ids, _ = mock_compare.call_args.args
+        self.assertEqual(datasets, [("a", "a.json"), ("b", "b.json")])
+        self.assertEqual(feature_ids, [1, 2])
+        # The features only run on the datasets
+        self.mock_feature_1.run.assert_not_called()
+
+    @patch("sys.stderr", new_callable=StringIO)
+    def test_duplicate_dataset_names(self, mock_stderr):
+        with patch("sys.argv", ["run.py", "--feature", "1", "--dataset", "a.json", "--dataset", "other/a.json"]):
+            with self.assertRaises(SystemExit):
+                run.main()
+        self.assertIn("every --dataset needs a different name", mock_stderr.getvalue())
+
+    @patch("sys.stderr", new_callable=StringIO)
+    def test_invalid_feature_list(self, mock_stderr):
+        with patch("sys.argv", ["run.py", "--feature", "1,x"]):
+            with self.assertRaises(SystemExit):
+                run.main()
+        self.assertIn("invalid feature list: '1,x'", mock_stderr.getvalue())
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,157 @@
+import base64
+import json
+import os
+import tempfile
+import threading
+import unittest
+from http.client import HTTPConnection
+from unittest.mock import patch
+
+import data_loader
+import server
+from server import AnalysisError, AnalysisService
+
+
+ISSUES = [
+    {
+        'number': 1,
+        'state': 'open',
+        'creator': 'alice',
+        'labels': ['Bug'],
+        'events': [
+            {'event_type': 'reopened', 'author': 'bob', 'event_date': '2024-01-02T00:00:00+00:00'},
+            {'event_type': 'commented', 'author': 'carol', 'event_date': '2024-01-03T00:00:00+00:00'},
+        ],
+    },
+    {
+        'number': 2,
+        'state': 'closed',
+        'creator': 'bob',
+        'labels': ['Feature', 'Bug'],
+        'events': [{'event_type': 'commented', 'author': 'alice', 'event_date': '2024-02-01T00:00:00+00:00'}],
+    },
+]
+
+
+class TestAnalysisService(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        data_path = os.path.join(self.tmp.name, 'issues.json')
+        with open(data_path, 'w') as fout:
+            json.dump(ISSUES, fout)
+        env = patch.dict(os.environ, {
+            'ENPM611_PROJECT_DATA_PATH': data_path,
+            'ENPM611_PROJECT_CACHE_DIR': os.path.join(self.tmp.name, 'cache'),
+        })
+        env.start()
+        self.addCleanup(env.stop)
+        for name in ['_ISSUES', '_STORE', '_FIELDS', '_FINGERPRINT']:
+            singleton = patch.object(data_loader, name, None)
+            singleton.start()
+            self.addCleanup(singleton.stop)
+        self.service = AnalysisService()
+        self.service.warm_up()
+
+    def test_features(self):
+        features = self.service.features()
+        self.assertEqual([f['feature'] for f in features], [1, 2, 3, 4])
+        self.assertEqual(features[2]['name'], 'ReopenedIssueAnalysis')
+
+    def test_run(self):
+        response = self.service.run({'feature': 1, 'args': {'label': 'Bug', 'active_labels': 3}})
+        self.assertEqual(response['result'], {'num_comments': {'Bug': 2}, 'label': 'Bug', 'occurrences': 2, 'issues': 2})
+        self.assertIn("The label 'Bug' occurred 2 times across 2 issues.", response['output'])
+        self.assertNotIn('images', response)
+
+    def test_run_reuses_resident_data(self):
+        store = data_loader._STORE
+        self.service.run({'feature': 3})
+        self.service.run({'feature': 4, 'args': {'centrality': 'pagerank'}})
+        self.assertIs(data_loader._STORE, store)
+
+    def test_results_are_cached(self):
+        request = {'feature': 3, 'args': {'labels': 5}}
+        first = self.service.run(request)
+        with patch.object(data_loader.DataLoader, 'get_frames') as get_frames:
+            second = self.service.run(request)
+        get_frames.assert_not_called()
+        self.assertEqual(second, first)
+
+        # Other arguments are computed
+        with patch.object(data_loader.DataLoader, 'get_frames', wraps=data_loader.DataLoader().get_frames) as get_frames:
+            self.service.run({'feature': 1, 'args': {'label': 'Bug'}})
+            self.service.run({'feature': 1, 'args': {'label': 'Feature'}})
+        self.assertEqual(get_frames.call_count, 2)
+
+    def test_run_with_images(self):
+        response = self.service.run({'feature': 3, 'images': True, 'format': 'svg'})
+        self.assertEqual(response['result'], {'reopen_count': {'Bug': 1}})
+        image = base64.b64decode(response['images']['ReopenedIssueAnalysis.svg'])
+        self.assertIn(b'<svg', image)
+        # The request's parameters do not leak into the next one
+        self.assertNotIn('output', os.environ)
+
+    def test_invalid_requests(self):
+        with self.assertRaises(AnalysisError) as e:
+            self.service.run({'feature': 99})
+        self.assertEqual(e.exception.status, 404)
+        with self.assertRaises(AnalysisError) as e:
+            self.service.run({'feature': 4, 'args': {'centrality': 'nope'}})
+        self.assertEqual(e.exception.status, 400)
+        with self.assertRaises(AnalysisError) as e:
+            self.service.run({'feature': 1, 'args': {'unknown': 1}})
+        self.assertEqual(e.exception.status, 400)
+
+    def test_failing_feature(self):
+        with self.assertRaises(AnalysisError) as e:
+            self.service.run({'feature': 4, 'args': {'label': 'Nothing'}})
+        self.assertEqual(e.exception.status, 422)
+        self.assertEqual(e.exception.message, 'No interactions found for the specified filters.')
+
+    def test_data_file_changed(self):
+        with open(os.environ['ENPM611_PROJECT_DATA_PATH'], 'w') as fout:
+            json.dump(ISSUES[:1], fout)
+        with patch('builtins.print') as mocked_print:
+            response = self.service.run({'feature': 1, 'args': {'label': 'Bug'}})
+        mocked_print.assert_any_call('The data files changed, loading them again.')
+        self.assertEqual(response['result']['issues'], 1)
+        self.assertEqual(len(data_loader._STORE), 1)
+
+    def test_http(self):
+        httpd = server.create_server(port=0)
+        httpd.service = self.service
+        thread = threading.Thread(target=httpd.serve_forever)
+        thread.start()
+        self.addCleanup(httpd.server_close)
+        self.addCleanup(thread.join)
+        self.addCleanup(httpd.shutdown)
+
+        with patch.object(server._Handler, 'log_message'):
+            connection = HTTPConnection(*httpd.server_address)
+            connection.request('POST', '/run', json.dumps({'feature': 3}))
+            response = connection.getresponse()
+            self.assertEqual(response.status, 200)
+            self.assertEqual(json.loads(response.read())['result'], {'reopen_count': {'Bug': 1}})
+
+            connection.request('POST', '/run', b'not json')
+            response = connection.getresponse()
+            self.assertEqual(response.status, 400)
+            self.assertIn('Invalid JSON', json.loads(response.read())['error'])
+
+            # Errors of a feature are not mistaken for invalid requests
+            with patch.object(server._Handler, 'log_error'):
+                for error in [ValueError('bad value'), KeyError('missing')]:
+                    with patch('analyses.reopened_issue_analysis.ReopenedIssueAnalysis.run', side_effect=error):
+                        connection.request('POST', '/run', json.dumps({'feature': 3}))
+                        response = connection.getresponse()
+                    self.assertEqual(response.status, 500)
+                    self.assertEqual(json.loads(response.read())['error'], f'{type(error).__name__}: {error}')
+
+            connection.request('GET', '/features')
+            self.assertEqual(len(json.loads(connection.getresponse().read())), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
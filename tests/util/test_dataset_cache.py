@@ -0,0 +1,59 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from util.dataset_cache import DatasetCache, fingerprint
+
+
+class TestDatasetCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.data_path = os.path.join(self.tmp.name, 'issues.json')
+        self.write('[1, 2, 3]')
+        self.cache = DatasetCache(os.path.join(self.tmp.name, 'cache'))
+
+    def write(self, content, mtime_ns=None):
+        with open(self.data_path, 'w') as fout:
+            fout.write(content)
+        if mtime_ns is not None:
+            os.utime(self.data_path, ns=(mtime_ns, mtime_ns))
+
+    def test_roundtrip(self):
+        self.assertIsNone(self.cache.load(self.data_path))
+        self.cache.save(self.data_path, {'payload': [1, 2, 3]})
+        self.assertEqual(self.cache.load(self.data_path), {'payload': [1, 2, 3]})
+
+    def test_changed_file_invalidates(self):
+        self.cache.save(self.data_path, 'old')
+        self.write('[1, 2, 4]', mtime_ns=fingerprint(self.data_path)['mtime_ns'] + 10**9)
+        self.assertIsNone(self.cache.load(self.data_path))
+
+    def test_touched_file_with_same_content(self):
+        self.cache.save(self.data_path, 'payload')
+        self.write('[1, 2, 3]', mtime_ns=fingerprint(self.data_path)['mtime_ns'] + 10**9)
+        self.assertEqual(self.cache.load(self.data_path), 'payload')
+        # The entry now has the new modification time, so the file is not hashed again
+        with patch('util.dataset_cache.content_hash') as mocked_hash:
+            self.assertEqual(self.cache.load(self.data_path), 'payload')
+        mocked_hash.assert_not_called()
+        # A later change is still detected
+        self.write('[1, 2, 4]', mtime_ns=fingerprint(self.data_path)['mtime_ns'] + 10**9)
+        self.assertIsNone(self.cache.load(self.data_path))
+
+    def test_corrupt_entry(self):
+        os.makedirs(self.cache.cache_dir)
+        with open(self.cache.entry_path(self.data_path), 'wb') as fout:
+            fout.write(b'not a pickle')
+        self.assertIsNone(self.cache.load(self.data_path))
+
+    def test_invalidate(self):
+        self.cache.save(self.data_path, 'payload')
+        self.cache.invalidate(self.data_path)
+        self.assertIsNone(self.cache.load(self.data_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+from datetime import datetime, timezone
+
+from util import dates
+
+
+class TestDates(unittest.TestCase):
+
+    def setUp(self):
+        dates.reset()
+
+    def test_iso_fast_path(self):
+        value = dates.parse_date('2024-05-10T18:38:17+00:00')
+        self.assertEqual(value, datetime(2024, 5, 10, 18, 38, 17, tzinfo=timezone.utc))
+        self.assertEqual(dates.get_stats()['slow_path'], 0)
+
+    def test_zulu_suffix(self):
+        value = dates.parse_date('2024-01-01T00:00:00Z')
+        self.assertEqual(value, datetime(2024, 1, 1, tzinfo=timezone.utc))
+
+    def test_fallback(self):
+        value = dates.parse_date('May 10 2024 6:38PM')
+        self.assertEqual(value, datetime(2024, 5, 10, 18, 38))
+        self.assertEqual(dates.get_stats()['slow_path'], 1)
+
+    def test_memoized(self):
+        first = dates.parse_date('2024-05-10T18:38:17+00:00')
+        second = dates.parse_date('2024-05-10T18:38:17+00:00')
+        self.assertIs(first, second)
+        stats = dates.get_stats()
+        self.assertEqual(stats['decoded'], 1)
+        self.assertEqual(stats['cache_hits'], 1)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            dates.parse_date('invalid_date')
+        with self.assertRaises(TypeError):
+            dates.parse_date(None)
+
+
+if __name__ == '__main__':
+    unittest.main()
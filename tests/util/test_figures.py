@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from util import figures
+
+
+class TestFigures(unittest.TestCase):
+
+    def test_enabled(self):
+        self.assertTrue(figures.enabled())
+        with patch.dict(os.environ, {'no_plot': 'json:true'}):
+            self.assertFalse(figures.enabled())
+
+    @patch('matplotlib.pyplot.show')
+    def test_show_in_window(self, mock_show):
+        figures.pyplot().figure()
+        self.assertIsNone(figures.show('Test'))
+        mock_show.assert_called_once()
+
+    def test_write_to_output_directory(self):
+        with tempfile.TemporaryDirectory() as output:
+            with patch.dict(os.environ, {'output': output, 'figure_format': 'svg'}):
+                plt = figures.pyplot()
+                plt.plot([1, 2], [3, 4])
+                path = figures.show('Test')
+            self.assertEqual(path, os.path.join(output, 'Test.svg'))
+            self.assertTrue(os.path.isfile(path))
+
+    def test_matplotlib_is_not_imported_on_startup(self):
+        code = 'import sys, run; print("matplotlib" in sys.modules)'
+        root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        result = subprocess.run([sys.executable, '-c', code], cwd=root, capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), 'False')
+
+
+if __name__ == '__main__':
+    unittest.main()
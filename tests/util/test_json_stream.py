@@ -0,0 +1,41 @@
+import io
+import json
+import unittest
+
+from util.json_stream import iter_json_array
+
+
+class TestJsonStream(unittest.TestCase):
+
+    def test_iter_objects(self):
+        data = [{'number': i, 'labels': ['bug'], 'text': 'x' * i} for i in range(50)]
+        fin = io.StringIO(json.dumps(data, indent=2))
+        # A tiny chunk size forces elements to span several reads
+        self.assertEqual(list(iter_json_array(fin, chunk_size=7)), data)
+
+    def test_numbers_split_across_chunks(self):
+        fin = io.StringIO('[12345, 678901, 2]')
+        self.assertEqual(list(iter_json_array(fin, chunk_size=3)), [12345, 678901, 2])
+
+    def test_empty_array(self):
+        self.assertEqual(list(iter_json_array(io.StringIO('  [ ] '))), [])
+
+    def test_is_lazy(self):
+        fin = io.StringIO('[{"a": 1}, {"a": 2}, not json')
+        items = iter_json_array(fin, chunk_size=4)
+        self.assertEqual(next(items), {'a': 1})
+        self.assertEqual(next(items), {'a': 2})
+        with self.assertRaises(ValueError):
+            next(items)
+
+    def test_not_an_array(self):
+        with self.assertRaises(ValueError):
+            list(iter_json_array(io.StringIO('{"a": 1}')))
+
+    def test_truncated_array(self):
+        with self.assertRaises(ValueError):
+            list(iter_json_array(io.StringIO('[{"a": 1},')))
+
+
+if __name__ == '__main__':
+    unittest.main()
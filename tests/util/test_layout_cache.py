@@ -0,0 +1,47 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from util.layout_cache import LayoutCache
+
+
+class TestLayoutCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+        self.cache = LayoutCache(os.path.join(self.cache_dir.name, 'layouts'))
+
+    def test_missing_entry(self):
+        self.assertIsNone(self.cache.load('abc'))
+
+    def test_round_trip(self):
+        self.cache.save('abc', {'alice': np.array([0.5, -0.5])})
+        positions = self.cache.load('abc')
+        np.testing.assert_array_equal(positions['alice'], [0.5, -0.5])
+
+    def test_corrupt_entry_is_ignored(self):
+        os.makedirs(self.cache.cache_dir)
+        with open(self.cache.entry_path('abc'), 'wb') as fout:
+            fout.write(b'garbage')
+        self.assertIsNone(self.cache.load('abc'))
+
+    def test_least_recently_used_layouts_are_evicted(self):
+        positions = {f'user{i}': np.array([0.0, 1.0]) for i in range(50)}
+        self.cache.save('a', positions)
+        size = os.path.getsize(self.cache.entry_path('a'))
+        self.cache.max_bytes = 2 * size
+        self.cache.save('b', positions)
+        os.utime(self.cache.entry_path('b'), ns=(0, 0))
+        self.assertIsNotNone(self.cache.load('a'))
+        self.cache.save('c', positions)
+        self.assertIsNone(self.cache.load('b'))
+        self.assertIsNotNone(self.cache.load('a'))
+        self.assertEqual(self.cache.invalidate(), 2)
+        self.assertIsNone(self.cache.load('a'))
+
+
+if __name__ == '__main__':
+    unittest.main()
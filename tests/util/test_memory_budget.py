@@ -0,0 +1,56 @@
+import os
+import pickle
+import unittest
+from unittest.mock import patch
+
+from models.Issue import project_fields
+from util import memory_budget
+from util.memory_budget import MemoryBudgetError
+
+
+class TestMemoryBudget(unittest.TestCase):
+
+    def test_parse_size(self):
+        self.assertEqual(memory_budget.parse_size('1024'), 1024)
+        self.assertEqual(memory_budget.parse_size('512M'), 512 << 20)
+        self.assertEqual(memory_budget.parse_size('1.5GB'), 3 << 29)
+        self.assertEqual(memory_budget.parse_size('2 KiB'), 2048)
+        with self.assertRaises(ValueError):
+            memory_budget.parse_size('lots')
+
+    def test_budget(self):
+        with patch.dict(os.environ, {}, clear=False):
+            os.environ.pop('max_memory', None)
+            self.assertIsNone(memory_budget.get_budget())
+            self.assertTrue(memory_budget.fits(1 << 40))
+        with patch.dict(os.environ, {'max_memory': '1M'}):
+            self.assertEqual(memory_budget.get_budget(), 1 << 20)
+            self.assertFalse(memory_budget.fits(2 << 20))
+            with self.assertRaises(MemoryBudgetError) as e:
+                memory_budget.check('Loading issues.json', 2 << 20, 'Use a filter.')
+        self.assertEqual(
+            str(e.exception),
+            'Loading issues.json needs about 2.0 MB, which is over the --max-memory budget of 1.0 MB. Use a filter.'
+        )
+
+    def test_estimate_parse(self):
+        everything = memory_budget.estimate_parse(1000)
+        without_texts = memory_budget.estimate_parse(1000, memory_budget.without_texts(None))
+        projected = memory_budget.estimate_parse(1000, project_fields({'labels', 'events.event_type'}))
+        self.assertGreater(everything, without_texts)
+        self.assertGreater(without_texts, projected)
+
+    def test_without_texts(self):
+        fields = memory_budget.without_texts(None)
+        self.assertIn('events.author', fields)
+        self.assertNotIn('text', fields)
+        self.assertNotIn('events.comment', fields)
+
+    def test_error_survives_pickling(self):
+        error = pickle.loads(pickle.dumps(MemoryBudgetError('Loading', 2 << 20, 1 << 20)))
+        self.assertIsInstance(error, MemoryBudgetError)
+        self.assertEqual(error.needed, 2 << 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import json
+import os
+import tempfile
+import unittest
+
+from util import profiler
+
+
+class TestProfiler(unittest.TestCase):
+
+    def setUp(self):
+        profiler.reset()
+        profiler.enable()
+        self.addCleanup(profiler.reset)
+        self.addCleanup(profiler.disable)
+
+    def test_stages_nest(self):
+        with profiler.stage('feature'):
+            with profiler.stage('aggregate'):
+                pass
+            with profiler.stage('visualize'):
+                with profiler.stage('render'):
+                    pass
+        stages = profiler.stages()
+        self.assertEqual([s['path'] for s in stages], [
+            'feature', 'feature/aggregate', 'feature/visualize', 'feature/visualize/render'
+        ])
+        self.assertEqual([s['depth'] for s in stages], [0, 1, 1, 2])
+        self.assertGreaterEqual(stages[0]['wall_ms'], stages[1]['wall_ms'] + stages[2]['wall_ms'])
+
+    def test_peak_memory(self):
+        with profiler.stage('feature'):
+            with profiler.stage('allocate'):
+                data = bytearray(8 << 20)
+                del data
+            with profiler.stage('small'):
+                pass
+        feature, allocate, small = profiler.stages()
+        self.assertGreaterEqual(allocate['peak_mb'], 8)
+        self.assertLess(small['peak_mb'], 1)
+        # The peak of a nested stage counts for its parent as well
+        self.assertGreaterEqual(feature['peak_mb'], 8)
+
+    def test_disabled(self):
+        profiler.disable()
+        with profiler.stage('feature'):
+            pass
+        self.assertEqual(profiler.stages(), [])
+
+    def test_exports(self):
+        with profiler.stage('feature'):
+            pass
+        with tempfile.TemporaryDirectory() as tmp:
+            profiler.write_json(os.path.join(tmp, 'profile.json'))
+            profiler.write_chrome_trace(os.path.join(tmp, 'trace.json'))
+            with open(os.path.join(tmp, 'profile.json'), 'r') as fin:
+                self.assertEqual(json.load(fin)['stages'][0]['name'], 'feature')
+            with open(os.path.join(tmp, 'trace.json'), 'r') as fin:
+                event, = json.load(fin)['traceEvents']
+        self.assertEqual(event['name'], 'feature')
+        self.assertEqual(event['ph'], 'X')
+        self.assertIn('cpu_ms', event['args'])
+        self.assertIn('feature', profiler.summary())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+
+from util.result_cache import ResultCache
+
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+        self.cache = ResultCache(os.path.join(self.cache_dir.name, 'results'))
+
+    def test_key(self):
+        key = ResultCache.key(3, {'labels': 10, 'label': None}, 'abc')
+        self.assertEqual(key, ResultCache.key(3, {'label': None, 'labels': 10}, 'abc'))
+        self.assertNotEqual(key, ResultCache.key(3, {'label': None, 'labels': 5}, 'abc'))
+        self.assertNotEqual(key, ResultCache.key(1, {'label': None, 'labels': 10}, 'abc'))
+        self.assertNotEqual(key, ResultCache.key(3, {'label': None, 'labels': 10}, 'def'))
+
+    def test_missing_entry(self):
+        self.assertIsNone(self.cache.get(3, 'abc'))
+
+    def test_round_trip(self):
+        self.cache.put(3, 'abc', {'reopen_count': {'Bug': 2}})
+        self.assertEqual(self.cache.get(3, 'abc'), {'reopen_count': {'Bug': 2}})
+
+    def test_corrupt_entry_is_ignored(self):
+        os.makedirs(self.cache.cache_dir)
+        with open(self.cache.entry_path(3, 'abc'), 'w') as fout:
+            fout.write('garbage')
+        self.assertIsNone(self.cache.get(3, 'abc'))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        result = {'values': list(range(100))}
+        self.cache.put(1, 'a', result)
+        size = os.path.getsize(self.cache.entry_path(1, 'a'))
+        self.cache.max_bytes = 2 * size
+        self.cache.put(1, 'b', result)
+        # Using 'a' makes 'b' the least recently used entry
+        os.utime(self.cache.entry_path(1, 'b'), ns=(0, 0))
+        self.assertIsNotNone(self.cache.get(1, 'a'))
+        self.cache.put(1, 'c', result)
+        self.assertIsNotNone(self.cache.get(1, 'a'))
+        self.assertIsNone(self.cache.get(1, 'b'))
+        self.assertIsNotNone(self.cache.get(1, 'c'))
+
+    def test_invalidate(self):
+        self.cache.put(1, 'a', {})
+        self.cache.put(3, 'b', {})
+        self.cache.put(3, 'c', {})
+        self.assertEqual(self.cache.invalidate([3]), 2)
+        self.assertIsNotNone(self.cache.get(1, 'a'))
+        self.assertEqual(self.cache.invalidate(), 1)
+        self.assertIsNone(self.cache.get(1, 'a'))
+
+
+if __name__ == '__main__':
+    unittest.main()
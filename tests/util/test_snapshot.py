@@ -0,0 +1,59 @@
+import os
+import pickle
+import tempfile
+import unittest
+
+import numpy as np
+
+from models.IssueStore import IssueStore, StringPool
+from tests.models.test_issue_store import RECORDS
+from util.snapshot import is_snapshot, open_snapshot, write_snapshot
+
+
+class TestSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, 'snapshot')
+        self.store = IssueStore.from_records(RECORDS)
+        write_snapshot(self.store, self.path)
+
+    def test_roundtrip(self):
+        self.assertTrue(is_snapshot(self.path))
+        mapped = open_snapshot(self.path)
+        self.assertIsInstance(mapped.columns['event_type'], np.memmap)
+        for name, column in self.store.columns.items():
+            np.testing.assert_array_equal(mapped.columns[name], column, name)
+        for name, pool in self.store.pools.items():
+            self.assertEqual(list(mapped.pools[name].values), pool.values, name)
+        self.assertEqual(mapped[0].title, 'First')
+        self.assertEqual(mapped[0].events[0].comment, 'Hi')
+        np.testing.assert_array_equal(mapped.event_counts('commented'), [2, 0, 1])
+        self.assertIsInstance(mapped.index.indexes['label_issues'].rows, np.memmap)
+        np.testing.assert_array_equal(mapped.index.issues_with_label('Bug'), [0, 1])
+
+    def test_pools_are_read_only(self):
+        pool = open_snapshot(self.path).pools['labels']
+        self.assertEqual(pool.encode('Bug'), pool.lookup('Bug'))
+        with self.assertRaises(ValueError):
+            pool.encode('New label')
+
+    def test_pickle_detaches(self):
+        mapped = open_snapshot(self.path)
+        copy = pickle.loads(pickle.dumps(mapped))
+        self.assertIsInstance(copy.pools['labels'], StringPool)
+        self.assertEqual(copy.pools['labels'].values, ['Bug', 'Docs'])
+
+    def test_overwrite(self):
+        write_snapshot(IssueStore.from_records(RECORDS[:1]), self.path)
+        self.assertEqual(len(open_snapshot(self.path)), 1)
+
+    def test_not_a_snapshot(self):
+        self.assertFalse(is_snapshot(self.tmp.name))
+        with self.assertRaises(ValueError):
+            open_snapshot(self.tmp.name)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+import hashlib
+import logging
+import os
+import pickle
+import shutil
+
+logger = logging.getLogger(__name__)
+
+'''
+On-disk cache of the parsed dataset, so that repeated runs against the same
+data file can skip parsing. A cache entry is only used while the data file
+it was built from is unchanged.
+'''
+
+# Bump whenever the layout of the cached objects changes
+CACHE_VERSION = 2
+
+_HASH_BLOCK_SIZE = 1 << 20
+
+
+def fingerprint(path: str, with_hash: bool = True) -> dict:
+    """
+    Identifies the current contents of a file by its size, modification
+    time and (optionally) the SHA-256 of its contents.
+    """
+    stat = os.stat(path)
+    result = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    if with_hash:
+        result['sha256'] = content_hash(path)
+    return result
+
+
+def content_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fin:
+        for block in iter(lambda: fin.read(_HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DatasetCache:
+    """
+    Stores one pickled object per data file in the cache directory.
+    Each entry starts with a small header holding the fingerprint of the data
+    file, so validity can be checked without reading the payload.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+
+    @staticmethod
+    def variant(parts) -> str:
+        """
+        Builds a variant name from a list of strings, for keeping several
+        entries (e.g. different projections) for the same data file.
+        """
+        return hashlib.sha1('\0'.join(parts).encode('utf-8')).hexdigest()[:12]
+
+    def entry_path(self, data_path: str, variant: str = None) -> str:
+        key = hashlib.sha1(os.path.abspath(data_path).encode('utf-8')).hexdigest()[:16]
+        if variant:
+            key = f'{key}.{variant}'
+        return os.path.join(self.cache_dir, f'{os.path.basename(data_path)}.{key}.pickle')
+
+    def load(self, data_path: str, variant: str = None):
+        """
+        Returns the cached object for the data file, or None if there is no
+        entry or the data file changed since the entry was written.
+        """
+        entry = self.entry_path(data_path, variant)
+        if not os.path.isfile(entry):
+            return None
+        try:
+            with open(entry, 'rb') as fin:
+                header = pickle.load(fin)
+                if not self.__is_valid(header, data_path):
+                    logger.info(f'Cache entry {entry} is stale')
+                    return None
+                offset = fin.tell()
+                payload = pickle.load(fin)
+                current = fingerprint(data_path, with_hash=False)
+                if current['mtime_ns'] != header['fingerprint'].get('mtime_ns'):
+                    # The data file was touched but is unchanged. Record its new
+                    # modification time, so that later loads do not hash it again.
+                    fin.seek(offset)
+                    self.__rewrite_header(entry, dict(header['fingerprint'], **current), fin)
+                return payload
+        except Exception as e:
+            # A corrupt or incompatible entry is treated like a missing one
+            logger.info(f'Ignoring unreadable cache entry {entry}: {e}')
+            return None
+
+    def save(self, data_path: str, payload, variant: str = None):
+        """
+        Writes the object for the data file, replacing any existing entry.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry = self.entry_path(data_path, variant)
+        header = {'version': CACHE_VERSION, 'fingerprint': fingerprint(data_path)}
+        tmp_path = f'{entry}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as fout:
+            pickle.dump(header, fout, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(payload, fout, protocol=pickle.HIGHEST_PROTOCOL)
+        # Atomic so that concurrent runs never see a half written entry
+        os.replace(tmp_path, entry)
+
+    def invalidate(self, data_path: str):
+        """
+        Removes all entries of the data file.
+        """
+        prefix = os.path.basename(self.entry_path(data_path))[:-len('.pickle')]
+        if not os.path.isdir(self.cache_dir):
+            return
+        for name in os.listdir(self.cache_dir):
+            if name.startswith(prefix) and name.endswith('.pickle'):
+                os.remove(os.path.join(self.cache_dir, name))
+
+    def __rewrite_header(self, entry: str, data_fingerprint: dict, payload):
+        """
+        Replaces the entry with one that has the given fingerprint and the
+        payload read from the open entry file.
+        """
+        header = {'version': CACHE_VERSION, 'fingerprint': data_fingerprint}
+        tmp_path = f'{entry}.{os.getpid()}.tmp'
+        try:
+            with open(tmp_path, 'wb') as fout:
+                pickle.dump(header, fout, protocol=pickle.HIGHEST_PROTOCOL)
+                shutil.copyfileobj(payload, fout)
+            os.replace(tmp_path, entry)
+        except OSError as e:
+            # The entry stays valid, it is only checked more slowly
+            logger.info(f'Could not update cache entry {entry}: {e}')
+
+    def __is_valid(self, header: dict, data_path: str) -> bool:
+        if header.get('version') != CACHE_VERSION:
+            return False
+        cached = header.get('fingerprint', {})
+        current = fingerprint(data_path, with_hash=False)
+        if current['size'] != cached.get('size'):
+            return False
+        if current['mtime_ns'] == cached.get('mtime_ns'):
+            return True
+        # Touched but possibly unchanged, e.g. after a fresh checkout
+        return content_hash(data_path) == cached.get('sha256')
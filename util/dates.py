@@ -0,0 +1,62 @@
+from datetime import datetime
+from functools import lru_cache
+
+from dateutil import parser
+
+'''
+Decoding of the timestamps found in the issue data. GitHub emits ISO-8601
+strings, which are handled by the standard library directly. Only values in
+other formats are handed to dateutil, which is an order of magnitude slower.
+Results are memoized since many events share the same timestamp.
+'''
+
+_CACHE_SIZE = 1 << 16
+
+_stats = {'slow_path': 0}
+
+
+def parse_date(value: str) -> datetime:
+    """
+    Converts a timestamp string to a datetime.
+
+    Raises:
+        ValueError: If the value can not be interpreted as a date.
+        TypeError: If the value is not a string.
+    """
+    if not isinstance(value, str):
+        raise TypeError(f'Expected a date string but got {type(value).__name__}')
+    return _parse_cached(value)
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def _parse_cached(value: str) -> datetime:
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        pass
+    _stats['slow_path'] += 1
+    try:
+        return parser.parse(value)
+    except (ValueError, OverflowError) as e:
+        raise ValueError(f'Unknown date format: {value}') from e
+
+
+def get_stats() -> dict:
+    """
+    Returns how many distinct values were decoded, how many lookups were
+    answered from the cache, and how many values needed the dateutil fallback.
+    """
+    info = _parse_cached.cache_info()
+    return {
+        'decoded': info.misses,
+        'cache_hits': info.hits,
+        'slow_path': _stats['slow_path'],
+    }
+
+
+def reset():
+    """
+    Clears the memoized values and the statistics.
+    """
+    _parse_cached.cache_clear()
+    _stats['slow_path'] = 0
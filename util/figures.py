@@ -0,0 +1,61 @@
+import os
+
+import config
+from util import profiler
+
+'''
+Figure handling shared by the analyses. By default figures are shown in a
+window. With --output they are rendered headless to image files instead,
+and with --no-plot no figure is drawn at all. matplotlib is only imported
+once a figure is actually drawn, since importing it is a large part of the
+start-up time.
+'''
+
+FORMATS = ['png', 'svg']
+
+
+def enabled() -> bool:
+    """
+    Whether the analyses should draw figures.
+    """
+    return not config.get_parameter('no_plot')
+
+
+def output_dir() -> str:
+    """
+    Directory figures are written to, or None to show them in a window.
+    """
+    return config.get_parameter('output')
+
+
+def pyplot():
+    """
+    Imports and returns matplotlib.pyplot, with a non-interactive backend
+    when figures are written to files.
+    """
+    import matplotlib
+    if output_dir():
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def show(name: str) -> str:
+    """
+    Finishes the current figure: writes it to <output>/<name>.<format> if an
+    output directory is set, shows it otherwise.
+    Returns the path of the written file, or None.
+    """
+    plt = pyplot()
+    directory = output_dir()
+    if not directory:
+        with profiler.stage('render'):
+            plt.show()
+        return None
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{name}.{config.get_parameter('figure_format', 'png')}")
+    with profiler.stage('render'):
+        plt.savefig(path)
+    plt.close()
+    print(f'Wrote {path}')
+    return path
@@ -0,0 +1,102 @@
+import json
+import re
+from typing import Any, Iterator, TextIO
+
+'''
+Incremental decoding of large JSON documents so that callers can process
+the elements of a top-level array without holding the whole file in memory.
+'''
+
+_WHITESPACE = re.compile(r'\s*')
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+
+def iter_json_array(fin: TextIO, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Yields the elements of the top-level JSON array in the given file one at
+    a time. Only the element that is currently being decoded is buffered, so
+    memory use is bounded by the largest element rather than the file size.
+
+    Raises:
+        ValueError: If the document is not a well-formed JSON array.
+    """
+    decoder = json.JSONDecoder()
+    reader = _ChunkReader(fin, chunk_size)
+
+    pos = reader.skip_whitespace(0)
+    if reader.char_at(pos) != '[':
+        raise ValueError('Expected a JSON array at the start of the document.')
+    pos = reader.skip_whitespace(pos + 1)
+    if reader.char_at(pos) == ']':
+        return
+
+    while True:
+        value, pos = reader.decode(decoder, pos)
+        yield value
+        pos = reader.skip_whitespace(pos)
+        char = reader.char_at(pos)
+        if char == ']':
+            return
+        if char != ',':
+            raise ValueError(f"Expected ',' or ']' at offset {reader.offset(pos)}.")
+        pos = reader.skip_whitespace(pos + 1)
+
+
+class _ChunkReader:
+    """
+    Sliding text buffer over a file that is refilled on demand.
+    Positions handed out by the reader are relative to the current buffer.
+    """
+
+    def __init__(self, fin: TextIO, chunk_size: int):
+        self._fin = fin
+        self._chunk_size = chunk_size
+        self._buffer = ''
+        self._consumed = 0
+        self._eof = False
+
+    def offset(self, pos: int) -> int:
+        return self._consumed + pos
+
+    def char_at(self, pos: int) -> str:
+        while pos >= len(self._buffer):
+            pos = self._fill(pos)
+            if self._eof and pos >= len(self._buffer):
+                raise ValueError('Unexpected end of JSON document.')
+        return self._buffer[pos]
+
+    def skip_whitespace(self, pos: int) -> int:
+        while True:
+            pos = _WHITESPACE.match(self._buffer, pos).end()
+            if pos < len(self._buffer) or self._eof:
+                return pos
+            pos = self._fill(pos)
+
+    def decode(self, decoder: json.JSONDecoder, pos: int):
+        while True:
+            try:
+                value, end = decoder.raw_decode(self._buffer, pos)
+                # A value that ends exactly at the buffer boundary may have
+                # been cut short (e.g. a number), so only trust it once more
+                # input follows or the file is exhausted.
+                if end < len(self._buffer) or self._eof:
+                    return value, end
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise ValueError(f'Malformed JSON element at offset {self.offset(pos)}.')
+            pos = self._fill(pos)
+
+    def _fill(self, pos: int) -> int:
+        """
+        Drops everything before pos and appends the next chunk. The read size
+        grows with the pending data so that decoding a single huge element
+        stays linear. Returns pos translated to the new buffer.
+        """
+        self._consumed += pos
+        pending = self._buffer[pos:]
+        chunk = self._fin.read(max(self._chunk_size, len(pending)))
+        if not chunk:
+            self._eof = True
+        self._buffer = pending + chunk
+        return 0
@@ -0,0 +1,75 @@
+import logging
+import os
+import pickle
+from typing import Dict
+
+import numpy as np
+
+from util.result_cache import cache_entries, evict_least_recently_used
+
+logger = logging.getLogger(__name__)
+
+'''
+On-disk cache of graph layouts. Computing a layout is the most expensive
+part of drawing a large graph, so the node positions are kept by a key
+identifying the graph and the layout parameters, and reused when the same
+graph is drawn again. Like the result cache, the cache is kept below a size
+limit by evicting the least recently used layouts.
+'''
+
+# Default size limit of the cache
+DEFAULT_MAX_BYTES = 32 << 20
+_SUFFIX = '.layout.pickle'
+
+
+class LayoutCache:
+    """
+    Stores one pickled {node: position} mapping per key in the cache
+    directory. The modification time of an entry is its last use.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f'{key}{_SUFFIX}')
+
+    def load(self, key: str) -> Dict[str, np.ndarray]:
+        """
+        Returns the cached positions, or None if there are none.
+        """
+        entry = self.entry_path(key)
+        if not os.path.isfile(entry):
+            return None
+        try:
+            with open(entry, 'rb') as fin:
+                positions = pickle.load(fin)
+            # Mark the entry as recently used
+            os.utime(entry)
+            return positions
+        except Exception as e:
+            logger.info(f'Ignoring unreadable layout cache entry {entry}: {e}')
+            return None
+
+    def save(self, key: str, positions: Dict[str, np.ndarray]):
+        """
+        Writes the positions and evicts the least recently used layouts
+        while the cache is larger than its limit.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry = self.entry_path(key)
+        tmp_path = f'{entry}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as fout:
+            pickle.dump(positions, fout, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, entry)
+        evict_least_recently_used(self.cache_dir, _SUFFIX, self.max_bytes)
+
+    def invalidate(self) -> int:
+        """
+        Removes all layouts. Returns the number of removed layouts.
+        """
+        entries = cache_entries(self.cache_dir, _SUFFIX)
+        for path, _, _ in entries:
+            os.remove(path)
+        return len(entries)
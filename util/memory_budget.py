@@ -0,0 +1,126 @@
+import re
+from typing import AbstractSet, Iterable
+
+import config
+
+'''
+Memory budget set with --max-memory (parameter max_memory). The loader and
+the analyses estimate what a step will need before running it, switch to a
+cheaper strategy when the estimate is over the budget, and otherwise fail
+with a MemoryBudgetError instead of being killed for running out of memory.
+The budget covers the data; the interpreter and the libraries need about
+150 MB on top of it.
+'''
+
+_UNITS = {'': 1, 'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30, 'T': 1 << 40}
+_SIZE = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([KMGT]?)(?:I?B)?\s*$', re.IGNORECASE)
+
+# Fields stored in the pool of free texts, which dominates the memory of a
+# parsed dataset
+TEXT_FIELDS = frozenset(['url', 'title', 'text', 'timeline_url', 'events.comment'])
+
+# Peak memory of parsing, per byte of JSON input: a base for the decoded
+# records and numbers, plus a share per selected field, plus the texts.
+# Measured on generated data, rounded up.
+_PARSE_BASE = 0.35
+_PARSE_PER_FIELD = 0.06
+_PARSE_TEXTS = 1.0
+_ALL_FIELDS = 16
+
+
+class MemoryBudgetError(Exception):
+    """
+    A step would need more memory than the --max-memory budget allows.
+    """
+
+    def __init__(self, what: str, needed: int, budget: int, hint: str = None):
+        message = (
+            f'{what} needs about {format_size(needed)}, which is over the '
+            f'--max-memory budget of {format_size(budget)}.'
+        )
+        if hint:
+            message += f' {hint}'
+        super().__init__(message)
+        self.what = what
+        self.needed = needed
+        self.budget = budget
+        self.hint = hint
+
+    def __reduce__(self):
+        # Raised in worker processes and re-raised in the parent
+        return (MemoryBudgetError, (self.what, self.needed, self.budget, self.hint))
+
+
+def parse_size(value: str) -> int:
+    """
+    Parses a size in bytes with an optional K, M, G or T suffix (powers of
+    1024), e.g. '512M' or '1.5GB'.
+
+    Raises:
+        ValueError: If the value is not a size.
+    """
+    match = _SIZE.match(str(value))
+    if not match:
+        raise ValueError(f"invalid size: '{value}'")
+    return int(float(match.group(1)) * _UNITS[match.group(2).upper()])
+
+
+def format_size(num_bytes: int) -> str:
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if num_bytes < 1024:
+            return f'{num_bytes:.0f} {unit}' if unit == 'B' else f'{num_bytes:.1f} {unit}'
+        num_bytes /= 1024
+    return f'{num_bytes:.1f} TB'
+
+
+def get_budget() -> int:
+    """
+    The budget in bytes, or None if there is none.
+    """
+    value = config.get_parameter('max_memory')
+    if value is None:
+        return None
+    return value if isinstance(value, int) else parse_size(value)
+
+
+def estimate_parse(input_bytes: int, fields: AbstractSet[str] = None) -> int:
+    """
+    Rough, conservative estimate of the peak memory of parsing JSON issue
+    data of the given size into an IssueStore with the given projection
+    (see models.Issue.project_fields, None for all fields).
+    """
+    if fields is None:
+        ratio = _PARSE_BASE + _PARSE_PER_FIELD * (_ALL_FIELDS - len(TEXT_FIELDS)) + _PARSE_TEXTS
+    else:
+        ratio = _PARSE_BASE + _PARSE_PER_FIELD * len(fields - TEXT_FIELDS)
+        if fields & TEXT_FIELDS:
+            ratio += _PARSE_TEXTS
+    return int(input_bytes * ratio)
+
+
+def fits(needed: int) -> bool:
+    budget = get_budget()
+    return budget is None or needed <= budget
+
+
+def check(what: str, needed: int, hint: str = None):
+    """
+    Raises:
+        MemoryBudgetError: If needed bytes do not fit into the budget.
+    """
+    budget = get_budget()
+    if budget is not None and needed > budget:
+        raise MemoryBudgetError(what, needed, budget, hint)
+
+
+def without_texts(fields: Iterable[str]) -> frozenset:
+    """
+    The projection without the free-text fields, from a normalized
+    projection or None for all fields.
+    """
+    # Imported here so that parsing --max-memory does not load the models
+    from models.Event import Event
+    from models.Issue import Issue, project_fields
+    if fields is None:
+        fields = Issue.FIELDS + [f'events.{name}' for name in Event.FIELDS]
+    return project_fields(set(fields) - TEXT_FIELDS)
@@ -0,0 +1,129 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+'''
+On-disk cache of analysis results. An entry is keyed by the feature id, the
+feature's arguments and the fingerprint of the dataset it was computed on,
+so entries of a changed dataset are never hit again; they age out of the
+cache, which is kept below a size limit by evicting the least recently used
+entries.
+'''
+
+# Default size limit of the cache
+DEFAULT_MAX_BYTES = 64 << 20
+
+
+class ResultCache:
+    """
+    Stores one JSON file per result in the cache directory, named
+    <feature id>.<key>.json. The modification time of an entry is its last
+    use, which drives the LRU eviction.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def key(feature_id: int, arguments: Dict[str, Any], dataset: str) -> str:
+        """
+        Builds the key of a result from the feature id, the feature's
+        arguments (order does not matter) and the dataset fingerprint.
+        """
+        normalized = json.dumps(
+            {'feature': feature_id, 'arguments': arguments, 'dataset': dataset},
+            sort_keys=True
+        )
+        return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+    def entry_path(self, feature_id: int, key: str) -> str:
+        return os.path.join(self.cache_dir, f'{feature_id}.{key}.json')
+
+    def get(self, feature_id: int, key: str) -> Dict[str, Any]:
+        """
+        Returns the cached result, or None.
+        """
+        entry = self.entry_path(feature_id, key)
+        try:
+            with open(entry, 'r') as fin:
+                result = json.load(fin)
+            # Mark the entry as recently used
+            os.utime(entry)
+            return result
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.info(f'Ignoring unreadable result cache entry {entry}: {e}')
+            return None
+
+    def put(self, feature_id: int, key: str, result: Dict[str, Any]):
+        """
+        Writes a result and evicts the least recently used entries while the
+        cache is larger than its limit.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry = self.entry_path(feature_id, key)
+        tmp_path = f'{entry}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as fout:
+            json.dump(result, fout)
+        os.replace(tmp_path, entry)
+        self.evict()
+
+    def evict(self):
+        evict_least_recently_used(self.cache_dir, '.json', self.max_bytes)
+
+    def invalidate(self, feature_ids: List[int] = None) -> int:
+        """
+        Removes the entries of the given features, or all entries.
+        Returns the number of removed entries.
+        """
+        removed = 0
+        for path, _, _ in cache_entries(self.cache_dir, '.json'):
+            feature_id = os.path.basename(path).split('.', 1)[0]
+            if feature_ids is None or feature_id in {str(f) for f in feature_ids}:
+                os.remove(path)
+                removed += 1
+        return removed
+
+
+def cache_entries(cache_dir: str, suffix: str) -> List[Tuple[str, int, int]]:
+    """
+    (path, last use, size) of every entry of a cache directory, which are
+    the files with the given suffix. The modification time of an entry is
+    its last use.
+    """
+    if not os.path.isdir(cache_dir):
+        return []
+    entries = []
+    for name in os.listdir(cache_dir):
+        if not name.endswith(suffix):
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        entries.append((path, stat.st_mtime_ns, stat.st_size))
+    return entries
+
+
+def evict_least_recently_used(cache_dir: str, suffix: str, max_bytes: int):
+    """
+    Removes the least recently used entries of a cache directory (see
+    cache_entries()) while their total size is over max_bytes.
+    """
+    entries = cache_entries(cache_dir, suffix)
+    total = sum(size for _, _, size in entries)
+    for path, _, size in sorted(entries, key=lambda e: e[1]):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
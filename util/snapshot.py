@@ -0,0 +1,165 @@
+import json
+import os
+import shutil
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+from models.IssueIndex import InvertedIndex
+from models.IssueStore import MISSING, IssueStore, StringPool
+
+'''
+Memory-mapped snapshot format for an IssueStore. A snapshot is a directory
+holding one .npy file per numeric column and per inverted index array and,
+per string pool, a UTF-8 blob with an offsets array. Opening a snapshot
+maps the files read-only instead of reading them, so processes on the same
+host share one page-cache copy and there is no parse step.
+'''
+
+MANIFEST = 'manifest.json'
+SNAPSHOT_VERSION = 2
+
+
+def is_snapshot(path: str) -> bool:
+    return path is not None and os.path.isfile(os.path.join(path, MANIFEST))
+
+
+def write_snapshot(store: IssueStore, path: str):
+    """
+    Writes the store to the given directory, replacing an existing snapshot.
+    """
+    tmp_path = f'{path.rstrip(os.sep)}.{os.getpid()}.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    for name, column in store.columns.items():
+        np.save(os.path.join(tmp_path, f'{name}.npy'), np.ascontiguousarray(column))
+
+    for name, pool in store.pools.items():
+        encoded = [value.encode('utf-8') for value in pool.values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in encoded], out=offsets[1:])
+        with open(os.path.join(tmp_path, f'{name}.strings'), 'wb') as fout:
+            fout.write(b''.join(encoded))
+        np.save(os.path.join(tmp_path, f'{name}.offsets.npy'), offsets)
+
+    indexes = store.index.indexes
+    for name, index in indexes.items():
+        np.save(os.path.join(tmp_path, f'index.{name}.rows.npy'), index.rows)
+        np.save(os.path.join(tmp_path, f'index.{name}.offsets.npy'), index.offsets)
+
+    manifest = {
+        'version': SNAPSHOT_VERSION,
+        'columns': sorted(store.columns),
+        'pools': sorted(store.pools),
+        'indexes': sorted(indexes),
+        'issues': len(store),
+        'events': store.num_events,
+    }
+    with open(os.path.join(tmp_path, MANIFEST), 'w') as fout:
+        json.dump(manifest, fout, indent=2)
+
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    os.replace(tmp_path, path)
+
+
+def open_snapshot(path: str) -> IssueStore:
+    """
+    Maps a snapshot written by write_snapshot(). The returned store is
+    read-only and backed by the snapshot files.
+
+    Raises:
+        ValueError: If the directory is not a compatible snapshot.
+    """
+    try:
+        with open(os.path.join(path, MANIFEST), 'r') as fin:
+            manifest = json.load(fin)
+    except (OSError, ValueError) as e:
+        raise ValueError(f'{path} is not a dataset snapshot: {e}')
+    if manifest.get('version') != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {manifest.get('version')} in {path}")
+
+    columns = {
+        name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+        for name in manifest['columns']
+    }
+    pools = {name: MappedStringPool(path, name) for name in manifest['pools']}
+    store = IssueStore(columns, pools)
+    store.set_index({
+        name: InvertedIndex(
+            np.load(os.path.join(path, f'index.{name}.rows.npy'), mmap_mode='r'),
+            np.load(os.path.join(path, f'index.{name}.offsets.npy'), mmap_mode='r'),
+        )
+        for name in manifest['indexes']
+    })
+    return store
+
+
+class MappedStringPool(StringPool):
+    """
+    Read-only StringPool whose values are decoded on demand from a mapped
+    UTF-8 blob. The reverse mapping for lookup() is only built when needed.
+    """
+
+    def __init__(self, path: str, name: str):
+        self._offsets = np.load(os.path.join(path, f'{name}.offsets.npy'), mmap_mode='r')
+        blob_path = os.path.join(path, f'{name}.strings')
+        if os.path.getsize(blob_path) > 0:
+            self._blob = np.memmap(blob_path, dtype=np.uint8, mode='r')
+        else:
+            self._blob = np.zeros(0, dtype=np.uint8)
+        self.values = _MappedValues(self)
+        self._codes = None
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __reduce__(self):
+        # Pickling detaches the pool from the snapshot files
+        return StringPool, (list(self.values),)
+
+    def encode(self, value: str) -> int:
+        if value is None:
+            return MISSING
+        code = self.lookup(value)
+        if code == MISSING:
+            raise ValueError('Snapshot string pools are read-only.')
+        return code
+
+    def decode(self, code: int) -> str:
+        if code < 0:
+            return None
+        start, end = self._offsets[code], self._offsets[code + 1]
+        return bytes(self._blob[start:end]).decode('utf-8')
+
+    def decode_many(self, codes: Iterable[int]) -> List[str]:
+        return [self.decode(c) for c in codes]
+
+    def _index(self) -> Dict[str, int]:
+        if self._codes is None:
+            self._codes = {self.decode(i): i for i in range(len(self))}
+        return self._codes
+
+
+class _MappedValues:
+    """
+    Sequence view over the values of a MappedStringPool.
+    """
+
+    def __init__(self, pool: MappedStringPool):
+        self._pool = pool
+
+    def __len__(self):
+        return len(self._pool)
+
+    def __getitem__(self, code: int) -> str:
+        if code < 0:
+            code += len(self)
+        if not 0 <= code < len(self):
+            raise IndexError(code)
+        return self._pool.decode(code)
+
+    def __iter__(self):
+        for code in range(len(self)):
+            yield self._pool.decode(code)